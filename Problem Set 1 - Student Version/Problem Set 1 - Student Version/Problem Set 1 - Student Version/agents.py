@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Dict, Generic, List
+from typing import Callable, Dict, Generic, List, Optional
 from problem import HeuristicFunction, Problem, S, A, Solution
+import time
 
 # This is an abstract class for all goal based agents
 class GoalBasedAgent(ABC, Generic[S, A]):
@@ -45,18 +46,38 @@ class UninformedSearchAgent(GoalBasedAgent[S, A]):
         return self.policy.get(state)
 
 # This agent applies an informed search algorithm to find the solution to goal for the given state
+# The search function can also be an anytime search (such as search.AnytimeRepairingAStar) which yields improving solutions,
+# in which case the agent uses the last (best) solution.
+# If a deadline (in seconds) is given, it is passed to the anytime search which stops improving once the deadline is reached,
+# and the agent uses the best solution found so far. The anytime search always runs until its first solution,
+# so the agent only returns None if the problem has no solution (even if the deadline is exceeded).
 class InformedSearchAgent(GoalBasedAgent[S, A]):
-    def __init__(self, search_fn: Callable[[Problem[S, A], S, HeuristicFunction], Solution], heuristic: HeuristicFunction) -> None:
+    def __init__(self, search_fn: Callable[[Problem[S, A], S, HeuristicFunction], Solution], heuristic: HeuristicFunction,
+                 deadline: Optional[float] = None) -> None:
         super().__init__()
         self.search_fn = search_fn
         self.heuristic = heuristic
+        self.deadline = deadline
         # The policy will store the action to do for each state so as not to search again after each observation
         self.policy: Dict[S, A] = {}
     
+    # Run the search function and return the solution
+    def search(self, problem: Problem[S, A], state: S) -> Solution:
+        if self.deadline is None:
+            result = self.search_fn(problem, state, self.heuristic)
+        else:
+            result = self.search_fn(problem, state, self.heuristic, deadline=time.monotonic() + self.deadline)
+        if result is None or isinstance(result, list):
+            return result
+        # This is an anytime search, so we keep the last solution it yields
+        best = None
+        for best in result: pass
+        return None if best is None else best.path
+
     def act(self, problem: Problem[S, A], state: S) -> A:
         # This state is not stored in the policy, we need to search for a solution 
         if state not in self.policy:
-            solution = self.search_fn(problem, state, self.heuristic)
+            solution = self.search(problem, state)
             # if no solution was found, we return None
             if solution is None:
                 self.policy[state] = None
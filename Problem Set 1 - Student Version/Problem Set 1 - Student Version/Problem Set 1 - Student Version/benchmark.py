@@ -0,0 +1,788 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse, glob, math, random, signal, time, tracemalloc
+
+from problem import HeuristicFunction, Problem
+from sokoban import SokobanProblem, SokobanTile
+from parking import ParkingProblem
+from mathutils import Direction
+
+# This script contains benchmarks for the search implementation
+# Every benchmark is a sub-command, for example:
+#   python benchmark.py memory levels/level1.txt parks/park1.txt --agent astar
+
+DEFAULT_FILES = [*sorted(glob.glob("levels/level*.txt")), *sorted(glob.glob("parks/park*.txt"))]
+
+# The name of the algorithm used by "search.GraphSearch" for each agent
+ALGORITHMS = {
+    "bfs": "BreadthFirst",
+    "dfs": "DepthFirst",
+    "ucs": "UniformCost",
+    "astar": "AStar",
+    "gbfs": "BestFirst",
+}
+
+# Read a problem from a file (a Sokoban level or a parking lot) and return it with a heuristic for it
+def load_problem(path: str) -> Tuple[Problem, HeuristicFunction]:
+    return load_problem_from_text(open(path, 'r').read())
+
+def load_problem_from_text(text: str) -> Tuple[Problem, HeuristicFunction]:
+    if SokobanTile.PLAYER in text or SokobanTile.PLAYER_ON_GOAL in text:
+        from sokoban_heuristic import weak_heuristic
+        return SokobanProblem.from_text(text), weak_heuristic
+    from parking import parking_heuristic
+    return ParkingProblem.from_text(text), parking_heuristic
+
+# Run the function and return its result, the elapsed time and the peak memory allocated while it was running (in bytes)
+# If a time limit (in seconds) is given, the function is interrupted once it is reached (using SIGALRM)
+# and TimeLimitExceeded is raised with the elapsed time and the peak memory until then
+def measure(fn: Callable, *args, trace_memory: bool = True, time_limit: Optional[float] = None):
+    if trace_memory: tracemalloc.start()
+    if time_limit is not None:
+        def interrupt(signum, frame): raise TimeLimitExceeded(time_limit, 0)
+        previous_handler = signal.signal(signal.SIGALRM, interrupt)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    start = time.perf_counter()
+    try:
+        try:
+            result = fn(*args)
+        except TimeLimitExceeded:
+            raise TimeLimitExceeded(time.perf_counter() - start, tracemalloc.get_traced_memory()[1] if trace_memory else 0)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+    finally:
+        if time_limit is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+        if trace_memory: tracemalloc.stop()
+    return result, elapsed, peak
+
+# The exception raised by measure when the function exceeds its time limit
+class TimeLimitExceeded(Exception):
+    def __init__(self, elapsed: float, peak: int) -> None:
+        super().__init__(f"The time limit was exceeded after {elapsed:.3f} s")
+        self.elapsed = elapsed
+        self.peak = peak
+
+# Read the sokoban levels in the files and return a list of (name, text)
+# A file can contain a single level or a collection of levels (named "path:1", "path:2", ...)
+def read_levels(paths: List[str]) -> List[Tuple[str, str]]:
+    from sokoban import split_level_collection
+    levels = []
+    for path in paths:
+        texts = split_level_collection(open(path, 'r').read())
+        if len(texts) == 1:
+            levels.append((path, texts[0]))
+        else:
+            levels.extend((f"{path}:{index}", text) for index, text in enumerate(texts, 1))
+    return levels
+
+def print_table(header: List[str], rows: List[List[str]]):
+    widths = [max(len(str(row[i])) for row in [header, *rows]) for i in range(len(header))]
+    for row in [header, *rows]:
+        print("  ".join(str(cell).rjust(width) for cell, width in zip(row, widths)))
+
+# This is a copy of the original graph search (before the node table), kept as the baseline of the memory benchmark
+# Every node in the heap holds a copy of its path (path + [action]) and the frontier membership test scans the heap
+def baseline_graph_search(problem: Problem, initial_state, algorithm: str, heuristic: HeuristicFunction):
+    import heapq
+    def cost_function(index, cost, state, child, action):
+        if algorithm == 'BreadthFirst': return index
+        if algorithm == 'DepthFirst': return -1 * index
+        if algorithm == 'UniformCost': return problem.get_cost(state, action) + cost
+        if algorithm == 'AStar': return cost - heuristic(problem, state) + problem.get_cost(state, action) + heuristic(problem, child)
+        return heuristic(problem, child)
+    frontier = [(0 if heuristic is None else heuristic(problem, initial_state), (0, initial_state), [])]
+    index = 0
+    explored = set()
+    while frontier:
+        cost, (_, state), path = heapq.heappop(frontier)
+        if state not in explored:
+            if problem.is_goal(state):
+                return path
+            explored.add(state)
+            for action in problem.get_actions(state):
+                child = problem.get_successor(state, action)
+                index += 1
+                child_cost = cost_function(index, cost, state, child, action)
+                if child not in explored and child not in frontier:
+                    if problem.is_goal(child) and algorithm == 'BreadthFirst':
+                        return path + [action]
+                    heapq.heappush(frontier, (child_cost, (index, child), path + [action]))
+    return None
+
+# This is a copy of the original parking problem (before the packed states), kept as the baseline of the parking benchmark
+# A state is a tuple of the positions of the cars, so every occupancy check scans the tuple and every successor builds a new tuple
+class TupleParkingProblem(ParkingProblem):
+    def get_initial_state(self):
+        return self.cars
+
+    def is_goal(self, state) -> bool:
+        return all(self.slots.get(position) == car for car, position in enumerate(state))
+
+    def get_successor(self, state, action):
+        car, direction = action
+        return state[:car] + (state[car] + direction.to_vector(),) + state[car + 1:]
+
+    def get_cost(self, state, action) -> float:
+        car, direction = action
+        return 26 - car + (100 if self.slots.get(state[car] + direction.to_vector(), car) != car else 0)
+
+    def get_actions(self, state):
+        return [action for action, _, _ in self.get_successors(state)]
+
+    def get_successors(self, state):
+        successors = []
+        for car, position in enumerate(state):
+            for direction in Direction:
+                target = position + direction.to_vector()
+                if target in state or target not in self.passages: continue
+                cost = 26 - car + (100 if self.slots.get(target, car) != car else 0)
+                successors.append(((car, direction), state[:car] + (target,) + state[car + 1:], cost))
+        return successors
+
+    @staticmethod
+    def from_text(text: str) -> 'TupleParkingProblem':
+        problem = TupleParkingProblem()
+        problem.__dict__.update(ParkingProblem.from_text(text).__dict__)
+        return problem
+
+# Compare the time of the search on the parking problem with packed states and with the original tuple states
+# The parking lots are the given files and random lots (see generators.py)
+def parking_benchmark(args: argparse.Namespace):
+    from search import GraphSearch, fetch_search_statistics
+    from generators import generate_parking
+    algorithm = ALGORITHMS[args.agent]
+    lots = [(path, open(path, 'r').read()) for path in args.files]
+    lots += [(f"random {args.size}x{args.size} ({args.cars} cars, seed {seed})", generate_parking(args.size, args.size, args.cars, 0.2, seed))
+             for seed in range(args.random)]
+    rows = []
+    for name, text in lots:
+        for encoding, problem_class in [("tuple", TupleParkingProblem), ("packed", ParkingProblem)]:
+            problem = problem_class.from_text(text)
+            solution, elapsed, _ = measure(GraphSearch, None, problem, problem.get_initial_state(), algorithm, None, trace_memory=False)
+            expanded = fetch_search_statistics().expanded
+            cost = "-" if solution is None else solution_cost(problem, solution)
+            rows.append([name, encoding, cost, expanded, f"{elapsed:.3f} s", f"{expanded / elapsed if elapsed > 0 else 0:.0f}"])
+    print_table(["parking lot", "state", "cost", "expanded", "time", "nodes/s"], rows)
+
+# Returns the path cost of a solution by applying its actions from the initial state
+def solution_cost(problem: Problem, solution: List) -> float:
+    state, cost = problem.get_initial_state(), 0
+    for action in solution:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    return cost
+
+# Compare the expanded nodes and the time of UCS and A* with the parking heuristic on the parking lots and on random lots
+def parking_heuristic_benchmark(args: argparse.Namespace):
+    from search import AStarSearch, UniformCostSearch, fetch_search_statistics
+    from generators import generate_parking
+    from parking import parking_heuristic
+    lots = [(path, open(path, 'r').read()) for path in args.files]
+    lots += [(f"random {args.size}x{args.size} ({args.cars} cars, seed {seed})", generate_parking(args.size, args.size, args.cars, 0.2, seed))
+             for seed in range(args.random)]
+    searches: Dict[str, Callable] = {
+        "ucs": UniformCostSearch,
+        "astar": lambda problem, state: AStarSearch(problem, state, parking_heuristic),
+    }
+    rows = []
+    for name, text in lots:
+        for search_name, search in searches.items():
+            problem = ParkingProblem.from_text(text)
+            solution, elapsed, _ = measure(search, problem, problem.get_initial_state(), trace_memory=False)
+            cost = "-" if solution is None else solution_cost(problem, solution)
+            rows.append([name, search_name, cost, fetch_search_statistics().expanded, f"{elapsed:.3f} s"])
+    print_table(["parking lot", "search", "cost", "expanded", "time"], rows)
+
+# Compare the joint A* search (with the parking heuristic) against the conflict-based search (see parking_cbs.py)
+# with every weight (1 is CBS, a larger weight is the bounded-suboptimal ECBS) on the parking lots and on random lots
+# Every solution is replayed with run_parking_trajectory to check that it parks every car and to compute its cost
+def cbs_benchmark(args: argparse.Namespace):
+    from search import AStarSearch, fetch_search_statistics
+    from generators import generate_parking
+    from parking import parking_heuristic
+    from parking_cbs import ConflictBasedSearch, fetch_cbs_statistics
+    from helpers.test_tools import run_parking_trajectory
+    lots = [(path, open(path, 'r').read()) for path in args.files]
+    lots += [(f"random {args.size}x{args.size} ({args.cars} cars, seed {seed})", generate_parking(args.size, args.size, args.cars, args.walls, seed))
+             for seed in range(args.random)]
+    rows = []
+    for name, text in lots:
+        solvers: Dict[str, Callable] = {} if args.skip_astar else {"astar": lambda problem, state: AStarSearch(problem, state, parking_heuristic)}
+        for weight in args.weights:
+            solvers["cbs" if weight == 1 else f"ecbs w={weight}"] = \
+                lambda problem, state, weight=weight: ConflictBasedSearch(problem, state, weight, args.merge_bound, args.max_nodes)
+        for solver_name, solver in solvers.items():
+            problem = ParkingProblem.from_text(text)
+            solution, elapsed, _ = measure(solver, problem, problem.get_initial_state(), trace_memory=False)
+            cost = "-"
+            if solution is not None:
+                _, _, state, cost = run_parking_trajectory(problem, solution)
+                if not problem.is_goal(state): cost = "invalid"
+            if solver_name == "astar":
+                rows.append([name, solver_name, cost, "-", fetch_search_statistics().expanded, "-", f"{elapsed:.3f} s"])
+            else:
+                statistics = fetch_cbs_statistics()
+                rows.append([name, solver_name, cost, statistics.expanded, statistics.low_level_expanded, statistics.merges, f"{elapsed:.3f} s"])
+    print_table(["parking lot", "solver", "cost", "tree nodes", "states expanded", "merges", "time"], rows)
+
+# Compare the peak memory of the search when the nodes are stored in a node table (parent id + action)
+# against the baseline search where every node holds a copy of its path
+def memory_benchmark(args: argparse.Namespace):
+    from search import GraphSearch
+    algorithm = ALGORITHMS[args.agent]
+    searches: Dict[str, Callable] = {
+        "node table": lambda problem, state, heuristic: GraphSearch(None, problem, state, algorithm, heuristic),
+        "baseline": lambda problem, state, heuristic: baseline_graph_search(problem, state, algorithm, heuristic),
+    }
+    rows = []
+    for path in args.files:
+        for name, search in searches.items():
+            problem, heuristic = load_problem(path)
+            if algorithm in ("BreadthFirst", "DepthFirst", "UniformCost"): heuristic = None
+            # A search that exceeds the time limit is reported with the peak memory it reached until then
+            try:
+                solution, elapsed, peak = measure(search, problem, problem.get_initial_state(), heuristic, time_limit=args.time_limit)
+                length = "-" if solution is None else len(solution)
+            except TimeLimitExceeded as exceeded:
+                length, elapsed, peak = "timeout", exceeded.elapsed, exceeded.peak
+            rows.append([path, name, length, f"{peak / 2**20:.2f} MiB", f"{elapsed:.3f} s"])
+    print_table(["file", "search", "solution", "peak memory", "time"], rows)
+
+# Compare the speed (expanded nodes per second) of the frontier engines
+def frontier_benchmark(args: argparse.Namespace):
+    from search import GraphSearch, SelectFrontier, fetch_search_statistics
+    from frontier import FRONTIERS
+    algorithm = ALGORITHMS[args.agent]
+    rows = []
+    for path in args.files:
+        for name in ["auto", *FRONTIERS]:
+            problem, heuristic = load_problem(path)
+            if algorithm in ("BreadthFirst", "DepthFirst", "UniformCost"): heuristic = None
+            frontier = SelectFrontier(problem, algorithm) if name == "auto" else FRONTIERS[name]()
+            if name == "auto": name = f"auto ({type(frontier).__name__})"
+            try:
+                solution, elapsed, _ = measure(GraphSearch, frontier, problem, problem.get_initial_state(), algorithm, heuristic, trace_memory=False)
+            except ValueError as err:
+                # The bucket queue rejects non-integer costs
+                rows.append([path, name, "-", "-", "-", str(err)])
+                continue
+            length = "-" if solution is None else len(solution)
+            expanded = fetch_search_statistics().expanded
+            rows.append([path, name, length, expanded, f"{elapsed:.3f} s", f"{expanded / max(elapsed, 1e-9):.0f}"])
+    print_table(["file", "frontier", "solution", "expanded", "time", "nodes/s"], rows)
+
+# Generate a random geometric graph: the nodes are scattered uniformly in a square (about one node per unit area)
+# and every node is connected in both directions to its "degree" nearest nodes
+def random_graph(size: int, degree: int, seed: int):
+    from graph import GraphRoutingProblem, GraphNode
+    from mathutils import Point
+    rng = random.Random(seed)
+    side = math.sqrt(size)
+    nodes = [GraphNode(str(i), Point(rng.uniform(0, side), rng.uniform(0, side))) for i in range(size)]
+    # Put the nodes in a grid of unit cells so that the nearest nodes are found in the neighboring cells
+    cells: Dict[Tuple[int, int], List] = {}
+    for node in nodes:
+        cells.setdefault((int(node.position.x), int(node.position.y)), []).append(node)
+    edges = {node: set() for node in nodes}
+    for node in nodes:
+        x, y = int(node.position.x), int(node.position.y)
+        radius, candidates = 1, []
+        while len(candidates) <= degree and radius <= side:
+            candidates = [other for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)
+                          for other in cells.get((x + dx, y + dy), []) if other is not node]
+            radius += 1
+        candidates.sort(key=lambda other: (other.position.x - node.position.x)**2 + (other.position.y - node.position.y)**2)
+        for other in candidates[:degree]:
+            edges[node].add(other)
+            edges[other].add(node)
+    adjacency = {node: sorted(adjacent, key=lambda other: other.name) for node, adjacent in edges.items()}
+    return GraphRoutingProblem(nodes[0], nodes[1], adjacency)
+
+# Compare the unidirectional and bidirectional versions of UCS and A* on random graphs
+def bidirectional_benchmark(args: argparse.Namespace):
+    from search import UniformCostSearch, AStarSearch, BidirectionalUniformCostSearch, BidirectionalAStarSearch, fetch_search_statistics
+    from graph import GraphRoutingProblem, graphrouting_heuristic
+    from helpers.utils import fetch_recorded_calls
+    searches = {
+        "ucs": lambda problem: UniformCostSearch(problem, problem.start),
+        "bi-ucs": lambda problem: BidirectionalUniformCostSearch(problem, problem.start),
+        "astar": lambda problem: AStarSearch(problem, problem.start, graphrouting_heuristic),
+        "bi-astar": lambda problem: BidirectionalAStarSearch(problem, problem.start, graphrouting_heuristic),
+    }
+    graph, elapsed, _ = measure(random_graph, args.size, args.degree, args.seed, trace_memory=False)
+    print(f"Generated a graph with {len(graph.adjacency)} nodes in {elapsed:.3f} s")
+    nodes = list(graph.adjacency)
+    rng = random.Random(args.seed)
+    rows = []
+    for query in range(args.queries):
+        start, goal = rng.sample(nodes, 2)
+        problem = GraphRoutingProblem(start, goal, graph.adjacency, graph.reverse_adjacency)
+        for name, search in searches.items():
+            solution, elapsed, _ = measure(search, problem, trace_memory=False)
+            fetch_recorded_calls(GraphRoutingProblem.get_actions) # Drop the recorded traversal
+            cost = "-"
+            if solution is not None:
+                state, cost = start, 0
+                for action in solution:
+                    cost += problem.get_cost(state, action)
+                    state = problem.get_successor(state, action)
+                cost = f"{cost:.3f}"
+            rows.append([query, name, cost, fetch_search_statistics().expanded, f"{elapsed:.3f} s"])
+    print_table(["query", "search", "cost", "expanded", "time"], rows)
+
+# Compare the serial A* (GraphSearch) against the parallel hash distributed A* with different numbers of workers
+def parallel_benchmark(args: argparse.Namespace):
+    from search import AStarSearch, fetch_search_statistics
+    from parallel_search import HashDistributedAStar
+    rows = []
+    for path in args.files:
+        problem, heuristic = load_problem(path)
+        solution, serial_time, _ = measure(AStarSearch, problem, problem.get_initial_state(), heuristic, trace_memory=False)
+        length = "-" if solution is None else len(solution)
+        rows.append([path, "serial", length, fetch_search_statistics().expanded, f"{serial_time:.3f} s", "1.00"])
+        for workers in args.workers:
+            problem, heuristic = load_problem(path)
+            solution, elapsed, _ = measure(HashDistributedAStar, problem, problem.get_initial_state(), heuristic, workers, args.batch, trace_memory=False)
+            length = "-" if solution is None else len(solution)
+            rows.append([path, f"{workers} workers", length, fetch_search_statistics().expanded, f"{elapsed:.3f} s", f"{serial_time / elapsed:.2f}"])
+    print_table(["file", "search", "solution", "expanded", "time", "speedup"], rows)
+
+# Compare the expanded nodes per second of the sokoban problem with its bitboard encoding
+def bitboard_benchmark(args: argparse.Namespace):
+    from search import GraphSearch, fetch_search_statistics
+    from sokoban_heuristic import weak_heuristic
+    from sokoban_bitboard import BitboardSokobanProblem, bitboard_weak_heuristic
+    algorithm = ALGORITHMS[args.agent]
+    informed = algorithm not in ("BreadthFirst", "DepthFirst", "UniformCost")
+    rows = []
+    for path in args.files:
+        problem = SokobanProblem.from_file(path)
+        encodings = {
+            "points": (problem, weak_heuristic),
+            "bitboard": (BitboardSokobanProblem.from_problem(problem), bitboard_weak_heuristic),
+        }
+        for name, (problem, heuristic) in encodings.items():
+            solution, elapsed, _ = measure(GraphSearch, None, problem, problem.get_initial_state(), algorithm, heuristic if informed else None, trace_memory=False)
+            length = "-" if solution is None else len(solution)
+            expanded = fetch_search_statistics().expanded
+            rows.append([path, name, length, expanded, f"{elapsed:.3f} s", f"{expanded / max(elapsed, 1e-9):.0f}"])
+    print_table(["file", "encoding", "solution", "expanded", "time", "nodes/s"], rows)
+
+# Compare the peak memory and the time of the search when the explored set stores the states or only their Zobrist keys
+def zobrist_benchmark(args: argparse.Namespace):
+    from search import GraphSearch, fetch_search_statistics
+    from sokoban import ZobristSet
+    algorithm = ALGORITHMS[args.agent]
+    explored_sets: Dict[str, Callable] = {"states": set, "zobrist keys": ZobristSet}
+    rows = []
+    for path in args.files:
+        for name, explored in explored_sets.items():
+            problem, heuristic = load_problem(path)
+            if algorithm in ("BreadthFirst", "DepthFirst", "UniformCost"): heuristic = None
+            solution, elapsed, peak = measure(GraphSearch, None, problem, problem.get_initial_state(), algorithm, heuristic, None, explored(),
+                                              trace_memory=args.memory)
+            length = "-" if solution is None else len(solution)
+            expanded = fetch_search_statistics().expanded
+            memory = f"{peak / 2**20:.2f} MiB" if args.memory else "-"
+            rows.append([path, name, length, expanded, memory, f"{elapsed:.3f} s", f"{expanded / max(elapsed, 1e-9):.0f}"])
+    print_table(["file", "explored", "solution", "expanded", "peak memory", "time", "nodes/s"], rows)
+
+# Compare the expanded nodes of the search with and without the sokoban push filters (deadlock pruning)
+# and report how many pushes each filter pruned
+def deadlocks_benchmark(args: argparse.Namespace):
+    from search import GraphSearch, fetch_search_statistics
+    from sokoban_deadlocks import PUSH_FILTERS
+    algorithm = ALGORITHMS[args.agent]
+    configurations = {"none": [], **{name: [name] for name in args.filters}}
+    if len(args.filters) > 1: configurations["all"] = args.filters
+    rows = []
+    for path, text in read_levels(args.files):
+        for name, filters in configurations.items():
+            problem, heuristic = load_problem_from_text(text)
+            if algorithm in ("BreadthFirst", "DepthFirst", "UniformCost"): heuristic = None
+            problem.set_push_filters(PUSH_FILTERS[filter_name] for filter_name in filters)
+            solution, elapsed, _ = measure(GraphSearch, None, problem, problem.get_initial_state(), algorithm, heuristic, trace_memory=False)
+            length = "-" if solution is None else len(solution)
+            pruned = ", ".join(f"{filter_name}: {count}" for filter_name, count in problem.pruned.items()) or "-"
+            rows.append([path, name, length, fetch_search_statistics().expanded, pruned, f"{elapsed:.3f} s"])
+    print_table(["file", "filters", "solution", "expanded", "pruned pushes", "time"], rows)
+
+# Compare the step-level sokoban problem with the push-level problem (where every action is a push)
+def push_benchmark(args: argparse.Namespace):
+    from search import GraphSearch, fetch_search_statistics
+    from sokoban_push import SokobanPushProblem, expand_pushes
+    algorithm = ALGORITHMS[args.agent]
+    rows = []
+    for path, text in read_levels(args.files):
+        problem = SokobanProblem.from_text(text)
+        for name in ["steps", "pushes"]:
+            search_problem = problem if name == "steps" else SokobanPushProblem.from_problem(problem)
+            solution, elapsed, _ = measure(GraphSearch, None, search_problem, search_problem.get_initial_state(), algorithm, None, trace_memory=False)
+            expanded = fetch_search_statistics().expanded
+            if solution is not None and name == "pushes": solution = expand_pushes(problem.get_initial_state(), solution)
+            steps, pushes = "-", "-"
+            if solution is not None:
+                state, pushes = problem.get_initial_state(), 0
+                for action in solution:
+                    successor = problem.get_successor(state, action)
+                    pushes += successor.crates != state.crates
+                    state = successor
+                steps = len(solution)
+            rows.append([path, name, steps, pushes, expanded, f"{elapsed:.3f} s"])
+    print_table(["file", "actions", "steps", "pushes", "expanded", "time"], rows)
+
+# Compare the push-level sokoban problem with and without the tunnel and goal-room macros
+# The macros have costs larger than 1, so the default search is uniform cost search
+def macros_benchmark(args: argparse.Namespace):
+    from search import GraphSearch, fetch_search_statistics
+    from sokoban_push import SokobanPushProblem
+    algorithm = ALGORITHMS[args.agent]
+    configurations = {"none": (False, False), "tunnels": (True, False), "rooms": (False, True), "both": (True, True)}
+    rows = []
+    for path, text in read_levels(args.files):
+        problem = SokobanProblem.from_text(text)
+        for name, (tunnel_macros, goal_room_macros) in configurations.items():
+            push_problem = SokobanPushProblem.from_problem(problem, None, tunnel_macros, goal_room_macros)
+            solution, elapsed, _ = measure(GraphSearch, None, push_problem, push_problem.get_initial_state(), algorithm, None, trace_memory=False)
+            expanded = fetch_search_statistics().expanded
+            actions, pushes = "-", "-"
+            if solution is not None:
+                actions, pushes = len(solution), sum(push_problem.get_cost(None, action) for action in solution)
+            rows.append([path, name, actions, pushes, expanded, f"{elapsed:.3f} s"])
+    print_table(["file", "macros", "actions", "pushes", "expanded", "time"], rows)
+
+# Compare the sokoban heuristics with A* (expanded nodes and time per level)
+def heuristics_benchmark(args: argparse.Namespace):
+    from search import AStarSearch, fetch_search_statistics
+    import sokoban_heuristic
+    rows = []
+    for path, text in read_levels(args.files):
+        for name in args.heuristics:
+            problem = SokobanProblem.from_text(text)
+            heuristic = getattr(sokoban_heuristic, f"{name}_heuristic")
+            solution, elapsed, _ = measure(AStarSearch, problem, problem.get_initial_state(), heuristic, trace_memory=False)
+            length = "-" if solution is None else len(solution)
+            statistics = fetch_search_statistics()
+            rows.append([path, name, length, statistics.expanded, statistics.heuristic_misses, f"{elapsed:.3f} s"])
+    print_table(["file", "heuristic", "solution", "expanded", "evaluations", "time"], rows)
+
+# Compare A* with the maximum of the heuristics (every heuristic is evaluated on every generated node)
+# and the lazy A* with the same heuristics (the expensive heuristics are only evaluated on the nodes that reach the top of the frontier)
+def lazy_benchmark(args: argparse.Namespace):
+    from search import AStarSearch, LazyAStarSearch, fetch_search_statistics
+    import sokoban_heuristic
+    heuristics = [getattr(sokoban_heuristic, f"{name}_heuristic") for name in args.heuristics]
+    maximum = lambda problem, state: max(heuristic(problem, state) for heuristic in heuristics)
+    rows = []
+    for path, text in read_levels(args.files):
+        for name in ["astar", "lazy"]:
+            problem = SokobanProblem.from_text(text)
+            if name == "astar":
+                solution, elapsed, _ = measure(AStarSearch, problem, problem.get_initial_state(), maximum, trace_memory=False)
+            else:
+                solution, elapsed, _ = measure(LazyAStarSearch, problem, problem.get_initial_state(), heuristics, trace_memory=False)
+            length = "-" if solution is None else len(solution)
+            statistics = fetch_search_statistics()
+            # A* evaluates all the heuristics on every state it computes the heuristic for
+            evaluations = statistics.heuristic_evaluations or [statistics.heuristic_misses] * len(heuristics)
+            rows.append([path, name, length, statistics.expanded, *evaluations, f"{elapsed:.3f} s"])
+    print_table(["file", "search", "solution", "expanded", *args.heuristics, "time"], rows)
+
+# Generate random instances of growing sizes (see generators.py) and measure the expanded nodes and the time of the search
+# The results are written to a CSV file if desired and plotted if matplotlib is installed
+def scaling_benchmark(args: argparse.Namespace):
+    import csv, statistics
+    from search import GraphSearch, fetch_search_statistics
+    from generators import generate_parking, generate_sokoban
+    generate = generate_sokoban if args.kind == "sokoban" else generate_parking
+    algorithm = ALGORITHMS[args.agent]
+    rows, means = [], []
+    for size in args.sizes:
+        expanded, times = [], []
+        for seed in range(args.seed, args.seed + args.instances):
+            text = generate(size, size, args.count, args.walls, seed)
+            problem, heuristic = load_problem_from_text(text)
+            if algorithm in ("BreadthFirst", "DepthFirst", "UniformCost"): heuristic = None
+            solution, elapsed, _ = measure(GraphSearch, None, problem, problem.get_initial_state(), algorithm, heuristic, trace_memory=False)
+            length = "-" if solution is None else len(solution)
+            expanded.append(fetch_search_statistics().expanded)
+            times.append(elapsed)
+            rows.append([size, seed, length, expanded[-1], f"{elapsed:.3f}"])
+        means.append((size, statistics.mean(expanded), statistics.mean(times)))
+    header = ["size", "seed", "solution", "expanded", "time (s)"]
+    print_table(header, rows)
+    print()
+    print_table(["size", "mean expanded", "mean time (s)"], [[size, f"{nodes:.1f}", f"{elapsed:.3f}"] for size, nodes, elapsed in means])
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+    if args.plot:
+        try:
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.pyplot as plt
+        except ImportError:
+            print("matplotlib is not installed, so the plot was not drawn (use --csv to save the results)")
+            return
+        figure, (nodes_axis, time_axis) = plt.subplots(1, 2, figsize=(10, 4))
+        sizes = [size for size, _, _ in means]
+        nodes_axis.plot(sizes, [nodes for _, nodes, _ in means], marker="o")
+        nodes_axis.set(xlabel="size", ylabel="mean expanded nodes", yscale="log")
+        time_axis.plot(sizes, [elapsed for _, _, elapsed in means], marker="o")
+        time_axis.set(xlabel="size", ylabel="mean time (s)", yscale="log")
+        figure.suptitle(f"{args.kind} ({args.count} {'crates' if args.kind == 'sokoban' else 'cars'}, {args.agent})")
+        figure.tight_layout()
+        figure.savefig(args.plot)
+
+# Compare the graph routing problem on GraphNode objects against the CSR representation (see graph.CSRGraph),
+# both built in memory and loaded from a binary file with mmap (in a temporary directory), on a random graph
+# The build table shows the time and the peak memory to get every representation, and the query table compares A* and bidirectional A*
+def graph_storage_benchmark(args: argparse.Namespace):
+    import os, tempfile
+    from search import AStarSearch, BidirectionalAStarSearch, fetch_search_statistics
+    from graph import GraphRoutingProblem, CSRGraphRoutingProblem, graphrouting_heuristic, write_csr_graph
+    from helpers.utils import fetch_recorded_calls
+    searches = {
+        "astar": lambda problem: AStarSearch(problem, problem.start, graphrouting_heuristic),
+        "bi-astar": lambda problem: BidirectionalAStarSearch(problem, problem.start, graphrouting_heuristic),
+    }
+    graph, graph_time, graph_peak = measure(random_graph, args.size, args.degree, args.seed)
+    csr, csr_time, csr_peak = measure(CSRGraphRoutingProblem.from_problem, graph)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "graph.csr")
+        _, write_time, _ = measure(write_csr_graph, path, csr.graph, csr.start, csr.goal, trace_memory=False)
+        loaded, load_time, load_peak = measure(GraphRoutingProblem.from_file, path)
+        print(f"Generated a graph with {csr.graph.node_count} nodes and {csr.graph.edge_count} edges")
+        print_table(["representation", "time", "peak memory"], [
+            ["objects (generate)", f"{graph_time:.3f} s", f"{graph_peak / 2**20:.2f} MiB"],
+            ["csr (convert)", f"{csr_time:.3f} s", f"{csr_peak / 2**20:.2f} MiB"],
+            [f"csr file (write {os.path.getsize(path) / 2**20:.2f} MiB)", f"{write_time:.3f} s", "-"],
+            ["csr file (mmap)", f"{load_time * 1000:.2f} ms", f"{load_peak / 2**20:.2f} MiB"],
+        ])
+        nodes = list(graph.adjacency)
+        index = {node: i for i, node in enumerate(nodes)}
+        rng = random.Random(args.seed)
+        rows = []
+        for query in range(args.queries):
+            start, goal = rng.sample(nodes, 2)
+            problems = {
+                "objects": GraphRoutingProblem(start, goal, graph.adjacency, graph.reverse_adjacency),
+                "csr": CSRGraphRoutingProblem(index[start], index[goal], csr.graph),
+                "csr file": CSRGraphRoutingProblem(index[start], index[goal], loaded.graph),
+            }
+            for representation, problem in problems.items():
+                for name, search in searches.items():
+                    solution, elapsed, _ = measure(search, problem, trace_memory=False)
+                    fetch_recorded_calls(GraphRoutingProblem.get_actions) # Drop the recorded traversal
+                    cost = "-" if solution is None else f"{solution_cost(problem, solution):.3f}"
+                    rows.append([query, representation, name, cost, fetch_search_statistics().expanded, f"{elapsed:.3f} s"])
+        print_table(["query", "representation", "search", "cost", "expanded", "time"], rows)
+        loaded.graph.close()
+
+# Remove the nodes of a random graph that are inside "count" random disks (lakes), so the shortest paths have to go around them
+# The radius of every lake is "radius" times the side of the graph
+def carve_lakes(problem, count: int, radius: float, seed: int):
+    from graph import GraphRoutingProblem
+    rng = random.Random(seed)
+    side = math.sqrt(len(problem.adjacency))
+    lakes = [(rng.uniform(0, side), rng.uniform(0, side)) for _ in range(count)]
+    dry = lambda node: all((node.position.x - x)**2 + (node.position.y - y)**2 > (radius * side)**2 for x, y in lakes)
+    adjacency = {node: [other for other in adjacent if dry(other)] for node, adjacent in problem.adjacency.items() if dry(node)}
+    start, goal = list(adjacency)[:2]
+    return GraphRoutingProblem(start, goal, adjacency)
+
+# Compare the ALT heuristic (see graph_landmarks.py) against the straight-line distance (graphrouting_heuristic)
+# on the CSR representation of a random graph with lakes
+def landmarks_benchmark(args: argparse.Namespace):
+    from search import AStarSearch, BidirectionalAStarSearch, fetch_search_statistics
+    from graph import CSRGraphRoutingProblem, graphrouting_heuristic
+    from graph_landmarks import LandmarkHeuristic
+    graph, elapsed, _ = measure(random_graph, args.size, args.degree, args.seed, trace_memory=False)
+    graph = carve_lakes(graph, args.lakes, args.radius, args.seed)
+    csr = CSRGraphRoutingProblem.from_problem(graph)
+    print(f"Generated a graph with {csr.graph.node_count} nodes and {csr.graph.edge_count} edges in {elapsed:.3f} s")
+    landmarks, elapsed, peak = measure(LandmarkHeuristic.build, csr, args.landmarks, args.seed)
+    print(f"Selected {len(landmarks.landmarks)} landmarks in {elapsed:.3f} s (peak memory {peak / 2**20:.2f} MiB)")
+    heuristics = {"euclidean": graphrouting_heuristic, f"alt ({len(landmarks.landmarks)})": landmarks}
+    if args.active:
+        heuristics[f"alt ({args.active} active)"] = LandmarkHeuristic(csr, landmarks.landmarks, landmarks.forward, landmarks.backward, args.active)
+    searches = {"astar": AStarSearch, "bi-astar": BidirectionalAStarSearch}
+    rng = random.Random(args.seed)
+    rows = []
+    for query in range(args.queries):
+        start, goal = rng.sample(range(csr.graph.node_count), 2)
+        problem = CSRGraphRoutingProblem(start, goal, csr.graph)
+        for name, search in searches.items():
+            for heuristic_name, heuristic in heuristics.items():
+                solution, elapsed, _ = measure(search, problem, start, heuristic, trace_memory=False)
+                cost = "-" if solution is None else f"{solution_cost(problem, solution):.3f}"
+                rows.append([query, name, heuristic_name, cost, fetch_search_statistics().expanded, f"{elapsed:.3f} s"])
+    print_table(["query", "search", "heuristic", "cost", "expanded", "time"], rows)
+
+# Build the pattern database of every level (in a temporary directory) and compare A* with the strong heuristic
+# and with the pattern database in both modes (the build and load times are reported separately)
+def pdb_benchmark(args: argparse.Namespace):
+    import os, tempfile
+    from search import AStarSearch, fetch_search_statistics
+    from sokoban_heuristic import strong_heuristic
+    from sokoban_pdb import PatternDatabase, write_pattern_database
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for index, (path, text) in enumerate(read_levels(args.files)):
+            problem = SokobanProblem.from_text(text)
+            database_path = os.path.join(directory, f"{index}.pdb")
+            _, build_time, _ = measure(write_pattern_database, database_path, problem.layout, args.size, trace_memory=False)
+            size = f"{os.path.getsize(database_path) / 2**10:.1f} KiB"
+            for name in ["strong", "pdb max", "pdb additive"]:
+                problem = SokobanProblem.from_text(text)
+                load_time = 0
+                if name == "strong":
+                    heuristic = strong_heuristic
+                else:
+                    heuristic, load_time, _ = measure(PatternDatabase, database_path, problem.layout, name == "pdb additive", trace_memory=False)
+                solution, elapsed, _ = measure(AStarSearch, problem, problem.get_initial_state(), heuristic, trace_memory=False)
+                length = "-" if solution is None else len(solution)
+                build = f"{build_time:.3f} s ({size})" if name != "strong" else "-"
+                load = f"{load_time * 1000:.2f} ms" if name != "strong" else "-"
+                rows.append([path, name, build, load, length, fetch_search_statistics().expanded, f"{elapsed:.3f} s"])
+                if name != "strong": heuristic.close()
+    print_table(["file", "heuristic", "build", "load", "solution", "expanded", "time"], rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the search algorithms")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    memory_parser = subparsers.add_parser("memory", help="compare the peak memory of the node table against the baseline search that copies the path into every node")
+    memory_parser.add_argument("files", nargs="*", default=DEFAULT_FILES, help="the sokoban levels and parking lots to solve")
+    memory_parser.add_argument("--agent", "-a", default="astar", choices=list(ALGORITHMS), help="the search algorithm")
+    memory_parser.add_argument("--time-limit", "-t", type=float, default=None,
+                               help="stop a search after this many seconds and report the peak memory it reached (the baseline takes hours on level4)")
+    memory_parser.set_defaults(run=memory_benchmark)
+
+    frontier_parser = subparsers.add_parser("frontier", help="compare the expanded nodes per second of the frontier engines")
+    frontier_parser.add_argument("files", nargs="*", default=DEFAULT_FILES, help="the sokoban levels and parking lots to solve")
+    frontier_parser.add_argument("--agent", "-a", default="ucs", choices=list(ALGORITHMS), help="the search algorithm")
+    frontier_parser.set_defaults(run=frontier_benchmark)
+
+    bidirectional_parser = subparsers.add_parser("bidirectional", help="compare unidirectional and bidirectional search on random graphs")
+    bidirectional_parser.add_argument("--size", "-n", type=int, default=100000, help="the number of nodes in the graph")
+    bidirectional_parser.add_argument("--degree", "-d", type=int, default=3, help="the number of nearest nodes connected to each node")
+    bidirectional_parser.add_argument("--queries", "-q", type=int, default=5, help="the number of random start/goal pairs")
+    bidirectional_parser.add_argument("--seed", "-s", type=int, default=0, help="the random seed")
+    bidirectional_parser.set_defaults(run=bidirectional_benchmark)
+
+    graph_storage_parser = subparsers.add_parser("graph-storage", help="compare the graph objects and the CSR graph (in memory and memory-mapped) on a random graph")
+    graph_storage_parser.add_argument("--size", "-n", type=int, default=100000, help="the number of nodes in the graph")
+    graph_storage_parser.add_argument("--degree", "-d", type=int, default=3, help="the number of nearest nodes connected to each node")
+    graph_storage_parser.add_argument("--queries", "-q", type=int, default=3, help="the number of random start/goal pairs")
+    graph_storage_parser.add_argument("--seed", "-s", type=int, default=0, help="the random seed")
+    graph_storage_parser.set_defaults(run=graph_storage_benchmark)
+
+    landmarks_parser = subparsers.add_parser("landmarks", help="compare the ALT heuristic and the straight-line distance on a random graph with lakes")
+    landmarks_parser.add_argument("--size", "-n", type=int, default=20000, help="the number of nodes in the graph (before carving the lakes)")
+    landmarks_parser.add_argument("--degree", "-d", type=int, default=3, help="the number of nearest nodes connected to each node")
+    landmarks_parser.add_argument("--lakes", "-l", type=int, default=8, help="the number of lakes (disks without nodes)")
+    landmarks_parser.add_argument("--radius", "-r", type=float, default=0.1, help="the radius of the lakes relative to the side of the graph")
+    landmarks_parser.add_argument("--landmarks", "-k", type=int, default=8, help="the number of landmarks")
+    landmarks_parser.add_argument("--active", "-a", type=int, default=2, help="also run ALT with only this many landmarks per query (0 to skip)")
+    landmarks_parser.add_argument("--queries", "-q", type=int, default=5, help="the number of random start/goal pairs")
+    landmarks_parser.add_argument("--seed", "-s", type=int, default=0, help="the random seed")
+    landmarks_parser.set_defaults(run=landmarks_benchmark)
+
+    parallel_parser = subparsers.add_parser("parallel", help="compare the speed of the serial A* and the parallel hash distributed A*")
+    parallel_parser.add_argument("files", nargs="*", default=sorted(glob.glob("levels/level*.txt")), help="the sokoban levels and parking lots to solve")
+    parallel_parser.add_argument("--workers", "-w", type=int, nargs="+", default=[1, 2, 4, 8], help="the numbers of workers to try")
+    parallel_parser.add_argument("--batch", "-b", type=int, default=64, help="the number of expansions between two sends")
+    parallel_parser.set_defaults(run=parallel_benchmark)
+
+    bitboard_parser = subparsers.add_parser("bitboard", help="compare the expanded nodes per second of the point and bitboard sokoban encodings")
+    bitboard_parser.add_argument("files", nargs="*", default=sorted(glob.glob("levels/level*.txt")), help="the sokoban levels to solve")
+    bitboard_parser.add_argument("--agent", "-a", default="astar", choices=list(ALGORITHMS), help="the search algorithm")
+    bitboard_parser.set_defaults(run=bitboard_benchmark)
+
+    zobrist_parser = subparsers.add_parser("zobrist", help="compare explored sets of sokoban states against sets of their zobrist keys")
+    zobrist_parser.add_argument("files", nargs="*", default=sorted(glob.glob("levels/level*.txt")), help="the sokoban levels to solve")
+    zobrist_parser.add_argument("--agent", "-a", default="astar", choices=list(ALGORITHMS), help="the search algorithm")
+    zobrist_parser.add_argument("--memory", "-m", action="store_true", help="trace the peak memory (this slows down the search)")
+    zobrist_parser.set_defaults(run=zobrist_benchmark)
+
+    from sokoban_deadlocks import PUSH_FILTERS
+    deadlocks_parser = subparsers.add_parser("deadlocks", help="compare the expanded nodes with and without the sokoban deadlock filters")
+    deadlocks_parser.add_argument("files", nargs="*", default=sorted(glob.glob("levels/level*.txt")), help="the sokoban levels (or level collections) to solve")
+    deadlocks_parser.add_argument("--agent", "-a", default="astar", choices=list(ALGORITHMS), help="the search algorithm")
+    deadlocks_parser.add_argument("--filters", "-f", nargs="+", default=list(PUSH_FILTERS), choices=list(PUSH_FILTERS), help="the push filters to compare")
+    deadlocks_parser.set_defaults(run=deadlocks_benchmark)
+
+    push_parser = subparsers.add_parser("push", help="compare the step-level and the push-level sokoban problems")
+    push_parser.add_argument("files", nargs="*", default=sorted(glob.glob("levels/level*.txt")), help="the sokoban levels (or level collections) to solve")
+    push_parser.add_argument("--agent", "-a", default="bfs", choices=["bfs", "dfs", "ucs"], help="the search algorithm")
+    push_parser.set_defaults(run=push_benchmark)
+
+    macros_parser = subparsers.add_parser("macros", help="compare the push-level sokoban problem with and without the tunnel and goal-room macros")
+    macros_parser.add_argument("files", nargs="*", default=sorted(glob.glob("levels/level*.txt")), help="the sokoban levels (or level collections) to solve")
+    macros_parser.add_argument("--agent", "-a", default="ucs", choices=["ucs", "dfs"], help="the search algorithm")
+    macros_parser.set_defaults(run=macros_benchmark)
+
+    heuristics_parser = subparsers.add_parser("heuristics", help="compare the expanded nodes and the time of A* with the sokoban heuristics")
+    heuristics_parser.add_argument("files", nargs="*", default=sorted(glob.glob("levels/level*.txt")), help="the sokoban levels (or level collections) to solve")
+    heuristics_parser.add_argument("--heuristics", "-hf", nargs="+", default=["weak", "strong"], choices=["weak", "strong"], help="the heuristics to compare")
+    heuristics_parser.set_defaults(run=heuristics_benchmark)
+
+    lazy_parser = subparsers.add_parser("lazy", help="compare A* with the maximum of the heuristics and the lazy A* with the same heuristics")
+    lazy_parser.add_argument("files", nargs="*", default=sorted(glob.glob("levels/level*.txt")), help="the sokoban levels (or level collections) to solve")
+    lazy_parser.add_argument("--heuristics", "-hf", nargs="+", default=["weak", "strong"], choices=["weak", "strong"], help="the heuristics from the cheapest to the most expensive")
+    lazy_parser.set_defaults(run=lazy_benchmark)
+
+    parking_parser = subparsers.add_parser("parking", help="compare the speed of the parking problem with packed states and with tuple states")
+    parking_parser.add_argument("files", nargs="*", default=sorted(glob.glob("parks/park*.txt")), help="the parking lots to solve")
+    parking_parser.add_argument("--agent", "-a", default="ucs", choices=list(ALGORITHMS), help="the search algorithm (without a heuristic)")
+    parking_parser.add_argument("--random", "-r", type=int, default=3, help="the number of random parking lots to solve too")
+    parking_parser.add_argument("--size", "-n", type=int, default=8, help="the width and height of the random parking lots")
+    parking_parser.add_argument("--cars", "-c", type=int, default=4, help="the number of cars in the random parking lots")
+    parking_parser.set_defaults(run=parking_benchmark)
+
+    parking_heuristic_parser = subparsers.add_parser("parking-heuristic", help="compare the expanded nodes of UCS and A* with the parking heuristic")
+    parking_heuristic_parser.add_argument("files", nargs="*", default=sorted(glob.glob("parks/park*.txt")), help="the parking lots to solve")
+    parking_heuristic_parser.add_argument("--random", "-r", type=int, default=3, help="the number of random parking lots to solve too")
+    parking_heuristic_parser.add_argument("--size", "-n", type=int, default=8, help="the width and height of the random parking lots")
+    parking_heuristic_parser.add_argument("--cars", "-c", type=int, default=4, help="the number of cars in the random parking lots")
+    parking_heuristic_parser.set_defaults(run=parking_heuristic_benchmark)
+
+    cbs_parser = subparsers.add_parser("cbs", help="compare the joint A* search and the conflict-based search on parking lots")
+    cbs_parser.add_argument("files", nargs="*", default=sorted(glob.glob("parks/park*.txt")), help="the parking lots to solve")
+    cbs_parser.add_argument("--random", "-r", type=int, default=3, help="the number of random parking lots to solve too")
+    cbs_parser.add_argument("--size", "-n", type=int, default=8, help="the width and height of the random parking lots")
+    cbs_parser.add_argument("--cars", "-c", type=int, default=6, help="the number of cars in the random parking lots")
+    cbs_parser.add_argument("--walls", "-w", type=float, default=0.25, help="the probability that an inner cell of a random lot is a wall")
+    cbs_parser.add_argument("--weights", nargs="+", type=float, default=[1.0, 1.5],
+                            help="the weights of the conflict-based search (1 is optimal, a larger weight bounds the suboptimality)")
+    cbs_parser.add_argument("--merge-bound", "-m", type=float, default=4, help="the number of conflicts after which two cars are merged")
+    cbs_parser.add_argument("--max-nodes", type=int, default=100000, help="the maximum number of constraint tree nodes")
+    cbs_parser.add_argument("--skip-astar", action="store_true", default=False, help="do not run the joint A* search (it can be very slow on large lots)")
+    cbs_parser.set_defaults(run=cbs_benchmark)
+
+    scaling_parser = subparsers.add_parser("scaling", help="measure the expanded nodes and the time of the search on random instances of growing sizes")
+    scaling_parser.add_argument("kind", choices=["sokoban", "parking"], help="the kind of instances to generate")
+    scaling_parser.add_argument("--agent", "-a", default="astar", choices=list(ALGORITHMS), help="the search algorithm")
+    scaling_parser.add_argument("--sizes", "-n", type=int, nargs="+", default=[5, 6, 7, 8], help="the widths (and heights) of the instances")
+    scaling_parser.add_argument("--count", "-c", type=int, default=2, help="the number of crates or cars")
+    scaling_parser.add_argument("--walls", "-w", type=float, default=0.2, help="the probability that an inner cell is a wall")
+    scaling_parser.add_argument("--instances", "-i", type=int, default=3, help="the number of instances of every size")
+    scaling_parser.add_argument("--seed", "-s", type=int, default=0, help="the seed of the first instance of every size")
+    scaling_parser.add_argument("--csv", default=None, help="write the results to this CSV file")
+    scaling_parser.add_argument("--plot", default=None, help="plot the results to this image file (needs matplotlib)")
+    scaling_parser.set_defaults(run=scaling_benchmark)
+
+    pdb_parser = subparsers.add_parser("pdb", help="compare A* with the strong heuristic and with the sokoban pattern databases")
+    pdb_parser.add_argument("files", nargs="*", default=sorted(glob.glob("levels/level*.txt")), help="the sokoban levels (or level collections) to solve")
+    pdb_parser.add_argument("--size", "-k", type=int, default=2, help="the number of crates in the largest group of the pattern databases")
+    pdb_parser.set_defaults(run=pdb_benchmark)
+
+    args = parser.parse_args()
+    try:
+        args.run(args)
+    except KeyboardInterrupt:
+        print("Goodbye!!")
@@ -0,0 +1,267 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Generic, Iterator, List, Optional, Tuple
+from collections import deque
+import heapq
+
+from problem import S
+
+# This file contains the frontier data structures used by the graph search
+# A frontier stores at most one entry per state, so membership tests are O(1) dictionary lookups.
+# Every entry has a cost and the frontier pops the entry with the lowest cost first.
+# Entries with equal costs are popped in the order they were pushed (first in, first out),
+# which is the same order we would get by adding an increasing index to every pushed entry.
+
+class Frontier(ABC, Generic[S]):
+    # Push a state with the given cost and node (any data the search wants to get back on pop)
+    # If the state is already in the frontier, the entry is only replaced if the new cost is lower (decrease-key).
+    # Returns True if the state was inserted or its entry was replaced, and False otherwise.
+    @abstractmethod
+    def push(self, state: S, cost: float, node: Any) -> bool:
+        pass
+
+    # Remove and return the (cost, state, node) with the lowest cost
+    @abstractmethod
+    def pop(self) -> Tuple[float, S, Any]:
+        pass
+
+    # Returns the cost of the entry stored for the given state
+    @abstractmethod
+    def cost(self, state: S) -> float:
+        pass
+
+    # Returns the lowest cost in the frontier (without removing its entry)
+    @abstractmethod
+    def peek(self) -> float:
+        pass
+
+    # Iterates over the states in the frontier (in no particular order)
+    def __iter__(self) -> Iterator[S]:
+        return iter(self.entries)
+
+    @abstractmethod
+    def __contains__(self, state: S) -> bool:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+# A binary heap paired with a dictionary that maps each state to its entry (handle) inside the heap.
+# Since heapq does not support removing an item from the middle of the heap,
+# a decrease-key marks the old entry as stale and pushes a new one.
+# Stale entries are skipped when they reach the top of the heap,
+# and the heap is compacted once the stale entries outnumber the live ones.
+class HeapFrontier(Frontier[S]):
+    # The minimum number of stale entries before we consider compacting the heap
+    COMPACTION_THRESHOLD = 1024
+
+    def __init__(self) -> None:
+        super().__init__()
+        # Each entry is a list [cost, order, state, node, alive]
+        # The order is unique, so the heap never compares states or nodes
+        self.heap: List[list] = []
+        self.entries: Dict[S, list] = {}
+        self.order = 0
+        # Statistics
+        self.pushes = 0         # Number of entries inserted into the heap (including decrease-keys)
+        self.decreases = 0      # Number of decrease-key operations
+        self.stale = 0          # Number of stale entries currently inside the heap
+        self.discarded = 0      # Number of stale entries that were removed from the heap
+        self.compactions = 0    # Number of times the heap was rebuilt to get rid of the stale entries
+
+    def push(self, state: S, cost: float, node: Any) -> bool:
+        entry = self.entries.get(state)
+        if entry is not None:
+            if cost >= entry[0]: return False
+            # Decrease-key: the old entry is invalidated and left in the heap
+            entry[4] = False
+            self.stale += 1
+            self.decreases += 1
+        entry = [cost, self.order, state, node, True]
+        self.order += 1
+        self.entries[state] = entry
+        heapq.heappush(self.heap, entry)
+        self.pushes += 1
+        if self.stale > self.COMPACTION_THRESHOLD and self.stale > len(self.entries):
+            self.compact()
+        return True
+
+    def pop(self) -> Tuple[float, S, Any]:
+        heap = self.heap
+        entry = heapq.heappop(heap)
+        while not entry[4]:
+            self.stale -= 1
+            self.discarded += 1
+            entry = heapq.heappop(heap)
+        del self.entries[entry[2]]
+        return entry[0], entry[2], entry[3]
+
+    def cost(self, state: S) -> float:
+        return self.entries[state][0]
+
+    def peek(self) -> float:
+        heap = self.heap
+        while not heap[0][4]:
+            heapq.heappop(heap)
+            self.stale -= 1
+            self.discarded += 1
+        return heap[0][0]
+
+    # Rebuild the heap from the live entries only
+    def compact(self) -> None:
+        self.discarded += self.stale
+        self.heap = [entry for entry in self.heap if entry[4]]
+        heapq.heapify(self.heap)
+        self.stale = 0
+        self.compactions += 1
+
+    def __contains__(self, state: S) -> bool:
+        return state in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+# Dial's bucket queue for problems where all the costs are integers.
+# Every cost has a bucket (a FIFO queue) and we keep a cursor at the lowest cost that could contain an entry.
+# Pushing is O(1) and popping is O(1) amortized as long as the costs increase by small steps (as in UCS with small action costs),
+# since the cursor only moves forward over a few empty buckets between pops.
+class BucketFrontier(Frontier[S]):
+    def __init__(self) -> None:
+        super().__init__()
+        # Each entry is a list [cost, state, node, alive]
+        self.buckets: Dict[int, deque] = {}
+        self.entries: Dict[S, list] = {}
+        self.cursor: Optional[int] = None
+        # Statistics
+        self.pushes = 0
+        self.decreases = 0
+        self.stale = 0
+        self.discarded = 0
+
+    def push(self, state: S, cost: float, node: Any) -> bool:
+        key = int(cost)
+        if key != cost:
+            raise ValueError(f"BucketFrontier only supports integer costs, got {cost}")
+        entry = self.entries.get(state)
+        if entry is not None:
+            if cost >= entry[0]: return False
+            entry[3] = False
+            self.stale += 1
+            self.decreases += 1
+        entry = [cost, state, node, True]
+        self.entries[state] = entry
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = deque()
+        bucket.append(entry)
+        if self.cursor is None or key < self.cursor:
+            self.cursor = key
+        self.pushes += 1
+        return True
+
+    # Move the cursor to the first bucket with a live entry and return this bucket
+    def first_bucket(self) -> deque:
+        buckets = self.buckets
+        while True:
+            bucket = buckets.get(self.cursor)
+            if not bucket:
+                # The bucket is empty, remove it and move the cursor to the next cost
+                if bucket is not None: del buckets[self.cursor]
+                self.cursor += 1
+            elif not bucket[0][3]:
+                bucket.popleft()
+                self.stale -= 1
+                self.discarded += 1
+            else:
+                return bucket
+
+    def pop(self) -> Tuple[float, S, Any]:
+        entry = self.first_bucket().popleft()
+        del self.entries[entry[1]]
+        return entry[0], entry[1], entry[2]
+
+    def peek(self) -> float:
+        return self.first_bucket()[0][0]
+
+    def cost(self, state: S) -> float:
+        return self.entries[state][0]
+
+    def __contains__(self, state: S) -> bool:
+        return state in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+# A two-level bucket queue that supports any cost (integers or floats).
+# The bottom level is a FIFO bucket for every distinct cost in the frontier,
+# and the top level is a binary heap containing the distinct costs only.
+# So pushing to an existing bucket is O(1), and the heap operations are O(log K) where K is the number of distinct costs,
+# which stays small when the costs are integers or sums of a few distinct values (e.g. A* with integer costs and heuristics).
+class TwoLevelBucketFrontier(Frontier[S]):
+    def __init__(self) -> None:
+        super().__init__()
+        # Each entry is a list [cost, state, node, alive]
+        self.buckets: Dict[float, deque] = {}
+        self.keys: List[float] = []
+        self.entries: Dict[S, list] = {}
+        # Statistics
+        self.pushes = 0
+        self.decreases = 0
+        self.stale = 0
+        self.discarded = 0
+
+    def push(self, state: S, cost: float, node: Any) -> bool:
+        entry = self.entries.get(state)
+        if entry is not None:
+            if cost >= entry[0]: return False
+            entry[3] = False
+            self.stale += 1
+            self.decreases += 1
+        entry = [cost, state, node, True]
+        self.entries[state] = entry
+        bucket = self.buckets.get(cost)
+        if bucket is None:
+            bucket = self.buckets[cost] = deque()
+            heapq.heappush(self.keys, cost)
+        bucket.append(entry)
+        self.pushes += 1
+        return True
+
+    # Remove the empty buckets and the stale entries from the front and return the first bucket with a live entry
+    def first_bucket(self) -> deque:
+        buckets, keys = self.buckets, self.keys
+        while True:
+            bucket = buckets[keys[0]]
+            if not bucket:
+                # The bucket is empty, remove it and its cost from the heap
+                del buckets[heapq.heappop(keys)]
+            elif not bucket[0][3]:
+                bucket.popleft()
+                self.stale -= 1
+                self.discarded += 1
+            else:
+                return bucket
+
+    def pop(self) -> Tuple[float, S, Any]:
+        entry = self.first_bucket().popleft()
+        del self.entries[entry[1]]
+        return entry[0], entry[1], entry[2]
+
+    def peek(self) -> float:
+        return self.first_bucket()[0][0]
+
+    def cost(self, state: S) -> float:
+        return self.entries[state][0]
+
+    def __contains__(self, state: S) -> bool:
+        return state in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+# The available frontier engines (used by the command line tools to select an engine by name)
+FRONTIERS: Dict[str, Callable[[], Frontier]] = {
+    "heap": HeapFrontier,
+    "bucket": BucketFrontier,
+    "two-level": TwoLevelBucketFrontier,
+}
@@ -0,0 +1,158 @@
+from typing import List, Optional, Set
+from collections import deque
+import argparse, os, random
+
+from mathutils import Direction, Point
+from sokoban import SokobanTile
+
+# This file contains generators of random solvable Sokoban levels and parking lots (for scaling benchmarks)
+# Both generators build a random room first: a grid surrounded by walls where every inner cell is a wall with the probability "wall_density",
+# then only the largest connected area of the room is kept (the rest is filled with walls).
+# The instances are solvable by construction since they are generated by playing backwards from a goal configuration:
+#   Sokoban: the crates start on the goals and the player pulls them (a pull is the reverse of a push),
+#            so the pushes that undo the pulls are a solution of the generated level.
+#   Parking: the cars start on their slots and move randomly (every move of a car to an empty cell can be undone),
+#            until no car stands on a slot.
+# The generators are seeded, so the same arguments always give the same instance,
+# and they return the text formats read by SokobanProblem.from_text and ParkingProblem.from_text.
+
+# The maximum number of rooms drawn before giving up (a room can be too small for the requested crates or cars)
+MAX_ATTEMPTS = 1000
+
+# Returns the cells of the largest connected area of a random room (or an empty set if the room is full of walls)
+def random_room(rng: random.Random, width: int, height: int, wall_density: float) -> Set[Point]:
+    cells = {Point(x, y) for y in range(1, height - 1) for x in range(1, width - 1) if rng.random() >= wall_density}
+    best: Set[Point] = set()
+    remaining = set(cells)
+    while remaining:
+        start = min(remaining, key=lambda position: (position.y, position.x))
+        area, queue = {start}, deque([start])
+        while queue:
+            position = queue.popleft()
+            for direction in Direction:
+                neighbor = position + direction.to_vector()
+                if neighbor in remaining and neighbor not in area:
+                    area.add(neighbor)
+                    queue.append(neighbor)
+        remaining -= area
+        if len(area) > len(best): best = area
+    return best
+
+# Returns the cells that the player can walk to without moving any crate
+def walkable_area(cells: Set[Point], crates: Set[Point], player: Point) -> Set[Point]:
+    area, queue = {player}, deque([player])
+    while queue:
+        position = queue.popleft()
+        for direction in Direction:
+            neighbor = position + direction.to_vector()
+            if neighbor in cells and neighbor not in crates and neighbor not in area:
+                area.add(neighbor)
+                queue.append(neighbor)
+    return area
+
+# Returns the cells sorted from top to bottom then from left to right (so the random choices do not depend on the set order)
+def sorted_cells(cells: Set[Point]) -> List[Point]:
+    return sorted(cells, key=lambda position: (position.y, position.x))
+
+# Generate a solvable sokoban level with the given size (including the outer walls) and number of crates
+# The crates are pulled "pulls" times in total (by default 5 times per crate) starting from the goals
+def generate_sokoban(width: int, height: int, crates: int, wall_density: float = 0.2, seed: int = 0,
+                     pulls: Optional[int] = None) -> str:
+    rng = random.Random(seed)
+    if pulls is None: pulls = 5 * crates
+    for _ in range(MAX_ATTEMPTS):
+        cells = random_room(rng, width, height, wall_density)
+        if len(cells) < 2 * crates + 2: continue
+        goals = set(rng.sample(sorted_cells(cells), crates))
+        boxes = set(goals)
+        player = rng.choice(sorted_cells(cells - boxes))
+        done = 0
+        while done < pulls:
+            # A pull moves a crate from "crate" to the cell of the player ("target") and the player one more cell away ("after")
+            area = walkable_area(cells, boxes, player)
+            candidates = []
+            for crate in sorted_cells(boxes):
+                for direction in Direction:
+                    vector = direction.to_vector()
+                    target, after = crate + vector, crate + vector + vector
+                    if target in area and after in cells and after not in boxes:
+                        candidates.append((crate, target, after))
+            if not candidates: break
+            crate, target, after = rng.choice(candidates)
+            boxes = (boxes - {crate}) | {target}
+            player = after
+            done += 1
+        # The level is not interesting if the pulls left every crate on a goal
+        if boxes == goals: continue
+        # The player can start anywhere it can walk to from the cell where the pulls ended
+        player = rng.choice(sorted_cells(walkable_area(cells, boxes, player)))
+        def tile(position: Point) -> str:
+            if position not in cells: return SokobanTile.WALL
+            goal = position in goals
+            if position == player: return SokobanTile.PLAYER_ON_GOAL if goal else SokobanTile.PLAYER
+            if position in boxes: return SokobanTile.CRATE_ON_GOAL if goal else SokobanTile.CRATE
+            return SokobanTile.GOAL if goal else SokobanTile.EMPTY
+        return "\n".join("".join(tile(Point(x, y)) for x in range(width)) for y in range(height)) + "\n"
+    raise ValueError(f"Could not generate a {width}x{height} sokoban level with {crates} crates (the wall density may be too high)")
+
+# Generate a solvable parking lot with the given size (including the outer walls) and number of cars (at most 10)
+# The cars make "moves" random moves in total (by default 10 moves per car) then keep moving until no car is on a slot
+def generate_parking(width: int, height: int, cars: int, wall_density: float = 0.2, seed: int = 0,
+                     moves: Optional[int] = None) -> str:
+    if not 1 <= cars <= 10: raise ValueError("The number of cars must be between 1 and 10")
+    rng = random.Random(seed)
+    if moves is None: moves = 10 * cars
+    for _ in range(MAX_ATTEMPTS):
+        cells = random_room(rng, width, height, wall_density)
+        # Every car needs a slot and a cell that is not a slot, and one more free cell to move
+        if len(cells) < 2 * cars + 1: continue
+        slots = rng.sample(sorted_cells(cells), cars)
+        slot_cells = set(slots)
+        positions = list(slots)
+        for step in range(moves + 100 * len(cells)):
+            if step >= moves and slot_cells.isdisjoint(positions): break
+            occupied = set(positions)
+            candidates = [(i, position + direction.to_vector()) for i, position in enumerate(positions) for direction in Direction
+                          if position + direction.to_vector() in cells and position + direction.to_vector() not in occupied]
+            if not candidates: break
+            i, target = rng.choice(candidates)
+            positions[i] = target
+        # The text format cannot show a car on a slot, so the lot is discarded if a car is still on a slot
+        if not slot_cells.isdisjoint(positions): continue
+        def tile(position: Point) -> str:
+            if position not in cells: return "#"
+            if position in positions: return chr(ord('A') + positions.index(position))
+            if position in slot_cells: return str(slots.index(position))
+            return "."
+        return "\n".join("".join(tile(Point(x, y)) for x in range(width)) for y in range(height)) + "\n"
+    raise ValueError(f"Could not generate a {width}x{height} parking lot with {cars} cars (the wall density may be too high)")
+
+if __name__ == "__main__":
+    # Generate random instances, for example:
+    #   python generators.py sokoban --width 10 --height 8 --count 3 --seed 1 --output levels/random.txt
+    #   python generators.py parking --width 9 --height 5 --count 2 --instances 5 --output parks/random
+    parser = argparse.ArgumentParser(description="Generate random solvable sokoban levels or parking lots")
+    parser.add_argument("kind", choices=["sokoban", "parking"], help="the kind of instance to generate")
+    parser.add_argument("--width", "-W", type=int, default=8, help="the width of the instance (including the outer walls)")
+    parser.add_argument("--height", "-H", type=int, default=8, help="the height of the instance (including the outer walls)")
+    parser.add_argument("--count", "-n", type=int, default=2, help="the number of crates or cars")
+    parser.add_argument("--walls", "-w", type=float, default=0.2, help="the probability that an inner cell is a wall")
+    parser.add_argument("--moves", "-m", type=int, default=None, help="the number of pulls (sokoban) or car moves (parking) played backwards from the goal")
+    parser.add_argument("--seed", "-s", type=int, default=0, help="the seed of the first instance (the next instances use the next seeds)")
+    parser.add_argument("--instances", "-i", type=int, default=1, help="the number of instances to generate")
+    parser.add_argument("--output", "-o", default=None,
+                        help="the file to write the instance to (or the directory if there are many instances), defaults to the standard output")
+    args = parser.parse_args()
+
+    generate = generate_sokoban if args.kind == "sokoban" else generate_parking
+    for seed in range(args.seed, args.seed + args.instances):
+        text = generate(args.width, args.height, args.count, args.walls, seed, args.moves)
+        if args.output is None:
+            print(text)
+            continue
+        path = args.output
+        if args.instances > 1:
+            os.makedirs(args.output, exist_ok=True)
+            path = os.path.join(args.output, f"{args.kind}_{args.width}x{args.height}_{args.count}_{seed}.txt")
+        with open(path, "w") as f:
+            f.write(text)
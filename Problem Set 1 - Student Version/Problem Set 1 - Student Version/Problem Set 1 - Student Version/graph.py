@@ -1,10 +1,11 @@
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from dataclasses import dataclass
-import json
+from array import array
+import argparse, json, math, mmap, struct, sys
 
 from problem import Problem
 from mathutils import Point, euclidean_distance
-from helpers.utils import record_calls
+from helpers.utils import record_calls, record_calls_as
 
 # In the graph routing problem, the state is a graph node
 # We use dataclass with frozen=True to automatically implement:
@@ -20,12 +21,15 @@ class GraphNode:
         return self.name
 
 # This is the implementation of the graph routing problem
+# The reverse adjacency maps every node to the nodes that have an edge to it (it is built from the adjacency if not given)
 class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
-    def __init__(self, start: GraphNode, goal: GraphNode, adjacency: Dict[GraphNode, List[GraphNode]]) -> None:
+    def __init__(self, start: GraphNode, goal: GraphNode, adjacency: Dict[GraphNode, List[GraphNode]],
+                 reverse_adjacency: Optional[Dict[GraphNode, List[GraphNode]]] = None) -> None:
         super().__init__()
         self.start = start
         self.goal = goal
         self.adjacency = adjacency
+        self.reverse_adjacency = reverse_adjacency if reverse_adjacency is not None else build_reverse_adjacency(adjacency)
     
     def get_initial_state(self) -> GraphNode:
         return self.start
@@ -47,9 +51,32 @@ class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
     def get_cost(self, state: GraphNode, action: GraphNode) -> float:
         return euclidean_distance(state.position, action.position)
     
+    # The successors are the neighboring nodes (both the action and the next state) with the distance to each of them
+    # We record the calls as calls to "get_actions" so that the traversal order is still tracked
+    @record_calls_as(get_actions)
+    def get_successors(self, state: GraphNode) -> List[Tuple[GraphNode, GraphNode, float]]:
+        position = state.position
+        return [(node, node, euclidean_distance(position, node.position)) for node in self.adjacency.get(state, [])]
+    
+    # Returns the problem of going back from the goal to the given state (the start by default) over the reversed edges
+    # Since the cost of an edge is the distance between its nodes, the reversed edges have the same costs
+    def reverse(self, state: Optional[GraphNode] = None) -> 'GraphRoutingProblem':
+        return GraphRoutingProblem(self.goal, self.start if state is None else state, self.reverse_adjacency, self.adjacency)
+
+    # Returns the straight-line distance between two states
+    def distance(self, state: GraphNode, other: GraphNode) -> float:
+        return euclidean_distance(state.position, other.position)
+
+    # Returns the graph node of a state (the states of this problem are already graph nodes)
+    def node(self, state: GraphNode) -> GraphNode:
+        return state
+    
     # Read a graph routing problem from file
+    # The file is either in the JSON format or in the binary CSR format (see write_csr_graph), which is loaded as a CSRGraphRoutingProblem
     @staticmethod
     def from_file(path: str) -> 'GraphRoutingProblem':
+        with open(path, 'rb') as f:
+            if f.read(len(CSR_MAGIC)) == CSR_MAGIC: return CSRGraphRoutingProblem.from_file(path)
         problem_def: Dict[str, Dict] = json.load(open(path, 'r'))
         graph_def: Dict[str, Dict] = problem_def.get("graph", {})
         node_dict = {name: GraphNode(name, Point(*item.get("position", [0,0]))) for name, item in graph_def.items()}
@@ -60,7 +87,228 @@ class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
             adjacency[node] = adjacent
         start = node_dict[problem_def.get("start", "")]
         goal = node_dict[problem_def.get("goal", "")]
-        return GraphRoutingProblem(start, goal, adjacency)
+        return GraphRoutingProblem(start, goal, adjacency, build_reverse_adjacency(adjacency))
+
+# Build the reverse adjacency (for every node, the list of nodes that have an edge to it)
+def build_reverse_adjacency(adjacency: Dict[GraphNode, List[GraphNode]]) -> Dict[GraphNode, List[GraphNode]]:
+    reverse_adjacency: Dict[GraphNode, List[GraphNode]] = {node: [] for node in adjacency}
+    for node, adjacent in adjacency.items():
+        for other in adjacent:
+            reverse_adjacency.setdefault(other, []).append(node)
+    return reverse_adjacency
 
 def graphrouting_heuristic(problem: GraphRoutingProblem, state: GraphNode) -> float:
-    return euclidean_distance(state.position, problem.goal.position)
\ No newline at end of file
+    return problem.distance(state, problem.goal)
+
+# The compressed sparse row (CSR) representation of a graph for large graphs (e.g. road networks)
+# The nodes are numbered from 0 to n - 1 and the graph is stored in flat arrays instead of objects:
+#   x[i], y[i]: the position of node i
+#   offsets: the edges of node i are the edges from offsets[i] to offsets[i + 1] - 1 (so there are n + 1 offsets)
+#   targets[e], weights[e]: the node that edge e leads to and the cost of the edge (the distance between its nodes)
+#   name_offsets, names: the name of node i is the UTF-8 text from name_offsets[i] to name_offsets[i + 1] - 1 of "names"
+# The arrays are either Python arrays (built in memory) or memoryviews of a memory-mapped binary file (see CSRGraph.load),
+# so a graph file is loaded without parsing it and only the pages that the search visits are read.
+class CSRGraph:
+    def __init__(self, x: Sequence[float], y: Sequence[float], offsets: Sequence[int], targets: Sequence[int],
+                 weights: Sequence[float], name_offsets: Sequence[int], names: bytes, data: Optional[mmap.mmap] = None) -> None:
+        self.x = x
+        self.y = y
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.name_offsets = name_offsets
+        self.names = names
+        self.data = data # the memory map of the file (if the graph was loaded from a file)
+        self.numbers: Optional[Dict[str, int]] = None # the number of every node name (see find)
+        self.transposed: Optional[CSRGraph] = None    # the graph with the reversed edges (see transpose)
+
+    # Build a graph from the names, the positions and the adjacency lists (adjacency[i] contains the nodes that node i has edges to)
+    # The cost of every edge is the euclidean distance between its nodes
+    @staticmethod
+    def build(names: List[str], positions: List[Tuple[float, float]], adjacency: List[List[int]]) -> 'CSRGraph':
+        x, y = array('d', (position[0] for position in positions)), array('d', (position[1] for position in positions))
+        offsets, targets, weights = array('q', [0]), array('i'), array('d')
+        for node, adjacent in enumerate(adjacency):
+            for other in adjacent:
+                dx, dy = x[node] - x[other], y[node] - y[other]
+                targets.append(other)
+                weights.append(math.sqrt(dx * dx + dy * dy))
+            offsets.append(len(targets))
+        encoded = [name.encode() for name in names]
+        name_offsets = array('q', [0])
+        for name in encoded: name_offsets.append(name_offsets[-1] + len(name))
+        return CSRGraph(x, y, offsets, targets, weights, name_offsets, b"".join(encoded))
+
+    # Build a graph from the adjacency of a GraphRoutingProblem (the nodes are numbered in the order of the adjacency)
+    # Returns the graph and the number of every node
+    @staticmethod
+    def from_adjacency(adjacency: Dict[GraphNode, List[GraphNode]]) -> Tuple['CSRGraph', Dict[GraphNode, int]]:
+        index = {node: i for i, node in enumerate(adjacency)}
+        for adjacent in adjacency.values():
+            for other in adjacent:
+                if other not in index: index[other] = len(index)
+        nodes = list(index)
+        graph = CSRGraph.build([node.name for node in nodes], [(node.position.x, node.position.y) for node in nodes],
+                               [[index[other] for other in adjacency.get(node, [])] for node in nodes])
+        return graph, index
+
+    @property
+    def node_count(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    # Returns the name of a node
+    def name(self, node: int) -> str:
+        return bytes(self.names[self.name_offsets[node]:self.name_offsets[node + 1]]).decode()
+
+    # Returns the number of the node with the given name (the names are searched once and the numbers are kept)
+    def find(self, name: str) -> int:
+        if self.numbers is None:
+            self.numbers = {self.name(node): node for node in range(self.node_count)}
+        return self.numbers[name]
+
+    # Returns the graph with the reversed edges (the same costs), it is built once and kept for the next calls
+    # The edges to every node are grouped by counting them first, and the edges keep the order of their sources
+    def transpose(self) -> 'CSRGraph':
+        if self.transposed is not None: return self.transposed
+        counts = [0] * (self.node_count + 1)
+        for target in self.targets: counts[target + 1] += 1
+        for node in range(self.node_count): counts[node + 1] += counts[node]
+        offsets = array('q', counts)
+        targets, weights = array('i', bytes(4 * self.edge_count)), array('d', bytes(8 * self.edge_count))
+        for node in range(self.node_count):
+            for edge in range(self.offsets[node], self.offsets[node + 1]):
+                target = self.targets[edge]
+                position = counts[target]
+                counts[target] += 1
+                targets[position] = node
+                weights[position] = self.weights[edge]
+        self.transposed = CSRGraph(self.x, self.y, offsets, targets, weights, self.name_offsets, self.names, self.data)
+        self.transposed.transposed = self
+        return self.transposed
+
+    # Load a graph from a binary file (see write_csr_graph) using mmap
+    # Returns the graph and the numbers of the start and goal nodes
+    @staticmethod
+    def load(path: str) -> Tuple['CSRGraph', int, int]:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, little_endian, nodes, edges, start, goal, names = CSR_HEADER.unpack_from(data, 0)
+        if magic != CSR_MAGIC or version != CSR_VERSION:
+            raise ValueError(f"{path} is not a binary graph file")
+        if little_endian != (sys.byteorder == "little"):
+            raise ValueError(f"{path} was written on a machine with another byte order")
+        view, offset = memoryview(data), CSR_HEADER.size
+        # Every section is read in place as an array of the given type (the sections with 8 byte items come first to keep them aligned)
+        def section(typecode: str, count: int) -> memoryview:
+            nonlocal offset
+            size = struct.calcsize(typecode) * count
+            result = view[offset:offset + size].cast(typecode)
+            offset += size
+            return result
+        x, y = section('d', nodes), section('d', nodes)
+        offsets, weights, name_offsets = section('q', nodes + 1), section('d', edges), section('q', nodes + 1)
+        targets = section('i', edges)
+        return CSRGraph(x, y, offsets, targets, weights, name_offsets, view[offset:offset + names], data), start, goal
+
+    # Release the memory map (the arrays of the graph cannot be used after closing it)
+    def close(self) -> None:
+        if self.data is not None:
+            for values in (self.x, self.y, self.offsets, self.targets, self.weights, self.name_offsets, self.names):
+                if isinstance(values, memoryview): values.release()
+            self.data.close()
+            self.data = None
+
+# The header of a binary graph file: magic, version, little endian (1) or big endian (0),
+# number of nodes, number of edges, start node, goal node, size of the names in bytes
+# It is followed by the arrays: x, y (doubles), offsets (64-bit), weights (doubles), name offsets (64-bit), targets (32-bit), names (UTF-8)
+CSR_HEADER = struct.Struct("<4sHHqqqqq")
+CSR_MAGIC = b"CSRG"
+CSR_VERSION = 1
+
+# Write a graph and its start and goal nodes to a binary file
+def write_csr_graph(path: str, graph: CSRGraph, start: int, goal: int) -> None:
+    with open(path, 'wb') as f:
+        f.write(CSR_HEADER.pack(CSR_MAGIC, CSR_VERSION, sys.byteorder == "little", graph.node_count, graph.edge_count,
+                                start, goal, len(graph.names)))
+        for values in (graph.x, graph.y, graph.offsets, graph.weights, graph.name_offsets, graph.targets, graph.names):
+            f.write(values)
+
+# Convert a graph routing problem from the JSON format to the binary format
+# The JSON file is read directly into flat lists (without creating a GraphNode for every node)
+# and the edges of every node are sorted by name like in GraphRoutingProblem.from_file, so the searches visit the nodes in the same order
+def convert_graph(json_path: str, binary_path: str) -> CSRGraph:
+    problem_def: Dict[str, Dict] = json.load(open(json_path, 'r'))
+    graph_def: Dict[str, Dict] = problem_def.get("graph", {})
+    index = {name: i for i, name in enumerate(graph_def)}
+    positions = [tuple(item.get("position", [0, 0])) for item in graph_def.values()]
+    adjacency = [[index[adjacent] for adjacent in sorted(item.get("adjacent", [])) if adjacent in index] for item in graph_def.values()]
+    graph = CSRGraph.build(list(graph_def), positions, adjacency)
+    write_csr_graph(binary_path, graph, index[problem_def.get("start", "")], index[problem_def.get("goal", "")])
+    return graph
+
+# This is the graph routing problem on a CSR graph
+# The states and the actions are the numbers of the nodes (instead of GraphNode objects), so the search API is the same
+# and the heuristics of GraphRoutingProblem work with both representations (see GraphRoutingProblem.distance)
+# The calls are not recorded (unlike GraphRoutingProblem) since the recorded calls of a large graph would fill the memory
+class CSRGraphRoutingProblem(GraphRoutingProblem):
+    def __init__(self, start: int, goal: int, graph: CSRGraph, reverse_graph: Optional[CSRGraph] = None) -> None:
+        Problem.__init__(self)
+        self.start = start
+        self.goal = goal
+        self.graph = graph
+        self.reverse_graph = reverse_graph
+
+    def get_actions(self, state: int) -> Iterable[int]:
+        offsets = self.graph.offsets
+        return self.graph.targets[offsets[state]:offsets[state + 1]].tolist()
+
+    # The cost of an action is the weight of the edge from the state to the action
+    def get_cost(self, state: int, action: int) -> float:
+        graph = self.graph
+        for edge in range(graph.offsets[state], graph.offsets[state + 1]):
+            if graph.targets[edge] == action: return graph.weights[edge]
+        raise Exception(f"There is no edge from {graph.name(state)} to {graph.name(action)}")
+
+    def get_successors(self, state: int) -> List[Tuple[int, int, float]]:
+        graph = self.graph
+        begin, end = graph.offsets[state], graph.offsets[state + 1]
+        return [(target, target, weight) for target, weight in zip(graph.targets[begin:end], graph.weights[begin:end])]
+
+    # The reversed graph is only built if a search needs it (e.g. the bidirectional search)
+    def reverse(self, state: Optional[int] = None) -> 'CSRGraphRoutingProblem':
+        if self.reverse_graph is None: self.reverse_graph = self.graph.transpose()
+        return CSRGraphRoutingProblem(self.goal, self.start if state is None else state, self.reverse_graph, self.graph)
+
+    def distance(self, state: int, other: int) -> float:
+        x, y = self.graph.x, self.graph.y
+        dx, dy = x[state] - x[other], y[state] - y[other]
+        return math.sqrt(dx * dx + dy * dy)
+
+    def node(self, state: int) -> GraphNode:
+        return GraphNode(self.graph.name(state), Point(self.graph.x[state], self.graph.y[state]))
+
+    # Build the problem on the CSR representation of a GraphRoutingProblem
+    @staticmethod
+    def from_problem(problem: GraphRoutingProblem) -> 'CSRGraphRoutingProblem':
+        graph, index = CSRGraph.from_adjacency(problem.adjacency)
+        return CSRGraphRoutingProblem(index[problem.start], index[problem.goal], graph)
+
+    # Read a graph routing problem from a binary file (see write_csr_graph)
+    @staticmethod
+    def from_file(path: str) -> 'CSRGraphRoutingProblem':
+        graph, start, goal = CSRGraph.load(path)
+        return CSRGraphRoutingProblem(start, goal, graph)
+
+if __name__ == "__main__":
+    # Convert a graph routing problem from JSON to the binary format, for example:
+    #   python graph.py graphs/graph1.json graph1.csr
+    parser = argparse.ArgumentParser(description="Convert a graph routing problem from the JSON format to the binary CSR format")
+    parser.add_argument("input", help="path to the JSON graph")
+    parser.add_argument("output", help="path to the binary graph")
+    args = parser.parse_args()
+    graph = convert_graph(args.input, args.output)
+    print(f"Wrote {args.output}: {graph.node_count} nodes and {graph.edge_count} edges")
\ No newline at end of file
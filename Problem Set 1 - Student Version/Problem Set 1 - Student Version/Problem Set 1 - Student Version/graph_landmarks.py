@@ -0,0 +1,196 @@
+from typing import List, Optional, Sequence, Tuple
+from array import array
+import argparse, heapq, mmap, random, struct, sys, time
+
+from graph import CSRGraph, CSRGraphRoutingProblem, GraphRoutingProblem
+
+# This file contains the ALT heuristic (A*, Landmarks and the Triangle inequality) for the graph routing problem
+# The straight-line distance (graphrouting_heuristic) is a weak lower bound when the roads have to go around obstacles,
+# so we precompute the shortest distances from and to a few nodes (the landmarks) and use the triangle inequality:
+#   d(L, t) <= d(L, v) + d(v, t)  so  d(v, t) >= d(L, t) - d(L, v)
+#   d(v, L) <= d(v, t) + d(t, L)  so  d(v, t) >= d(v, L) - d(t, L)
+# The heuristic is the maximum of these bounds over the landmarks (and 0), it is admissible and consistent
+# since every bound is a difference of shortest distances (and the maximum of consistent heuristics is consistent).
+#
+# The landmarks are selected by the farthest point method: the first landmark is the farthest node from a random node,
+# then every new landmark is the node whose round trip distance to the closest landmark is the largest,
+# so the landmarks are spread on the border of the graph (where they give the best bounds).
+# The distances are computed by Dijkstra on the CSR representation of the graph (see graph.CSRGraph)
+# and stored in flat arrays of doubles that can be written to a binary file and loaded with mmap:
+#   the header (see HEADER) followed by the landmarks (64-bit), then for every landmark the distances from it, then the distances to it
+
+# The header: magic, version, little endian (1) or big endian (0), number of nodes, number of edges, number of landmarks
+HEADER = struct.Struct("<4sHHqqq")
+MAGIC = b"ALTL"
+VERSION = 1
+
+INFINITY = float('inf')
+
+# Returns the shortest distances from the source to every node of the graph (infinity if a node cannot be reached)
+def shortest_distances(graph: CSRGraph, source: int) -> array:
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    distances = array('d', [INFINITY]) * graph.node_count
+    distances[source] = 0.0
+    queue = [(0.0, source)]
+    while queue:
+        distance, node = heapq.heappop(queue)
+        if distance > distances[node]: continue
+        for edge in range(offsets[node], offsets[node + 1]):
+            target, target_distance = targets[edge], distance + weights[edge]
+            if target_distance < distances[target]:
+                distances[target] = target_distance
+                heapq.heappush(queue, (target_distance, target))
+    return distances
+
+# Select "count" landmarks by the farthest point method and compute their distances
+# Returns the landmarks, the distances from every landmark and the distances to every landmark (on the reversed edges)
+# There are fewer landmarks if the component of the first landmark has fewer nodes
+def build_landmarks(graph: CSRGraph, count: int, seed: int = 0) -> Tuple[List[int], List[array], List[array]]:
+    landmarks, forward, backward = [], [], []
+    if graph.node_count == 0: return landmarks, forward, backward
+    reverse_graph = graph.transpose()
+    # The first landmark is the farthest reachable node from a random node
+    distances = shortest_distances(graph, random.Random(seed).randrange(graph.node_count))
+    candidate = max(range(graph.node_count), key=lambda node: distances[node] if distances[node] != INFINITY else -1.0)
+    # closest[v] is the round trip distance from v to its closest landmark
+    # The nodes without a round trip to the landmarks (e.g. in another component) are never picked, since their bounds would be useless here
+    closest = array('d', [INFINITY]) * graph.node_count
+    while len(landmarks) < count:
+        landmarks.append(candidate)
+        forward.append(shortest_distances(graph, candidate))
+        backward.append(shortest_distances(reverse_graph, candidate))
+        for node, (from_landmark, to_landmark) in enumerate(zip(forward[-1], backward[-1])):
+            closest[node] = min(closest[node], from_landmark + to_landmark)
+        candidate = max(range(graph.node_count), key=lambda node: closest[node] if closest[node] != INFINITY else -1.0)
+        # Every node that has a round trip to the landmarks is a landmark already
+        if closest[candidate] <= 0: break
+    return landmarks, forward, backward
+
+# Select the landmarks of the graph and write them with their distances to a binary file
+# Returns the landmarks
+def write_landmarks(path: str, graph: CSRGraph, count: int, seed: int = 0) -> List[int]:
+    landmarks, forward, backward = build_landmarks(graph, count, seed)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, sys.byteorder == "little", graph.node_count, graph.edge_count, len(landmarks)))
+        f.write(array('q', landmarks))
+        for distances in forward + backward:
+            f.write(distances)
+    return landmarks
+
+# The ALT heuristic of a graph routing problem (with either representation, see graph.CSRGraphRoutingProblem)
+# It can be called as a heuristic function: heuristic(problem, state)
+# It also works on the reversed problem (see GraphRoutingProblem.reverse) since the distances from a landmark on the reversed edges
+# are the distances to it, so it can be used by the bidirectional searches too.
+# If "active" is given, only the "active" landmarks that give the best bound at the start of the problem are used
+# (the landmarks are chosen once per start and goal, so the heuristic stays consistent and gets cheaper to compute)
+class LandmarkHeuristic:
+    def __init__(self, problem: GraphRoutingProblem, landmarks: Sequence[int], forward: Sequence[Sequence[float]],
+                 backward: Sequence[Sequence[float]], active: Optional[int] = None, data: Optional[mmap.mmap] = None) -> None:
+        self.landmarks = landmarks
+        self.forward = forward
+        self.backward = backward
+        self.active = active
+        self.data = data # the memory map of the file (if the landmarks were loaded from a file)
+        # The heuristic works on integer node numbers, so the graph nodes of a GraphRoutingProblem are numbered like CSRGraph.from_adjacency
+        if isinstance(problem, CSRGraphRoutingProblem):
+            self.graph, self.index = problem.graph, None
+            self.edges = problem.graph
+        else:
+            self.graph, self.index = CSRGraph.from_adjacency(problem.adjacency)
+            self.edges, self.reverse_edges = problem.adjacency, problem.reverse_adjacency
+        # The bound terms of the last problem: (edges, goal, start) -> [(distances from landmark, distances to landmark, d(L, goal), d(goal, L))]
+        self.key: Optional[Tuple] = None
+        self.terms: List[Tuple[Sequence[float], Sequence[float], float, float]] = []
+
+    # Select the landmarks and compute their distances for the graph of the problem
+    @staticmethod
+    def build(problem: GraphRoutingProblem, count: int = 8, seed: int = 0, active: Optional[int] = None) -> 'LandmarkHeuristic':
+        heuristic = LandmarkHeuristic(problem, [], [], [], active)
+        heuristic.landmarks, heuristic.forward, heuristic.backward = build_landmarks(heuristic.graph, count, seed)
+        return heuristic
+
+    # Load the landmarks of the graph of the problem from a binary file (see write_landmarks) using mmap
+    @staticmethod
+    def load(path: str, problem: GraphRoutingProblem, active: Optional[int] = None) -> 'LandmarkHeuristic':
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, little_endian, nodes, edges, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a landmarks file")
+        if little_endian != (sys.byteorder == "little"):
+            raise ValueError(f"{path} was written on a machine with another byte order")
+        heuristic = LandmarkHeuristic(problem, [], [], [], active, data)
+        if nodes != heuristic.graph.node_count or edges != heuristic.graph.edge_count:
+            raise ValueError(f"The landmarks {path} were built for another graph")
+        view = memoryview(data)[HEADER.size:]
+        heuristic.landmarks = view[:8 * count].cast('q')
+        distances = [view[8 * count + 8 * nodes * i:8 * count + 8 * nodes * (i + 1)].cast('d') for i in range(2 * count)]
+        heuristic.forward, heuristic.backward = distances[:count], distances[count:]
+        return heuristic
+
+    # Returns the number of a state in the graph of the heuristic
+    def number(self, state) -> int:
+        return state if self.index is None else self.index[state]
+
+    # Returns the bound terms for the problem (they are computed once for every start and goal)
+    def terms_of(self, problem: GraphRoutingProblem) -> List[Tuple[Sequence[float], Sequence[float], float, float]]:
+        edges = problem.graph if isinstance(problem, CSRGraphRoutingProblem) else problem.adjacency
+        key = (id(edges), problem.goal, problem.start)
+        if key == self.key: return self.terms
+        if edges is self.edges:
+            forward, backward = self.forward, self.backward
+        elif edges is (self.graph.transposed if self.index is None else self.reverse_edges):
+            # On the reversed edges, the distances from a landmark are the distances to it in the original graph
+            forward, backward = self.backward, self.forward
+        else:
+            raise ValueError("The landmarks were built for another graph")
+        goal = self.number(problem.goal)
+        terms = [(from_landmark, to_landmark, from_landmark[goal], to_landmark[goal])
+                 for from_landmark, to_landmark in zip(forward, backward)]
+        if self.active is not None and self.active < len(terms):
+            start = self.number(problem.start)
+            terms.sort(key=lambda term: -LandmarkHeuristic.bound([term], start))
+            terms = terms[:self.active]
+        self.key, self.terms = key, terms
+        return terms
+
+    # Returns the best lower bound on the distance from the node to the goal given by the terms
+    # A bound is only used if the distance it subtracts is finite (if it is infinite, the landmark tells nothing about the node)
+    # and it is infinite if the node cannot reach the goal (e.g. the landmark reaches the node but not the goal)
+    @staticmethod
+    def bound(terms: List[Tuple[Sequence[float], Sequence[float], float, float]], node: int) -> float:
+        value = 0.0
+        for from_landmark, to_landmark, landmark_goal, goal_landmark in terms:
+            landmark_node = from_landmark[node]
+            if landmark_node != INFINITY and landmark_goal - landmark_node > value:
+                value = landmark_goal - landmark_node
+            if goal_landmark != INFINITY and to_landmark[node] - goal_landmark > value:
+                value = to_landmark[node] - goal_landmark
+        return value
+
+    def __call__(self, problem: GraphRoutingProblem, state) -> float:
+        return LandmarkHeuristic.bound(self.terms_of(problem), self.number(state))
+
+    # Release the memory map (the heuristic cannot be used after closing it)
+    def close(self) -> None:
+        if self.data is not None:
+            for values in [self.landmarks, *self.forward, *self.backward]:
+                if isinstance(values, memoryview): values.release()
+            self.data.close()
+            self.data = None
+
+if __name__ == "__main__":
+    # Select the landmarks of a graph (in the JSON or the binary format) and write their distances, for example:
+    #   python graph_landmarks.py graphs/graph1.json --count 4 --output graph1.alt
+    parser = argparse.ArgumentParser(description="Select the landmarks of a graph routing problem and write their distances")
+    parser.add_argument("graph", help="path to the graph (JSON or binary CSR)")
+    parser.add_argument("--count", "-k", type=int, default=8, help="the number of landmarks")
+    parser.add_argument("--seed", "-s", type=int, default=0, help="the seed of the random node that the selection starts from")
+    parser.add_argument("--output", "-o", default=None, help="path to the landmarks file (defaults to the graph path with the extension .alt)")
+    args = parser.parse_args()
+    output: str = args.output or args.graph.rsplit(".", 1)[0] + ".alt"
+    problem = GraphRoutingProblem.from_file(args.graph)
+    graph = problem.graph if isinstance(problem, CSRGraphRoutingProblem) else CSRGraph.from_adjacency(problem.adjacency)[0]
+    start = time.time()
+    landmarks = write_landmarks(output, graph, args.count, args.seed)
+    print(f"Wrote {output}: {len(landmarks)} landmarks for {graph.node_count} nodes in {time.time() - start:.2f} seconds")
@@ -4,7 +4,7 @@ from graph import GraphRoutingProblem, graphrouting_heuristic
 from sokoban import SokobanProblem, Direction
 from problem import A, S, Problem
 from .utils import Result, fetch_recorded_calls, fetch_tracked_call_count, load_function
-from .heuristic_checks import InconsistentHeuristicException, test_heuristic_consistency
+from .heuristic_checks import InconsistentHeuristicException, test_heuristic_consistency, test_successors_consistency
 from functools import lru_cache
 import time
 
@@ -121,7 +121,9 @@ def test_sokoban_heuristic(
     fetch_tracked_call_count(SokobanProblem.get_actions)
     heuristic = lru_cache(2**16)(load_function("sokoban_heuristic.strong_heuristic"))
     original_get_successor = SokobanProblem.get_successor
+    original_get_successors = SokobanProblem.get_successors
     SokobanProblem.get_successor = test_heuristic_consistency(heuristic)(SokobanProblem.get_successor)
+    SokobanProblem.get_successors = test_successors_consistency(heuristic)(SokobanProblem.get_successors)
     search_fn = load_function(function_path)
     initial_state = problem.get_initial_state()
     message = ""
@@ -133,6 +135,7 @@ def test_sokoban_heuristic(
         return None, 1e10, message, 0
     finally:
         SokobanProblem.get_successor = original_get_successor
+        SokobanProblem.get_successors = original_get_successors
     elapsed = time.time() - start
     explored = fetch_tracked_call_count(SokobanProblem.get_actions)
     path_cost = None
@@ -48,6 +48,16 @@ def track_call_count(fn):
     deco.calls = 0
     return deco
 
+# Count the calls of the decorated function into the call counter of "tracked" (a function decorated with track_call_count)
+# This is useful when a function does the work of the tracked function (e.g., a batched version of it)
+def track_call_count_as(tracked):
+    def decorator(fn):
+        def deco(*args, **kwargs):
+            tracked.calls += 1
+            return fn(*args, **kwargs)
+        return deco
+    return decorator
+
 def fetch_tracked_call_count(fn):
     calls = getattr(fn, "calls", 0)
     setattr(fn, "calls", 0)
@@ -63,6 +73,18 @@ def record_calls(fn):
     deco.calls = deque()
     return deco
 
+# Record the calls of the decorated function into the call records of "recorded" (a function decorated with record_calls)
+def record_calls_as(recorded):
+    def decorator(fn):
+        def deco(*args, **kwargs):
+            recorded.calls.append({
+                "args": args,
+                "kwargs": kwargs
+            })
+            return fn(*args, **kwargs)
+        return deco
+    return decorator
+
 def fetch_recorded_calls(fn):
     calls = getattr(fn, "calls", deque())
     setattr(fn, "calls", deque())
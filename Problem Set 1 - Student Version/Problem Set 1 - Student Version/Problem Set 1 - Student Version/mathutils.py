@@ -31,6 +31,11 @@ class Point:
     # to unpack the Point class into its x and y components
     def __iter__(self) -> Iterator[int]:
         return iter((self.x, self.y))
+    
+    # Since the class is frozen, pickle cannot set its slots after creating it
+    # So we tell pickle to recreate the point by calling the constructor (this is needed to send points to other processes)
+    def __reduce__(self):
+        return (Point, (self.x, self.y))
 
 # This is a helper function to compute the manhattan distance between 2 points
 def manhattan_distance(p1: Point, p2: Point) -> int:
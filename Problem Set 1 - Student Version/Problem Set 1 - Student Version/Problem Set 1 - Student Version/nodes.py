@@ -0,0 +1,43 @@
+from array import array
+from typing import Generic, List
+
+from problem import A
+
+# This file contains the node stores used by the graph search
+# A node store remembers how every generated node was reached so that the solution can be retrieved once a goal is found.
+# The search only deals with the node handles returned by the store:
+#   root(h) returns the handle of the initial node
+#   add(parent, action, g, h) returns the handle of a child node reached from "parent" by applying "action"
+#   path(node) returns the list of actions from the initial state to the given node
+# Every node also stores its path cost (g) and its heuristic value (h) separately.
+
+# The node table stores a parent id, an action, a path cost and a heuristic value for every node in flat arrays.
+# Adding a node costs O(1) time and memory, and the path is rebuilt only once by following the parent ids.
+class NodeTable(Generic[A]):
+    def __init__(self) -> None:
+        self.parents = array('q')       # parents[i] is the id of the parent of node 'i' (-1 for the root)
+        self.actions: List[A] = []      # actions[i] is the action that was applied to the parent to reach node 'i'
+        self.g = array('d')             # g[i] is the path cost from the initial state to node 'i'
+        self.h = array('d')             # h[i] is the heuristic value of the state of node 'i'
+
+    def root(self, h: float = 0) -> int:
+        return self.add(-1, None, 0, h)
+
+    def add(self, parent: int, action: A, g: float = 0, h: float = 0) -> int:
+        self.parents.append(parent)
+        self.actions.append(action)
+        self.g.append(g)
+        self.h.append(h)
+        return len(self.actions) - 1
+
+    def path(self, node: int) -> List[A]:
+        parents, actions = self.parents, self.actions
+        path = []
+        while parents[node] != -1:
+            path.append(actions[node])
+            node = parents[node]
+        path.reverse()
+        return path
+
+    def __len__(self) -> int:
+        return len(self.actions)
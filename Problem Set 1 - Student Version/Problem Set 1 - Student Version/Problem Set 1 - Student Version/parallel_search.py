@@ -0,0 +1,212 @@
+from typing import Any, Dict, List, Optional
+import multiprocessing as mp
+import os, pickle, queue, time, traceback
+
+from problem import HeuristicFunction, Problem, S, A, Solution
+from frontier import HeapFrontier
+import search
+
+# This file contains a parallel A* search: Hash Distributed A* (HDA*)
+# Every state is owned by one worker process which is selected by the hash of the state.
+# Each worker runs A* on the states it owns with its own frontier and its own table of path costs:
+#   when a worker expands a state, it keeps the children it owns and sends the other children to their owners.
+# The children sent to the same worker are collected in a batch which is sent after every few expansions.
+# When a worker pops a goal, it reports it to the coordinator (the calling process) which broadcasts the best goal cost (the incumbent).
+# Since the workers do not expand the states in the global order of their cost, a state can be reached again with a lower path cost
+# after it was expanded, in which case it is expanded again. So the first goal is not necessarily optimal,
+# and the search only stops once no worker has a state in its frontier whose cost is lower than the incumbent
+# and no batch is still on its way to a worker (the termination check).
+# The termination check is done by the coordinator in waves: it asks every worker for its status
+# (whether it is idle and how many batches it sent and received) and the search is over once two consecutive waves
+# find every worker idle with the same counters and as many batches received as sent.
+# If the heuristic is admissible, the returned path is optimal.
+# If a worker raises an exception (e.g. in the heuristic), it sends the exception to the coordinator which raises it again,
+# and if a worker dies without sending anything (e.g. it is killed), the coordinator raises a RuntimeError instead of waiting forever.
+
+# The message types sent to the workers
+NODES, INCUMBENT, PROBE, TRACE, STOP = range(5)
+# The message types sent to the coordinator
+SOLUTION, STATUS, PARENT, ERROR = range(4)
+
+# The number of seconds the coordinator waits for a message before checking that the workers are still alive
+WORKER_CHECK_INTERVAL = 1.0
+
+# The owner of a state is selected by the hash of the state
+# Since the workers are forked from the coordinator, they all compute the same hash for equal states
+def owner_of(state: Any, workers: int) -> int:
+    return hash(state) % workers
+
+# The main function of a worker process
+# A message to a worker is a tuple whose first item is the message type:
+#   (NODES, sender, batch): a batch of children where each child is (packed state, path cost, packed parent, action)
+#   (INCUMBENT, cost): the cost of the best goal found so far
+#   (PROBE, wave): a request for the status of the worker
+#   (TRACE, packed state): a request for the parent of a state (to rebuild the path)
+#   (STOP,): the search is over
+# Any exception is sent to the coordinator as (ERROR, exception), or as a RuntimeError with the traceback if it cannot be pickled
+def HashDistributedWorker(index: int, problem: Problem[S, A], heuristic: HeuristicFunction, workers: int,
+                          inboxes: List[mp.Queue], results: mp.Queue, batch_size: int) -> None:
+    try:
+        HashDistributedWorkerLoop(index, problem, heuristic, workers, inboxes, results, batch_size)
+    except BaseException as error:
+        try:
+            pickle.dumps(error)
+        except Exception:
+            error = RuntimeError(f"Worker {index} failed:" + "\n" + traceback.format_exc())
+        results.put((ERROR, error))
+
+def HashDistributedWorkerLoop(index: int, problem: Problem[S, A], heuristic: HeuristicFunction, workers: int,
+                              inboxes: List[mp.Queue], results: mp.Queue, batch_size: int) -> None:
+    inbox = inboxes[index]
+    frontier = HeapFrontier()
+    # For every state we reached: [path cost, packed parent, action, owner of the parent]
+    table: Dict[S, list] = {}
+    heuristics: Dict[S, float] = {}
+    outboxes: List[list] = [[] for _ in range(workers)]
+    incumbent = float('inf')
+    sent = received = expanded = generated = 0
+
+    # Add a child to the frontier if it was not reached before with a lower or equal path cost
+    def add(state: S, g: float, parent: Any, action: A, parent_owner: int) -> None:
+        entry = table.get(state)
+        if entry is not None and entry[0] <= g: return
+        h = heuristics.get(state)
+        if h is None:
+            h = heuristics[state] = heuristic(problem, state)
+        # The child cannot lead to a goal cheaper than the incumbent
+        if g + h >= incumbent: return
+        table[state] = [g, parent, action, parent_owner]
+        frontier.push(state, g + h, None)
+
+    def is_idle() -> bool:
+        return not frontier or frontier.peek() >= incumbent
+
+    while True:
+        # Handle the received messages (and wait for a message if there is nothing to expand)
+        while True:
+            try:
+                message = inbox.get() if is_idle() else inbox.get_nowait()
+            except queue.Empty:
+                break
+            kind = message[0]
+            if kind == NODES:
+                received += 1
+                sender = message[1]
+                for packed, g, parent, action in message[2]:
+                    add(problem.unpack_state(packed), g, parent, action, sender)
+            elif kind == INCUMBENT:
+                incumbent = min(incumbent, message[1])
+            elif kind == PROBE:
+                results.put((STATUS, message[1], index, is_idle(), sent, received, expanded, generated))
+            elif kind == TRACE:
+                _, parent, action, parent_owner = table[problem.unpack_state(message[1])]
+                results.put((PARENT, parent, action, parent_owner))
+            elif kind == STOP:
+                return
+
+        # Expand a few states from the frontier
+        for _ in range(batch_size):
+            if is_idle(): break
+            _, state, _ = frontier.pop()
+            g = table[state][0]
+            if problem.is_goal(state):
+                # A goal is not expanded since any path through it to another goal costs more
+                if g < incumbent:
+                    incumbent = g
+                    results.put((SOLUTION, g, index, problem.pack_state(state)))
+                continue
+            expanded += 1
+            packed = problem.pack_state(state)
+            for action, child, step_cost in problem.get_successors(state):
+                generated += 1
+                owner = owner_of(child, workers)
+                if owner == index:
+                    add(child, g + step_cost, packed, action, index)
+                else:
+                    outboxes[owner].append((problem.pack_state(child), g + step_cost, packed, action))
+
+        # Send the batches, so no child is left in an outbox while the worker is idle
+        for owner, batch in enumerate(outboxes):
+            if batch:
+                inboxes[owner].put((NODES, index, batch))
+                outboxes[owner] = []
+                sent += 1
+
+# HashDistributedAStar
+# The number of workers defaults to the number of CPUs and the batch size is the number of expansions between two sends
+# The statistics of the search (search.fetch_search_statistics) contain the total number of expanded and generated nodes
+def HashDistributedAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+                         workers: Optional[int] = None, batch_size: int = 64) -> Solution:
+    statistics = search.last_statistics = search.SearchStatistics()
+    if problem.is_goal(initial_state): return []
+    workers = workers or os.cpu_count() or 1
+
+    # The workers must be forked so that they share the problem and compute the same hash for every state
+    context = mp.get_context("fork")
+    inboxes = [context.Queue() for _ in range(workers)]
+    results = context.Queue()
+    processes = [
+        context.Process(target=HashDistributedWorker, args=(index, problem, heuristic, workers, inboxes, results, batch_size), daemon=True)
+        for index in range(workers)
+    ]
+    for process in processes: process.start()
+
+    # Wait for the next message from the workers and raise the exception of a failed worker
+    def receive() -> tuple:
+        while True:
+            try:
+                message = results.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                if not all(process.is_alive() for process in processes):
+                    raise RuntimeError("A worker of the hash distributed A* died without reporting an error")
+                continue
+            if message[0] == ERROR: raise message[1]
+            return message
+
+    try:
+        # The initial state is sent to its owner as a batch from the coordinator (whose index is -1)
+        inboxes[owner_of(initial_state, workers)].put((NODES, -1, [(problem.pack_state(initial_state), 0, None, None)]))
+        coordinator_sent = 1
+
+        incumbent, goal, goal_owner = float('inf'), None, None
+        previous, wave = None, 0
+        while True:
+            # Ask every worker for its status (and broadcast every better goal cost while waiting for the replies)
+            wave += 1
+            for inbox in inboxes: inbox.put((PROBE, wave))
+            statuses = {}
+            while len(statuses) < workers:
+                message = receive()
+                if message[0] == SOLUTION:
+                    if message[1] < incumbent:
+                        incumbent, goal_owner, goal = message[1:]
+                        for inbox in inboxes: inbox.put((INCUMBENT, incumbent))
+                elif message[0] == STATUS and message[1] == wave:
+                    statuses[message[2]] = message[3:]
+            idle = all(status[0] for status in statuses.values())
+            counters = [(status[1], status[2]) for _, status in sorted(statuses.items())]
+            balanced = coordinator_sent + sum(sent for sent, _ in counters) == sum(received for _, received in counters)
+            if idle and balanced and counters == previous: break
+            previous = counters if idle and balanced else None
+            time.sleep(0.001)
+
+        statistics.expanded = sum(status[3] for status in statuses.values())
+        statistics.generated = sum(status[4] for status in statuses.values())
+        if goal is None: return None
+
+        # Rebuild the path by asking the owner of every state for its parent and the action that led to it
+        path = []
+        packed, owner = goal, goal_owner
+        while True:
+            inboxes[owner].put((TRACE, packed))
+            _, parent, action, parent_owner = receive()
+            if parent is None: break
+            path.append(action)
+            packed, owner = parent, parent_owner
+        path.reverse()
+        return path
+    finally:
+        for inbox in inboxes: inbox.put((STOP,))
+        for process in processes:
+            process.join(1)
+            if process.is_alive(): process.terminate()
@@ -1,10 +1,14 @@
 from typing import Any, Dict, Set, Tuple, List
+from collections import deque
 from problem import Problem
 from mathutils import Direction, Point
 from helpers.utils import NotImplemented
 
-#TODO: (Optional) Instead of Any, you can define a type for the parking state
-ParkingState = Any
+# ==> The parking state is packed into a single integer:
+# ==> the passages are numbered row by row (see ParkingProblem.cells) and the cell number of car 'i' is stored in the bits
+# ==> from i * cell_bits to (i + 1) * cell_bits - 1 of the state (see ParkingProblem.pack and ParkingProblem.unpack)
+# ==> So two states are equal (and have the same hash) if every car is on the same cell, and hashing a state is free
+ParkingState = int
 
 # An action of the parking problem is a tuple containing an index 'i' and a direction 'd' where car 'i' should move in the direction 'd'.
 ParkingAction = Tuple[int, Direction]
@@ -12,85 +16,145 @@ ParkingAction = Tuple[int, Direction]
 # This is the implementation of the parking problem
 class ParkingProblem(Problem[ParkingState, ParkingAction]):
     passages: Set[Point]    # A set of points which indicate where a car can be (in other words, every position except walls).
-    cars: Tuple[Point]      # A tuple of points where state[i] is the position of car 'i'. 
+    cars: Tuple[Point]      # A tuple of points where state[i] is the position of car 'i'.
     slots: Dict[Point, int] # A dictionary which indicate the index of the parking slot (if it is 'i' then it is the lot of car 'i') for every position.
                             # if a position does not contain a parking slot, it will not be in this dictionary.
     width: int              # The width of the parking lot.
     height: int             # The height of the parking lot.
+    integer_costs = True    # All the action costs are integers (from 1 to 126).
+
+    # ==> The tables computed once per problem (see build_tables)
+    cells: List[Point]      # ==> cells[c] is the position of the passage number 'c'
+    index: Dict[Point, int] # ==> index[position] is the number of the passage at this position
+    cell_bits: int          # ==> the number of bits used to store the cell of one car in the state
+    moves: List[List[Tuple[Tuple[ParkingAction, int, int, int], ...]]]
+                            # ==> moves[i][c] contains (action, target bit, cost, state delta) for every passage next to cell 'c'
+                            # ==> where the target bit is the bit of the target cell in the occupancy mask (1 << target)
+                            # ==> and the state delta is added to the state to move car 'i' from cell 'c' to the target
+    initial_state: ParkingState
+    goal: ParkingState      # ==> the state where every car is on its slot (or -1 if a car has no slot)
 
     # This function should return the initial state
     def get_initial_state(self) -> ParkingState:
-        # ==> Returns the initial state of the parking problem, which is represented by the positions of the cars.
-        return self.cars 
-    
+        # ==> Returns the initial state of the parking problem, which is the packed positions of the cars.
+        return self.initial_state
+
     # This function should return True if the given state is a goal. Otherwise, it should return False.
     def is_goal(self, state: ParkingState) -> bool:
+        # ==> There is only one goal state: every car is in its corresponding parking slot
+        return state == self.goal
+
+    # ==> Returns the cell numbers of the cars in the given state
+    def unpack(self, state: ParkingState) -> List[int]:
+        bits, mask = self.cell_bits, (1 << self.cell_bits) - 1
+        return [state >> (car * bits) & mask for car in range(len(self.cars))]
+
+    # ==> Returns the state where the cars are on the given positions
+    def pack(self, positions: Tuple[Point]) -> ParkingState:
+        return sum(self.index[position] << (car * self.cell_bits) for car, position in enumerate(positions))
+
+    # ==> Returns the positions of the cars in the given state (state[i] of the unpacked tuple is the position of car 'i')
+    def car_positions(self, state: ParkingState) -> Tuple[Point]:
+        cells = self.cells
+        return tuple(cells[cell] for cell in self.unpack(state))
 
-        # ==> For each car in the given state, we check if it is in a parking slot
-        for car_index, car_position in enumerate(state):
-            # ==> Checks if the car is in a parking slot
-            if car_position in self.slots:
-                # ==> Checks if the car is in its corresponding parking slot
-                if self.slots[car_position] != car_index: 
-                    return False
-            else: 
-                # ==> If the car is not in a parking slot, then the state is not a goal state
-                return False
-
-        # ==> If all cars are in their corresponding parking slots, then the state is a goal state
-        return True
-    
     # This function returns a list of all the possible actions that can be applied to the given state
     def get_actions(self, state: ParkingState) -> List[ParkingAction]:
+        cars = self.unpack(state)
 
-        actions : list = []
+        # ==> The occupancy mask of the state: bit 'c' is set if a car is on cell 'c'
+        occupied = 0
+        for cell in cars: occupied |= 1 << cell
 
-        # ==> For each car in the given state, we check if it can move in any direction
-        for car_index, car_position in enumerate(state):
-            # ==> For each direction, we check if the car can move in that direction
-            for direction in Direction:
-                new_car_position = car_position + direction.to_vector()
-                # ==> If the car is in its corresponding parking slot, then it cannot move
-                if new_car_position in state: continue 
-                # ==> If the car is not in a passage, then it cannot move
-                if new_car_position not in self.passages: continue 
-                # ==> If the car can move in that direction, then we add the action to the list of actions
-                actions.append((car_index, direction))
+        # ==> For each car, a move is possible if the passage next to it in that direction is not occupied
+        # ==> The moves table only contains the passages, so the moves into walls are never considered
+        actions : list = []
+        for car_index, cell in enumerate(cars):
+            for action, target_bit, _, _ in self.moves[car_index][cell]:
+                if occupied & target_bit: continue
+                actions.append(action)
 
         # ==> Returns the list of actions
         return actions
 
-    
     # This function returns a new state which is the result of applying the given action to the given state
     def get_successor(self, state: ParkingState, action: ParkingAction) -> ParkingState:
-        direction : Direction = action[1] 
-        new_state : list = list(state) 
+        car_index = action[0]
+        cell = state >> (car_index * self.cell_bits) & ((1 << self.cell_bits) - 1)
+
+        # ==> Returns the new state after applying the given action (the delta moves the car to the target cell)
+        for move, _, _, delta in self.moves[car_index][cell]:
+            if move[1] == action[1]: return state + delta
 
-        # ==> Returns the new state after applying the given action
-        new_state[action[0]] = state[action[0]] + direction.to_vector() 
+        # ==> If the car tries to move into a wall, then this action is wrong
+        raise Exception(f"Invalid action {action} in state:" + "\n" + str(self.car_positions(state)))
 
-        # ==> Returns the new state as a tuple
-        return tuple(new_state) 
-    
     # This function returns the cost of applying the given action to the given state
     def get_cost(self, state: ParkingState, action: ParkingAction) -> float:
         direction: Direction = action[1]
-        
+
         # ==> the new position of the car after applying the given action
-        new_car_position: Point = state[action[0]] + direction.to_vector()
+        cell = state >> (action[0] * self.cell_bits) & ((1 << self.cell_bits) - 1)
+        new_car_position: Point = self.cells[cell] + direction.to_vector()
 
-        # ==> The action cost depends on the rank of the employee whose car is moved by the action. 
-        # ==> The rank is A will cost 26 till Z whose action costs 1. 
-        # ==> if any action moves a car into another employee's parking slot, the action cost goes up by 100.                 
+        # ==> The action cost depends on the rank of the employee whose car is moved by the action.
+        # ==> The rank is A will cost 26 till Z whose action costs 1.
+        # ==> if any action moves a car into another employee's parking slot, the action cost goes up by 100.
 
-        if new_car_position in self.slots:  
+        if new_car_position in self.slots:
             # ==> If the car is not in its corresponding parking slot, then the action cost is 100 + 26 - action[0] , action[0] = 0 for A, 1 for B, etc.
-            if self.slots[new_car_position] != action[0]: 
+            if self.slots[new_car_position] != action[0]:
                 return 100 + 26 - action[0]
 
         # ==> If the car is in its corresponding parking slot, then the action cost is 26 - action[0] , action[0] = 0 for A, 1 for B, etc.
         return 26 - action[0]
-        
+
+    # This function returns a list of (action, successor, cost) for all the possible actions from the given state
+    # It does the work of "get_actions", "get_successor" and "get_cost" in one pass
+    def get_successors(self, state: ParkingState) -> List[Tuple[ParkingAction, ParkingState, float]]:
+        cars = self.unpack(state)
+        occupied = 0
+        for cell in cars: occupied |= 1 << cell
+
+        successors : list = []
+
+        # ==> For each car in the given state, we check if it can move in any direction
+        # ==> The cost (+100 if the car moves into another employee's parking slot) and the change of the state are precomputed
+        moves = self.moves
+        for car_index, cell in enumerate(cars):
+            for action, target_bit, cost, delta in moves[car_index][cell]:
+                # ==> The car cannot move into another car
+                if occupied & target_bit: continue
+                successors.append((action, state + delta, cost))
+
+        return successors
+
+    # ==> Compute the tables of the problem from its passages, cars and slots
+    # ==> The moves are stored in the same order as the directions, so the actions are in the same order as before the packing
+    def build_tables(self) -> None:
+        self.cells = sorted(self.passages, key=lambda position: (position.y, position.x))
+        self.index = {position: cell for cell, position in enumerate(self.cells)}
+        self.cell_bits = max(1, (len(self.cells) - 1).bit_length())
+        self.moves = []
+        for car_index in range(len(self.cars)):
+            shift = car_index * self.cell_bits
+            car_moves = []
+            for cell, position in enumerate(self.cells):
+                cell_moves = []
+                for direction in Direction:
+                    target = self.index.get(position + direction.to_vector())
+                    if target is None: continue
+                    cost = 26 - car_index
+                    if self.slots.get(self.cells[target], car_index) != car_index: cost += 100
+                    cell_moves.append(((car_index, direction), 1 << target, cost, (target - cell) << shift))
+                car_moves.append(tuple(cell_moves))
+            self.moves.append(car_moves)
+        self.initial_state = self.pack(self.cars)
+        # ==> The goal state exists only if every car has a slot
+        slots = {index: position for position, index in self.slots.items()}
+        self.goal = self.pack(tuple(slots[car_index] for car_index in range(len(self.cars)))) \
+            if all(car_index in slots for car_index in range(len(self.cars))) else -1
+
      # Read a parking problem from text containing a grid of tiles
     @staticmethod
     def from_text(text: str) -> 'ParkingProblem':
@@ -114,6 +178,7 @@ class ParkingProblem(Problem[ParkingState, ParkingAction]):
         problem.slots = {position:index for index, position in slots.items()}
         problem.width = width
         problem.height = height
+        problem.build_tables()
         return problem
 
     # Read a parking problem from file containing a grid of tiles
@@ -121,4 +186,40 @@ class ParkingProblem(Problem[ParkingState, ParkingAction]):
     def from_file(path: str) -> 'ParkingProblem':
         with open(path, 'r') as f:
             return ParkingProblem.from_text(f.read())
-    
+
+# ==> This function returns the weighted distance table of the problem: table[i][c] is the BFS distance from cell 'c' to the slot of car 'i'
+# ==> over the passages (ignoring the other cars) multiplied by the cost of a move of car 'i' (26 - i)
+# ==> The distance is infinite if car 'i' has no slot or its slot cannot be reached from the cell
+# ==> The table is computed once per problem and stored in problem.cache()
+def slot_distances(problem: ParkingProblem) -> List[List[float]]:
+    cache = problem.cache()
+    table = cache.get("slot_distances")
+    if table is None:
+        slots = {index: position for position, index in problem.slots.items()}
+        table = []
+        for car_index in range(len(problem.cars)):
+            distance = [float('inf')] * len(problem.cells)
+            if car_index in slots:
+                # ==> The moves table of the car gives the neighbors of every cell (the moves are reversible, so the BFS can start from the slot)
+                moves = problem.moves[car_index]
+                start = problem.index[slots[car_index]]
+                distance[start] = 0
+                queue = deque([start])
+                while queue:
+                    cell = queue.popleft()
+                    for _, target_bit, _, _ in moves[cell]:
+                        target = target_bit.bit_length() - 1
+                        if distance[target] != float('inf'): continue
+                        distance[target] = distance[cell] + 1
+                        queue.append(target)
+            table.append([value * (26 - car_index) for value in distance])
+        cache["slot_distances"] = table
+    return table
+
+# ==> This heuristic is the sum over the cars of the distance of the car to its slot multiplied by the cost of its moves (26 - i)
+# ==> It is admissible since every car has to make at least that many moves and each of its moves costs at least 26 - i
+# ==> (the other cars and the +100 penalty can only make it more expensive)
+# ==> It is consistent since a move changes the distance of only one car by at most one and costs at least the weight of this car
+def parking_heuristic(problem: ParkingProblem, state: ParkingState) -> float:
+    table = slot_distances(problem)
+    return sum(table[car_index][cell] for car_index, cell in enumerate(problem.unpack(state)))
@@ -0,0 +1,282 @@
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple, Union
+from dataclasses import dataclass
+import heapq
+
+from mathutils import Direction
+from problem import Problem, Solution
+from parking import ParkingAction, ParkingProblem, ParkingState, slot_distances
+import search
+
+# This file contains a conflict-based search (CBS) solver for the parking problem
+# The parking problem is a multi-agent path finding problem: every car has to reach its slot.
+# Instead of searching the joint states of all the cars, CBS plans every car on its own and resolves the conflicts between the plans:
+#   The plan of a car is a timeline of cells (the car can wait on its cell for free, and it stays on its slot once it arrives).
+#   Two plans conflict if two cars are on the same cell at the same time (vertex conflict)
+#   or if a car enters at time t the cell that another car left at time t (following conflict, which includes the swaps).
+#   The high level is a best-first search over a constraint tree: every node contains constraints "car i cannot be on cell c at time t",
+#   the optimal plan of every car under its constraints and the sum of their costs.
+#   The first conflict of a node is resolved by two children, each of them forbids one of the two cars from the conflicting cell at that time.
+# Since a car moves or waits at every time step and the plans have no conflicts, the moves of every time step can be applied
+# one car at a time in any order, so the plans give a list of parking actions with the same cost.
+# Conversely, every solution of the parking problem is a plan without conflicts (with one move per time step),
+# and the cost of a plan only depends on the moves (it is the same cost as ParkingProblem.get_cost).
+#
+# Since waiting is free, a conflict can be pushed to a later time step without changing the costs, again and again
+# (for example when two cars have to pass each other in a narrow lane), so the constraint tree can have infinitely many nodes with the same cost.
+# So once two cars conflicted "merge_bound" times, they are merged into a group that is planned jointly (as in meta-agent CBS)
+# and the constraint tree is searched again from its root. The cars of a group move during the same time steps without conflicts between them.
+# Every expanded node with a conflict counts a conflict between two cars, so the search expands a finite number of nodes
+# before it finds a solution or the constraint tree runs out of nodes (then there is no solution).
+# In the worst case all the cars are merged into one group, and planning this group is a joint search like ParkingProblem.
+
+# A constraint forbids a car from being on a cell at a time step
+Constraint = Tuple[int, int]
+# The state of the problem of a group of cars is the cells of the cars (in the order of the group), the time step
+# and the cells at the start of the time step of the cars that already moved during this time step (see GroupProblem)
+GroupState = Tuple[Tuple[int, ...], int, Tuple[int, ...]]
+# An action of a group moves the next car of the group in a direction or lets it wait (None)
+# After the last time step (see GroupProblem), an action is a parking action
+GroupAction = Union[Optional[Direction], ParkingAction]
+
+# This class contains the statistics of the last conflict-based search
+@dataclass
+class CBSStatistics:
+    expanded: int = 0           # the number of expanded constraint tree nodes
+    generated: int = 0          # the number of generated constraint tree nodes
+    low_level_expanded: int = 0 # the number of states expanded while planning the groups of cars
+    merges: int = 0             # the number of times two groups of cars were merged
+
+last_cbs_statistics = CBSStatistics()
+
+# This function returns the statistics of the last conflict-based search
+def fetch_cbs_statistics() -> CBSStatistics:
+    return last_cbs_statistics
+
+# This is the problem of moving a group of cars to their slots without breaking their constraints
+# The cars of the group move during the same time steps, but every action only moves one car (operator decomposition):
+# the cars of the group move or wait one after the other, and the time step ends once the last car of the group moved or waited,
+# so a state has at most 5 successors instead of 5 to the power of the number of cars.
+# After the last constraint and the end of the plans of the other cars, the time does not matter anymore,
+# so the time steps of the states stop at this time (called "last") and the number of states is finite.
+# From then on, the cars of the group move one at a time like in ParkingProblem (every time step has one move and no waits).
+# Among the plans with the same cost, the group prefers the plans with fewer conflicts with the plans of the other cars
+# (a conflict avoidance table): the cost of every action is multiplied by "scale" and the number of conflicts of the action is added
+# (only the conflicts before the last time step are counted), so the cheapest plan in this cost is a cheapest plan in the parking cost.
+class GroupProblem(Problem[GroupState, GroupAction]):
+    integer_costs = True
+
+    def __init__(self, problem: ParkingProblem, group: Tuple[int, ...], starts: Tuple[int, ...],
+                 constraints: List[FrozenSet[Constraint]], plans: List[List[int]]) -> None:
+        self.problem = problem
+        self.group = group
+        self.starts = starts
+        self.constraints = [constraints[car] for car in group]
+        others = [plan for car, plan in enumerate(plans) if plan and car not in group]
+        self.last = max([time + 1 for car_constraints in self.constraints for _, time in car_constraints] +
+                        [len(plan) - 1 for plan in others] + [0])
+        self.occupied = occupied_cells(others, self.last)
+        self.scale = 2 * len(group) * self.last + 1
+        slots = {car: problem.index[position] for position, car in problem.slots.items()}
+        self.slots = tuple(slots[car] for car in group)
+        # A car can only stay on its slot once no constraint forbids the slot at a later time
+        self.arrivals = tuple(max((time for cell, time in car_constraints if cell == slot), default=-1) + 1
+                              for slot, car_constraints in zip(self.slots, self.constraints))
+
+    def get_initial_state(self) -> GroupState:
+        return (self.starts, 0, ())
+
+    def is_goal(self, state: GroupState) -> bool:
+        cells, time, previous = state
+        return not previous and cells == self.slots and all(time >= arrival for arrival in self.arrivals)
+
+    def get_actions(self, state: GroupState) -> List[GroupAction]:
+        return [action for action, _, _ in self.get_successors(state)]
+
+    def get_successor(self, state: GroupState, action: GroupAction) -> GroupState:
+        for move, successor, _ in self.get_successors(state):
+            if move == action: return successor
+        raise Exception(f"Invalid action {action} for the cars {self.group} in state {state}")
+
+    def get_cost(self, state: GroupState, action: GroupAction) -> float:
+        for move, _, cost in self.get_successors(state):
+            if move == action: return cost
+        raise Exception(f"Invalid action {action} for the cars {self.group} in state {state}")
+
+    # The next car of the group can wait on its cell (the direction is None and it costs nothing)
+    # or move to a neighboring passage (with the parking cost)
+    def get_successors(self, state: GroupState) -> List[Tuple[GroupAction, GroupState, float]]:
+        cells, time, previous = state
+        # Once the time does not matter, the moves of a time step can be made one after the other in any order (like ParkingProblem)
+        if time == self.last:
+            successors = []
+            for turn, (car, cell) in enumerate(zip(self.group, cells)):
+                for action, target_bit, cost, _ in self.problem.moves[car][cell]:
+                    target = target_bit.bit_length() - 1
+                    if target in cells: continue
+                    successors.append((action, (cells[:turn] + (target,) + cells[turn + 1:], time, ()), cost * self.scale))
+            return successors
+        turn, next_time = len(previous), min(time + 1, self.last)
+        car, cell, constraints = self.group[turn], cells[turn], self.constraints[turn]
+        occupied, scale, counted = self.occupied, self.scale, time < self.last
+        # The time step ends after the move of the last car of the group
+        end = turn + 1 == len(cells)
+        def successor(target: int) -> GroupState:
+            moved = cells[:turn] + (target,) + cells[turn + 1:]
+            return (moved, next_time, ()) if end else (moved, time, previous + (cell,))
+        successors = []
+        if (cell, time + 1) not in constraints:
+            successors.append((None, successor(cell), int(counted and (cell, next_time) in occupied)))
+        for (_, direction), target_bit, cost, _ in self.problem.moves[car][cell]:
+            target = target_bit.bit_length() - 1
+            # A car cannot enter a cell where a car of the group is or was at the start of the time step
+            if target in cells or target in previous or (target, time + 1) in constraints: continue
+            # A vertex conflict (another car is on the target) or a following conflict (another car just left the target)
+            conflicts = int((target, next_time) in occupied) + int((target, time) in occupied) if counted else 0
+            successors.append((direction, successor(target), cost * scale + conflicts))
+        return successors
+
+# Returns the cells occupied by the cars at every time step until the given time (a car stays on the last cell of its plan)
+def occupied_cells(plans: List[List[int]], last: int) -> Set[Constraint]:
+    return {(plan[min(time, len(plan) - 1)], time) for plan in plans for time in range(last + 1)}
+
+# Returns the optimal plans (the cell of every car of the group at every time step) and their cost for a group under its constraints (or None)
+# Among the optimal plans, it returns one with the fewest conflicts with the plans of the other cars (the empty plans are ignored)
+def plan_group(problem: ParkingProblem, group: Tuple[int, ...], starts: List[int], constraints: List[FrozenSet[Constraint]],
+               plans: List[List[int]]) -> Optional[Tuple[List[List[int]], float]]:
+    if any((starts[car], 0) in constraints[car] for car in group): return None
+    group_problem = GroupProblem(problem, group, tuple(starts[car] for car in group), constraints, plans)
+    # The weighted distances to the slots ignore the constraints, the waits and the conflicts, so their sum is still a consistent heuristic
+    tables, scale = slot_distances(problem), group_problem.scale
+    heuristic = lambda _, state: sum(tables[car][cell] for car, cell in zip(group, state[0])) * scale
+    path = search.AStarSearch(group_problem, group_problem.get_initial_state(), heuristic)
+    last_cbs_statistics.low_level_expanded += search.fetch_search_statistics().expanded
+    if path is None: return None
+    state = group_problem.get_initial_state()
+    group_plans, cost = [[cell] for cell in state[0]], 0
+    for action in path:
+        cost += group_problem.get_cost(state, action)
+        state = group_problem.get_successor(state, action)
+        # The cells are added to the plans once every car of the group moved during the time step
+        if state[2]: continue
+        for plan, cell in zip(group_plans, state[0]): plan.append(cell)
+    return group_plans, cost // scale
+
+# Returns the conflicts between the plans in the order of time, every conflict is (car, cell, time, other car, other time):
+# the car must not be on the cell at the time or the other car must not be on the cell at the other time
+def find_conflicts(plans: List[List[int]]) -> List[Tuple[int, int, int, int, int]]:
+    conflicts = []
+    length = max(len(plan) for plan in plans)
+    previous: Dict[int, int] = {}
+    for time in range(length):
+        current: Dict[int, int] = {}
+        for car, plan in enumerate(plans):
+            cell = plan[min(time, len(plan) - 1)]
+            # Vertex conflict: two cars are on the same cell at the same time
+            if cell in current: conflicts.append((current[cell], cell, time, car, time))
+            else: current[cell] = car
+        for car, plan in enumerate(plans):
+            cell = plan[min(time, len(plan) - 1)]
+            # Following conflict: the car moved to the cell that another car was on at the previous time step
+            other = previous.get(cell)
+            if other is not None and other != car: conflicts.append((car, cell, time, other, time - 1))
+        previous = current
+    return conflicts
+
+# Convert the plans (without conflicts) to the list of parking actions (the moves of every time step ordered by car)
+def plans_to_actions(problem: ParkingProblem, plans: List[List[int]]) -> List[ParkingAction]:
+    cells = problem.cells
+    actions = []
+    for time in range(1, max(len(plan) for plan in plans)):
+        for car, plan in enumerate(plans):
+            if time >= len(plan) or plan[time] == plan[time - 1]: continue
+            source, target = cells[plan[time - 1]], cells[plan[time]]
+            actions.append((car, next(direction for direction in Direction if source + direction.to_vector() == target)))
+    return actions
+
+# Search the constraint tree for plans without conflicts
+# The search expands the node with the fewest conflicts among the nodes whose cost is at most "weight" times the lowest cost (the focal list),
+# so with weight 1 it returns the cheapest plans, and with a larger weight (as in ECBS) the cost is at most "weight" times the cheapest cost
+# Returns the plans and their cost (or None if there are none or if the search expanded "max_nodes" nodes)
+def search_constraint_tree(problem: ParkingProblem, starts: List[int], weight: float, merge_bound: float,
+                           max_nodes: int) -> Optional[Tuple[List[List[int]], float]]:
+    statistics = last_cbs_statistics
+    cars = len(starts)
+    groups = [(car,) for car in range(cars)]
+    # The number of conflicts found between every pair of cars
+    counts: Dict[Tuple[int, int], int] = {}
+
+    # The search starts again from the root every time two groups are merged
+    while statistics.expanded < max_nodes:
+        group_of = {car: index for index, group in enumerate(groups) for car in group}
+
+        # Every node contains the constraints and the plans of every car, the cost of every group and the conflicts of the plans
+        constraints: List[FrozenSet[Constraint]] = [frozenset()] * cars
+        plans: List[List[int]] = [[] for _ in range(cars)]
+        costs = []
+        for group in groups:
+            # A group that cannot park without constraints (even if the other cars were removed) proves that there is no solution
+            planned = plan_group(problem, group, starts, constraints, plans)
+            if planned is None: return None
+            for car, plan in zip(group, planned[0]): plans[car] = plan
+            costs.append(planned[1])
+
+        # "nodes" contains the nodes sorted by cost (the nodes with the same cost are in the order they were generated)
+        # and "focal" contains the nodes whose cost is at most weight times the lowest cost, sorted by the number of conflicts then by cost
+        # "lowest" contains the costs of the nodes in the focal list, and the expanded nodes are removed from it lazily
+        counter = 0
+        nodes = [(sum(costs), counter, constraints, plans, costs, find_conflicts(plans))]
+        focal, lowest, expanded = [], [], set()
+        merged = False
+        while statistics.expanded < max_nodes:
+            while lowest and lowest[0][1] in expanded: heapq.heappop(lowest)
+            lower_bound = min(nodes[0][0] if nodes else float('inf'), lowest[0][0] if lowest else float('inf'))
+            if lower_bound == float('inf'): return None
+            while nodes and nodes[0][0] <= weight * lower_bound:
+                node = heapq.heappop(nodes)
+                heapq.heappush(focal, (len(node[5]), node[0], node[1], node))
+                heapq.heappush(lowest, (node[0], node[1]))
+            _, cost, identifier, (_, _, constraints, plans, costs, conflicts) = heapq.heappop(focal)
+            expanded.add(identifier)
+            statistics.expanded += 1
+            if not conflicts:
+                return plans, cost
+
+            car, cell, time, other, other_time = conflicts[0]
+            pair = (min(car, other), max(car, other))
+            counts[pair] = counts.get(pair, 0) + 1
+            if counts[pair] >= merge_bound:
+                first, second = groups[group_of[car]], groups[group_of[other]]
+                groups = [group for group in groups if group != first and group != second] + [tuple(sorted(first + second))]
+                statistics.merges += 1
+                merged = True
+                break
+
+            for constrained, constrained_time in ((car, time), (other, other_time)):
+                index = group_of[constrained]
+                child_constraints = list(constraints)
+                child_constraints[constrained] = constraints[constrained] | {(cell, constrained_time)}
+                planned = plan_group(problem, groups[index], starts, child_constraints, plans)
+                if planned is None: continue
+                child_plans, child_costs = list(plans), list(costs)
+                for member, plan in zip(groups[index], planned[0]): child_plans[member] = plan
+                child_costs[index] = planned[1]
+                counter += 1
+                statistics.generated += 1
+                heapq.heappush(nodes, (sum(child_costs), counter, child_constraints, child_plans, child_costs, find_conflicts(child_plans)))
+        if not merged: return None
+    return None
+
+# The conflict-based search for the parking problem (it has the same arguments as the uninformed search functions)
+# With weight 1, it returns the optimal list of actions from the given state (CBS),
+# and with a larger weight, the cost of the actions is at most "weight" times the optimal cost (as in ECBS, but the groups are still planned optimally)
+# Two cars are merged into a group once they conflicted "merge_bound" times
+# (with float('inf'), the cars are never merged and the search may only end after "max_nodes" constraint tree nodes)
+# It returns None if there is no solution (or if no solution was found in "max_nodes" constraint tree nodes)
+def ConflictBasedSearch(problem: ParkingProblem, initial_state: ParkingState, weight: float = 1.0, merge_bound: float = 4,
+                        max_nodes: int = 100000) -> Solution:
+    global last_cbs_statistics
+    last_cbs_statistics = CBSStatistics()
+    if problem.goal < 0: return None
+    starts = problem.unpack(initial_state)
+    result = search_constraint_tree(problem, starts, weight, merge_bound, max_nodes)
+    return None if result is None else plans_to_actions(problem, result[0])
@@ -1,5 +1,5 @@
 import time
-from graph import GraphRoutingProblem, GraphNode, graphrouting_heuristic
+from graph import GraphRoutingProblem, CSRGraphRoutingProblem, GraphNode, graphrouting_heuristic
 from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent
 from helpers.utils import fetch_recorded_calls
 import argparse, os, json
@@ -11,7 +11,7 @@ def create_agent(args: argparse.Namespace):
         # This function reads the action from the user (human)
         def graph_user_action(problem: GraphRoutingProblem, state: GraphNode) -> GraphNode:
             possible_actions = list(problem.get_actions(state))
-            node_map = {node.name: node for node in possible_actions}
+            node_map = {problem.node(node).name: node for node in possible_actions}
             while True:
                 if possible_actions:
                     action_prompt = "Possible actions:\n"
@@ -35,9 +35,21 @@ def create_agent(args: argparse.Namespace):
     if agent_type == "ucs":
         from search import UniformCostSearch
         return UninformedSearchAgent(UniformCostSearch)
+    if agent_type == "bucs":
+        from search import BidirectionalUniformCostSearch
+        return UninformedSearchAgent(BidirectionalUniformCostSearch)
+    if agent_type == "ids":
+        from search import IterativeDeepeningSearch
+        return UninformedSearchAgent(IterativeDeepeningSearch)
     if agent_type == "astar":
         from search import AStarSearch
         return InformedSearchAgent(AStarSearch, graphrouting_heuristic)
+    if agent_type == "bastar":
+        from search import BidirectionalAStarSearch
+        return InformedSearchAgent(BidirectionalAStarSearch, graphrouting_heuristic)
+    if agent_type == "idastar":
+        from search import IterativeDeepeningAStar
+        return InformedSearchAgent(IterativeDeepeningAStar, graphrouting_heuristic)
     if agent_type == "gbfs":
         from search import BestFirstSearch
         return InformedSearchAgent(BestFirstSearch, graphrouting_heuristic)
@@ -48,8 +60,8 @@ def main(args: argparse.Namespace):
     start = time.time() # Track run time
     graph_path = args.graph
     problem = GraphRoutingProblem.from_file(graph_path) # create the problem
-    # Check if there is a figure for the graph that we can display on the console
-    figure_path = json.load(open(graph_path, 'r')).get("figure")
+    # Check if there is a figure for the graph that we can display on the console (only the JSON format can have one)
+    figure_path = None if isinstance(problem, CSRGraphRoutingProblem) else json.load(open(graph_path, 'r')).get("figure")
     figure = None
     if figure_path:
         figure_path = os.path.join(os.path.dirname(graph_path), figure_path)
@@ -59,7 +71,8 @@ def main(args: argparse.Namespace):
     print("Initial State:")
     if figure:
         print(figure)
-    print("Current Node:", state)
+    # The states of the binary format are node numbers, so the nodes are printed through problem.node
+    print("Current Node:", problem.node(state))
     agent = create_agent(args)
     step = 0 # This will store the current step
     path_cost = 0 # This will store the total path cost
@@ -69,7 +82,7 @@ def main(args: argparse.Namespace):
         fetch_recorded_calls(GraphRoutingProblem.is_goal) # Clear the recorded calls
         action = agent.act(problem, state) # Request an action from the agent
         # Retrieve the traversed nodes
-        traversed_nodes += [call["args"][1].name for call in list(fetch_recorded_calls(GraphRoutingProblem.is_goal))]
+        traversed_nodes += [problem.node(call["args"][1]).name for call in list(fetch_recorded_calls(GraphRoutingProblem.is_goal))]
         # If no solution was found, break
         if action is None:
             print("Agent cannot find a solution, exiting...")
@@ -83,10 +96,10 @@ def main(args: argparse.Namespace):
         step += 1
         # Print any useful information to the user
         print("Step:", step)
-        print("Action:", str(action), f"(cost: {cost})")
+        print("Action:", str(problem.node(action)), f"(cost: {cost})")
         if figure:
             print(figure)
-        print("Current Node:", state)
+        print("Current Node:", problem.node(state))
     if not unsolvable: print("YOU WON!!")
     print("Path Cost:", path_cost)
     # This was a search agent, display the traversed nodes
@@ -100,7 +113,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Graph as Human or AI")
     parser.add_argument("graph", help="path to the graph to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'ucs', 'bucs', 'ids', 'astar', 'bastar', 'idastar', 'gbfs'],
                         help="the agent that will play the game")
 
     args = parser.parse_args()
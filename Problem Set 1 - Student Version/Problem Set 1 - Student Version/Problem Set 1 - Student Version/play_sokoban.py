@@ -1,8 +1,9 @@
 from typing import List
 from sokoban import SokobanProblem, Direction, SokobanState, SokobanTile
+from sokoban_deadlocks import PUSH_FILTERS
 from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent
 from helpers.utils import fetch_tracked_call_count
-from helpers.heuristic_checks import test_heuristic_consistency
+from helpers.heuristic_checks import test_heuristic_consistency, test_successors_consistency
 from functools import lru_cache
 import argparse, time
 
@@ -30,6 +31,28 @@ def get_heuristic(name: str):
     print(f"Requested Heuristic '{name}' is invalid")
     exit(-1)
 
+# Return the heuristic selected by the user for an informed search agent
+# The search computes the heuristic once per state, but the consistency checks compute it again for every transition
+# So if desired by the user, we cache the heuristic calls, track every transition and check for the heuristic consistency for each transition
+def make_heuristic(args: argparse.Namespace):
+    heuristic = get_heuristic(args.heuristic)
+    if args.checks:
+        heuristic = lru_cache(2**16)(heuristic)
+        problem_classes = [SokobanProblem]
+        # The push-level problem overrides the transitions, so its methods are checked too
+        if args.pushes:
+            from sokoban_push import SokobanPushProblem
+            problem_classes.append(SokobanPushProblem)
+        for problem_class in problem_classes:
+            problem_class.get_successor = test_heuristic_consistency(heuristic)(problem_class.get_successor)
+            problem_class.get_successors = test_successors_consistency(heuristic)(problem_class.get_successors)
+    return heuristic
+
+# The agents that are only optimal if the heuristic is admissible
+# and the heuristics that are admissible for the push-level problem (where the cost is the number of pushes)
+OPTIMAL_INFORMED_AGENTS = ["astar", "lazyastar", "idastar", "arastar", "hdastar"]
+PUSH_ADMISSIBLE_HEURISTICS = ["zero", "strong"]
+
 # Create an agent based on the user selections
 def create_agent(args: argparse.Namespace):
     agent_type: str = args.agent
@@ -59,22 +82,31 @@ def create_agent(args: argparse.Namespace):
     if agent_type == "ucs":
         from search import UniformCostSearch
         return UninformedSearchAgent(UniformCostSearch)
+    if agent_type == "ids":
+        from search import IterativeDeepeningSearch
+        return UninformedSearchAgent(IterativeDeepeningSearch)
     if agent_type == "astar":
         from search import AStarSearch
-        # We cache the heuristic calls to speed up the search process if the heuristic is not fast
-        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic))
-        # If desired by the user, we track every transition and check for the heuristic consistency for each transition
-        if args.checks:
-            SokobanProblem.get_successor = test_heuristic_consistency(heuristic)(SokobanProblem.get_successor)
-        return InformedSearchAgent(AStarSearch, heuristic)
+        return InformedSearchAgent(AStarSearch, make_heuristic(args))
+    if agent_type == "lazyastar":
+        from search import LazyAStarSearch
+        # The cheap heuristics are evaluated on every generated node and the selected heuristic only when a node reaches the top of the frontier
+        cheap_heuristics = [get_heuristic(name) for name in args.cheap_heuristics]
+        return InformedSearchAgent(lambda problem, state, heuristic: LazyAStarSearch(problem, state, [*cheap_heuristics, heuristic]), make_heuristic(args))
+    if agent_type == "idastar":
+        from search import IterativeDeepeningAStar
+        return InformedSearchAgent(IterativeDeepeningAStar, make_heuristic(args))
+    if agent_type == "arastar":
+        from search import AnytimeRepairingAStar
+        # The agent will use the best solution found before the deadline (or the first solution if it is found after the deadline)
+        return InformedSearchAgent(AnytimeRepairingAStar, make_heuristic(args), args.deadline)
+    if agent_type == "hdastar":
+        from parallel_search import HashDistributedAStar
+        # The search runs in worker processes, so the explored nodes are not tracked by this process
+        return InformedSearchAgent(HashDistributedAStar, make_heuristic(args))
     if agent_type == "gbfs":
         from search import BestFirstSearch
-        # We cache the heuristic calls to speed up the search process if the heuristic is not fast
-        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic))
-        # If desired by the user, we track every transition and check for the heuristic consistency for each transition
-        if args.checks:
-            SokobanProblem.get_successor = test_heuristic_consistency(heuristic)(SokobanProblem.get_successor)
-        return InformedSearchAgent(BestFirstSearch, heuristic)
+        return InformedSearchAgent(BestFirstSearch, make_heuristic(args))
     print(f"Requested Agent '{agent_type}' is invalid")
     exit(-1)
 
@@ -83,10 +115,21 @@ def main(args: argparse.Namespace):
     if args.ansicolors: state_printer = lambda state: print(colored_sokoban(str(state)))
     start = time.time() # Track run time
     problem = SokobanProblem.from_file(args.level) # create the problem
+    problem.set_push_filters(PUSH_FILTERS[name] for name in args.filters) # skip the pushes that lead to the selected deadlocks
     state = problem.get_initial_state() # Get the initial state
     print("Initial State:")
     state_printer(state)
+    # The weak heuristic counts steps, so it can overestimate the number of pushes and the optimal searches would lose their guarantee
+    heuristics = [args.heuristic] + (args.cheap_heuristics if args.agent == "lazyastar" else [])
+    inadmissible = [name for name in heuristics if name not in PUSH_ADMISSIBLE_HEURISTICS]
+    if args.pushes and args.agent in OPTIMAL_INFORMED_AGENTS and inadmissible:
+        print(f"The heuristic '{inadmissible[0]}' is not admissible for the push-level problem, use one of: {', '.join(PUSH_ADMISSIBLE_HEURISTICS)}")
+        exit(-1)
     agent = create_agent(args)
+    # If desired by the user, the search agent searches the push-level problem and the pushes are replayed step by step
+    if args.pushes and not isinstance(agent, HumanAgent):
+        from sokoban_push import PushLevelSearch
+        agent.search_fn = PushLevelSearch(agent.search_fn, "tunnels" in args.macros, "rooms" in args.macros)
     step = 0 # This will store the current step
     total_explored_nodes = 0 # This will store the number of traversed nodes during search
     unsolvable = False # This will store whether the problem is unsolvable or not
@@ -117,6 +160,17 @@ def main(args: argparse.Namespace):
     # This was a search agent, display the number of traversed nodes
     if not isinstance(agent, HumanAgent):
         print(f"Search explored {total_explored_nodes} nodes")
+    # If push filters were used, display how many pushes each filter pruned
+    if problem.push_filters:
+        print("Pruned pushes:", ", ".join(f"{name}: {count}" for name, count in problem.pruned.items()))
+    # This was an informed search agent, display how many times the heuristic was computed in the last search
+    if isinstance(agent, InformedSearchAgent):
+        from search import fetch_search_statistics
+        statistics = fetch_search_statistics()
+        print(f"Heuristic computed for {statistics.heuristic_misses} states ({statistics.heuristic_hits} cache hits)")
+        if statistics.heuristic_evaluations:
+            names = args.cheap_heuristics + [args.heuristic]
+            print("Heuristic evaluations:", ", ".join(f"{name}: {count}" for name, count in zip(names, statistics.heuristic_evaluations)))
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -126,11 +180,22 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Sokoban as Human or AI")
     parser.add_argument("level", help="path to the sokoban level to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'ucs', 'ids', 'astar', 'lazyastar', 'idastar', 'arastar', 'hdastar', 'gbfs'],
                         help="the agent that will play the game")
     parser.add_argument("--heuristic", '-hf', default="zero",
                         choices=["zero", "weak", "strong"],
                         help="choose the heuristic to use with A* or Greedy Best First Search")
+    parser.add_argument("--cheap-heuristics", "-ch", nargs="*", default=["weak"],
+                        choices=["zero", "weak", "strong"],
+                        help="the cheaper heuristics that the lazy A* (lazyastar) evaluates before the selected heuristic (from the cheapest)")
+    parser.add_argument("--deadline", "-dl", type=float, default=None,
+                        help="the time limit (in seconds) for the anytime search (arastar) to improve its solution (it always finds its first solution)")
+    parser.add_argument("--filters", "-f", nargs="*", default=[], choices=list(PUSH_FILTERS),
+                        help="skip the pushes that lead to the selected deadlocks (this changes the number of explored nodes)")
+    parser.add_argument("--pushes", "-p", action="store_true", default=False,
+                        help="search the push-level problem (the solution minimizes the pushes instead of the steps)")
+    parser.add_argument("--macros", "-m", nargs="*", default=[], choices=["tunnels", "rooms"],
+                        help="replace the pushes into tunnels and goal rooms by macros in the push-level problem (the goal-room macros are not optimal)")
     parser.add_argument("--checks", "-c", action='store_true', default=False,
                         help="Enable consistency checks for the heuristic")
     parser.add_argument("--ansicolors", "-ac", action="store_true",
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Generic, Iterable, List, TypeVar, Union
+from typing import Any, Callable, Generic, Iterable, List, Tuple, TypeVar, Union
 from helpers.utils import CacheContainer, with_cache
 
 # S and A are used for generic typing where S represents the state type and A represents the action type
@@ -10,6 +10,10 @@ A = TypeVar("A")
 # It also implements 'CacheContainer' which allows you to call the "cache" method
 # which returns a dictionary in which you can store any data you want to cache
 class Problem(ABC, Generic[S, A], CacheContainer):
+    # Problems where every action cost is an integer can set this to True
+    # This allows the search to use a bucket queue instead of a binary heap for the frontier
+    integer_costs: bool = False
+
     # This function returns the initial state
     @abstractmethod
     def get_initial_state(self) -> S:
@@ -34,6 +38,22 @@ class Problem(ABC, Generic[S, A], CacheContainer):
     def get_cost(self, state: S, action: A) -> float:
         return 1.0
 
+    # This function returns a list of (action, successor, cost) for all the possible actions from the given state
+    # The default implementation calls "get_actions", "get_successor" and "get_cost",
+    # but problems can override it to compute the three values in one pass.
+    # An override should be tracked the same way as "get_actions" since the search calls it instead of "get_actions".
+    def get_successors(self, state: S) -> Iterable[Tuple[A, S, float]]:
+        return [(action, self.get_successor(state, action), self.get_cost(state, action)) for action in self.get_actions(state)]
+
+    # These functions convert a state to a picklable value (and back) to send it to another process (e.g. in a parallel search)
+    # A state and its unpacked copy must be equal and have the same hash, so the default implementation sends the state as it is.
+    # Problems whose states refer to objects that are compared by identity should override them.
+    def pack_state(self, state: S) -> Any:
+        return state
+
+    def unpack_state(self, packed: Any) -> S:
+        return packed
+
 # These are type aliases for:
 # A solution which is a list of actions (or None if no solution is found)
 Solution = Union[List[A], None]
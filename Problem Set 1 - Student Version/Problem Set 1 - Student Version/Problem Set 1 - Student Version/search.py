@@ -1,10 +1,13 @@
 from problem import HeuristicFunction, Problem, S, A, Solution
 from collections import deque
 from helpers.utils import NotImplemented
-from typing import List, Tuple, Optional, Set
+from typing import Generic, Iterator, List, Tuple, Optional, Set
+from dataclasses import dataclass, field
+import time
 
 #TODO: Import any modules you want to use
-import heapq
+from frontier import BucketFrontier, Frontier, HeapFrontier, TwoLevelBucketFrontier
+from nodes import NodeTable
 
 # All search functions take a problem and a state
 # If it is an informed search function, it will also receive a heuristic function
@@ -14,9 +17,47 @@ import heapq
 # 1. A list of actions which represent the path from the initial state to the final state
 # 2. None if there is no solution
 
+# ==> This class stores the statistics of the last search
+@dataclass
+class SearchStatistics:
+    expanded: int = 0               # ==> number of expanded nodes
+    generated: int = 0              # ==> number of generated children
+    heuristic_misses: int = 0       # ==> number of states for which the heuristic function was called
+    heuristic_hits: int = 0         # ==> number of times a heuristic value was reused from the cache
+    heuristic_evaluations: List[int] = field(default_factory=list) # ==> number of evaluations of each heuristic (filled by LazyAStarSearch)
+
+# ==> The statistics of the last search (use fetch_search_statistics to read them)
+last_statistics = SearchStatistics()
+
+# ==> This function returns the statistics of the last search
+def fetch_search_statistics() -> SearchStatistics:
+    return last_statistics
+
+# ==> This class wraps a heuristic function and caches its value for every state it sees during a search
+# ==> So the heuristic function is called exactly once per state, and we count the hits and misses of the cache
+class HeuristicCache:
+    def __init__(self, problem: Problem[S, A], heuristic: HeuristicFunction, statistics: SearchStatistics) -> None:
+        self.problem = problem
+        self.heuristic = heuristic
+        self.statistics = statistics
+        self.values = {}
+
+    def __call__(self, state: S) -> float:
+        value = self.values.get(state)
+        if value is None:
+            value = self.values[state] = self.heuristic(self.problem, state)
+            self.statistics.heuristic_misses += 1
+        else:
+            self.statistics.heuristic_hits += 1
+        return value
+
+    # ==> Remove the value of a state that will not be needed again (e.g. an explored state in GraphSearch)
+    def forget(self, state: S) -> None:
+        self.values.pop(state, None)
+
 #==> This function returns the cost of the node based on the algorithm
-def CostFunction( algorithm : str, index: int, cost: int, problem: Problem[S, A],
-                  state: S, child:S, action: A, heuristic: HeuristicFunction)       -> int:
+#==> g is the path cost of the node and h is its heuristic value (both are stored separately in the node table)
+def CostFunction( algorithm : str, index: int, g: float, h: float) -> float:
 
     # ==> if the algorithm is BreadthFirstSearch, then the cost increases as level increase 
     if algorithm == 'BreadthFirst':
@@ -28,102 +69,533 @@ def CostFunction( algorithm : str, index: int, cost: int, problem: Problem[S, A]
     
     # ==> if the algorithm is UniformCostSearch, then the cost is the cumulative cost of the path
     elif algorithm == 'UniformCost':
-        return problem.get_cost(state, action) + cost 
+        return g
     
     # ==> if the algorithm is AStarSearch, then the cost is the cumulative cost of the path + the heuristic value
     # ==> the heuristic value is the estimated cost from the current state to the goal state
     elif algorithm == 'AStar':
-        return cost - heuristic(problem, state) + problem.get_cost(state, action)+ heuristic(problem, child) 
+        return g + h
 
     # ==> if the algorithm is BestFirstSearch, then the cost is the heuristic value
     elif algorithm == 'BestFirst':
-        return heuristic(problem, child)
+        return h
     
     # ==> if the algorithm is not one of the above algorithms, then raise an exception
     else:
         raise Exception("Unknown algorithm")
 
 
+# ==> This function selects the frontier engine for the given problem and algorithm
+# ==> If the problem declares that all its action costs are integers:
+# ==>   UCS costs are integers too, so we use a bucket queue (Dial's algorithm) which pushes and pops in O(1)
+# ==>   AStar and BestFirst costs depend on the heuristic (which could return floats), so we use a two-level bucket queue
+# ==> Otherwise (and for BFS and DFS where the costs are node indices), we use a binary heap
+def SelectFrontier(problem: Problem[S, A], algorithm: str) -> Frontier:
+    if problem.integer_costs:
+        if algorithm == 'UniformCost':
+            return BucketFrontier()
+        if algorithm in ('AStar', 'BestFirst'):
+            return TwoLevelBucketFrontier()
+    return HeapFrontier()
+
+
 # ==> GraphSearch function thaw will be used by all search algorithms
-def GraphSearch (frontier: list, problem: Problem[S, A], algorithm: str, heuristic: HeuristicFunction) -> Solution:
+# ==> The frontier keeps one entry per state, so we can check if a child is in the frontier in O(1)
+# ==> If a child is already in the frontier, the frontier only replaces its entry if the new cost is lower (decrease-key)
+# ==> Entries with the same cost are popped in the order they were pushed
+# ==> Instead of copying the path into every node, the nodes are stored in a node table (parent id + action)
+# ==> and the path is rebuilt only once a goal is found
+# ==> If no frontier is given, the frontier engine is selected automatically (see SelectFrontier)
+# ==> If no explored set is given, a python set of states is used
+# ==> (any object with "add" and "in" works, e.g. sokoban.ZobristSet which only stores a 64-bit key per state)
+def GraphSearch (frontier: Optional[Frontier], problem: Problem[S, A], initial_state: S, algorithm: str, heuristic: HeuristicFunction,
+                 nodes: Optional[NodeTable] = None, explored: Optional[Set[S]] = None) -> Solution:
     
+    # ==> Reset the statistics of the search
+    global last_statistics
+    statistics = last_statistics = SearchStatistics()
+
+    # ==> Cache the heuristic so that it is computed once per state
+    # ==> Only UCS and AStar need the path cost (g)
+    heuristic_cache = None if heuristic is None else HeuristicCache(problem, heuristic, statistics)
+    uses_path_cost = algorithm in ('UniformCost', 'AStar')
+
+    # ==> Initialize the frontier and the node table (if not supplied) and push the initial state to the frontier
+    if frontier is None: frontier = SelectFrontier(problem, algorithm)
+    if nodes is None: nodes = NodeTable()
+    h = 0 if heuristic_cache is None else heuristic_cache(initial_state)
+    frontier.push(initial_state, CostFunction(algorithm, 0, 0, h), nodes.root(h))
+
     # ==> Initialize the index of the node
     index = 0
     
-    # ==> Initialize the explored set to be empty
-    explored = set()                  
+    # ==> Initialize the explored set to be empty (if not supplied)
+    if explored is None: explored = set()
     
     # ==> While the frontier is not empty
     while frontier: 
         
-        # ==> Pop the shallowest node from the frontier
-        cost, (temp_not_used, state), path = heapq.heappop(frontier) 
-        # ==> if the node was not already explored before
-        if state not in explored:
-            
-            # ==> if the node contains a goal state then return the corresponding solution
-            if problem.is_goal(state):
-                return path
+        # ==> Pop the node with the lowest cost from the frontier
+        cost, state, node = frontier.pop()
+
+        # ==> if the node contains a goal state then return the corresponding solution
+        if problem.is_goal(state):
+            return nodes.path(node)
+        
+        # ==> Add the node to the explored set
+        # ==> The explored children are skipped before computing their heuristic, so its cached heuristic is not needed anymore
+        explored.add(state) 
+        if heuristic_cache is not None: heuristic_cache.forget(state)
+        statistics.expanded += 1
+        g = nodes.g[node]
+        
+        # ==> For each action in the problem, we expand the chosen node
+        # ==> for each action, we calculate the cost of the node and push it to the frontier
+        # ==> get_successors returns the action, the child node and the action cost together
+        for action, child, step_cost in problem.get_successors(state): 
             
-            # ==> Add the node to the explored set
-            explored.add(state) 
+            # ==> increase the index
+            index+=1
+
+            # ==> if the child node was already explored, then skip it
+            if child in explored: continue
+
+            # ==> calculate the path cost and the heuristic of the child node (the heuristic is computed once per state)
+            # ==> then calculate the cost of the child node based on the algorithm
+            child_g = g + step_cost if uses_path_cost else 0
+            child_h = 0 if heuristic_cache is None else heuristic_cache(child)
+            child_cost = CostFunction(algorithm, index, child_g, child_h)
+
+            if child in frontier:
+                # ==> if the child node is already in the frontier with a lower or equal cost, then skip it
+                if frontier.cost(child) <= child_cost: continue
+            # ==> if the child node is not in the frontier, check if it is a goal state and the algorithm is BreadthFirst
+            # ==> if the child node is a goal state and the algorithm is BreadthFirst, then return the corresponding solution
+            elif algorithm == 'BreadthFirst' and problem.is_goal(child):
+                return nodes.path(node) + [action] 
             
-            # ==> For each action in the problem, we expand the chosen node
-            # ==> for each action, we calculate the cost of the node and push it to the frontier
-            for action in problem.get_actions(state): 
-
-                # ==> get the child node
-                child = problem.get_successor(state, action)
-                
-                # ==> increase the index
-                index+=1
-
-                # ==> calculate the cost of the child node based on the algorithm
-                child_cost = CostFunction(algorithm, index, cost, problem, state, child, action, heuristic)
-
-                # ==> if the child node was not already explored and not in the frontier, then push it to the frontier
-                if child not in explored and child not in frontier:
-                    # ==> check if the child node is a goal state and the algorithm is BreadthFirst
-                    # ==> if the child node is a goal state and the algorithm is BreadthFirst, then return the corresponding solution
-                    if problem.is_goal(child) and algorithm == 'BreadthFirst':
-                        return path + [action] 
-                    
-                    # ==> push the child node to the frontier
-                    heapq.heappush(frontier, (child_cost,(index, child), path + [action])) 
+            # ==> push the child node to the frontier (or decrease its cost if it is already there)
+            frontier.push(child, child_cost, nodes.add(node, action, child_g, child_h)) 
+            statistics.generated += 1
 
     # ==> if no solution was found, then return None
     return None
 
 
-# ==> The following comment for BFS and DFS:
-    # ==> each node in the frontier is a tuple of ( (index, node) , path)
-    # ==> We used an index to differentiate between nodes with the same state but different parents
+# ==> The following comment for all the search algorithms:
+    # ==> each node in the frontier is stored as (cost, state, node id) where the node id points to the node table
+    # ==> BFS uses the index of the node as its cost and DFS uses the negative index,
+    # ==> so BFS pops the oldest node first and DFS pops the newest node first
+    # ==> UCS uses the cumulative path cost, AStar adds the heuristic to it and BestFirst uses only the heuristic
+
+# ==> All the search functions accept an optional frontier engine (see frontier.py)
+# ==> If it is not given, the frontier engine is selected automatically based on the problem
 
 # ==> BreadthFirstSearch
-def BreadthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
-    frontier = [(0, (0, initial_state), [])] 
-    return GraphSearch(frontier, problem, 'BreadthFirst', None)
+def BreadthFirstSearch(problem: Problem[S, A], initial_state: S, frontier: Optional[Frontier] = None) -> Solution:
+    return GraphSearch(frontier, problem, initial_state, 'BreadthFirst', None)
 
 # ==> DepthFirstSearch
-def DepthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
-    frontier = [(0, (0, initial_state), [])] 
-    return GraphSearch(frontier, problem, 'DepthFirst', None)
-    
-# ==> The following comment for UCS and AStar and BestFirst:
-    # ==> each node in the frontier is a tuple of ( cumulative_path_cost, (index, node), path)
-    # ==> We used an index to differentiate between nodes with the same state but different parents
+def DepthFirstSearch(problem: Problem[S, A], initial_state: S, frontier: Optional[Frontier] = None) -> Solution:
+    return GraphSearch(frontier, problem, initial_state, 'DepthFirst', None)
 
 # ==> UniformCostSearch
-def UniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
-    frontier = [(0, (0, initial_state), [])]
-    return GraphSearch(frontier, problem, 'UniformCost', None)
+def UniformCostSearch(problem: Problem[S, A], initial_state: S, frontier: Optional[Frontier] = None) -> Solution:
+    return GraphSearch(frontier, problem, initial_state, 'UniformCost', None)
 
 # ==> AStarSearch
-def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
-    frontier = [(heuristic(problem, initial_state) + 0, (0, initial_state), [])] 
-    return GraphSearch(frontier, problem, 'AStar', heuristic)
+def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, frontier: Optional[Frontier] = None) -> Solution:
+    return GraphSearch(frontier, problem, initial_state, 'AStar', heuristic)
 
 # ==> BestFirstSearch
-def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
-    frontier = [(heuristic(problem, initial_state), (0, initial_state), [])] 
-    return GraphSearch(frontier, problem, 'BestFirst', heuristic)
+def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, frontier: Optional[Frontier] = None) -> Solution:
+    return GraphSearch(frontier, problem, initial_state, 'BestFirst', heuristic)
+
+
+# ==> LazyAStarSearch
+# ==> It is AStar with an ordered list of admissible heuristics (from the cheapest to the most expensive)
+# ==> The heuristic value of a node is the maximum of the heuristics evaluated on it so far, so it is still admissible
+# ==> (and consistent if all the heuristics are consistent)
+# ==> A generated child is pushed to the frontier with the first heuristic only, and the other heuristics are only evaluated
+# ==> when the node reaches the top of the frontier: the next heuristics are evaluated one by one until the cost of the node rises,
+# ==> then the node is pushed back to the frontier with its new cost. A node is only expanded once all the heuristics were evaluated
+# ==> So the expensive heuristics are never evaluated on the nodes that are still in the frontier when the goal is found
+# ==> The number of evaluations of each heuristic is stored in the statistics (heuristic_evaluations)
+def LazyAStarSearch(problem: Problem[S, A], initial_state: S, heuristics: List[HeuristicFunction],
+                    frontier: Optional[Frontier] = None) -> Solution:
+
+    # ==> Reset the statistics of the search
+    global last_statistics
+    statistics = last_statistics = SearchStatistics()
+    statistics.heuristic_evaluations = [0] * len(heuristics)
+
+    # ==> estimates stores (heuristic value, number of evaluated heuristics) for every state in the frontier
+    estimates = {}
+
+    # ==> This function evaluates the heuristic at the given level and returns the new heuristic value of the state
+    def evaluate(state: S, level: int, h: float) -> float:
+        statistics.heuristic_evaluations[level] += 1
+        statistics.heuristic_misses += 1
+        return max(h, heuristics[level](problem, state))
+
+    if frontier is None: frontier = SelectFrontier(problem, 'AStar')
+    nodes = NodeTable()
+    explored = set()
+    h = evaluate(initial_state, 0, 0)
+    estimates[initial_state] = (h, 1)
+    frontier.push(initial_state, h, nodes.root(h))
+
+    while frontier:
+        _, state, node = frontier.pop()
+
+        # ==> if the node contains a goal state then return the corresponding solution (no need to evaluate the other heuristics)
+        if problem.is_goal(state):
+            return nodes.path(node)
+
+        # ==> Evaluate the next heuristics until the heuristic value rises, then push the node back with its new cost
+        h, level = estimates[state]
+        g = nodes.g[node]
+        if level < len(heuristics):
+            new_h = h
+            while level < len(heuristics) and new_h <= h:
+                new_h = evaluate(state, level, h)
+                level += 1
+            estimates[state] = (new_h, level)
+            if new_h > h:
+                nodes.h[node] = new_h
+                # ==> A state with an infinite heuristic can never reach a goal, so it is dropped
+                if new_h == float('inf'):
+                    del estimates[state]
+                    explored.add(state)
+                else:
+                    frontier.push(state, g + new_h, node)
+                continue
+
+        # ==> All the heuristics were evaluated and the node is still the cheapest one, so we expand it
+        explored.add(state)
+        del estimates[state]
+        statistics.expanded += 1
+        for action, child, step_cost in problem.get_successors(state):
+            if child in explored: continue
+            child_g = g + step_cost
+            estimate = estimates.get(child)
+            if estimate is not None:
+                # ==> The child is already in the frontier, so we reuse its heuristic value and only keep the cheaper path
+                statistics.heuristic_hits += 1
+                child_h = estimate[0]
+                if frontier.cost(child) <= child_g + child_h: continue
+            else:
+                child_h = evaluate(child, 0, 0)
+                if child_h == float('inf'):
+                    explored.add(child)
+                    continue
+                estimates[child] = (child_h, 1)
+            frontier.push(child, child_g + child_h, nodes.add(node, action, child_g, child_h))
+            statistics.generated += 1
+
+    # ==> if no solution was found, then return None
+    return None
+
+
+# ==> The following functions search from both ends at the same time (bidirectional search)
+# ==> The problem must have a method "reverse(state)" that returns the problem of going from the goal back to the given state
+# ==> over the reversed actions (e.g. GraphRoutingProblem), and the actions must be the states they lead to
+# ==> (so a reversed action from "state" to "parent" is the forward action "state" to "parent" read backwards)
+# ==> Both directions expand the states in order of their key like UCS (key = path cost) or AStar (key = path cost + potential)
+# ==> Bidirectional AStar uses the average potentials: forward p(s) = (h_goal(s) - h_start(s)) / 2 and backward -p(s)
+# ==> where h_goal is the heuristic of the problem and h_start is the heuristic of the reversed problem,
+# ==> so both directions agree on the reduced cost of every action and it is still non-negative if both heuristics are consistent
+# ==> Every time a state is reached by both directions, the cost of the path through it updates the best cost (mu)
+# ==> The search stops once the sum of the lowest keys in both frontiers is not lower than mu
+# ==> since any path that was not seen yet must cost at least this sum (the potentials cancel out)
+# ==> In each step, we expand the direction with the smaller frontier
+def BidirectionalSearch(problem: Problem[S, A], initial_state: S, heuristic: Optional[HeuristicFunction]) -> Solution:
+
+    # ==> Reset the statistics of the search
+    global last_statistics
+    statistics = last_statistics = SearchStatistics()
+
+    if problem.is_goal(initial_state): return []
+    backward = problem.reverse(initial_state)
+    goal = backward.get_initial_state()
+
+    # ==> Compute the potential of a state in the forward direction (the backward direction uses its negative)
+    if heuristic is None:
+        potential = lambda state: 0
+    else:
+        forward_h = HeuristicCache(problem, heuristic, statistics)
+        backward_h = HeuristicCache(backward, heuristic, statistics)
+        potential = lambda state: (forward_h(state) - backward_h(state)) / 2
+
+    # ==> Index 0 is the forward direction and index 1 is the backward direction
+    problems = (problem, backward)
+    signs = (1, -1)
+    frontiers = (HeapFrontier(), HeapFrontier())
+    g = ({initial_state: 0}, {goal: 0})
+    parents = ({initial_state: None}, {goal: None})
+    explored = (set(), set())
+    frontiers[0].push(initial_state, potential(initial_state), None)
+    frontiers[1].push(goal, -potential(goal), None)
+
+    # ==> mu is the cost of the best path found so far and meeting is the state where its two halves meet
+    mu, meeting = float('inf'), None
+
+    while frontiers[0] and frontiers[1]:
+        # ==> Stopping criterion: no unseen path can be cheaper than mu
+        if frontiers[0].peek() + frontiers[1].peek() >= mu: break
+
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        frontier, sign = frontiers[side], signs[side]
+        side_g, other_g, side_parents = g[side], g[1 - side], parents[side]
+
+        _, state, _ = frontier.pop()
+        explored[side].add(state)
+        statistics.expanded += 1
+        state_g = side_g[state]
+
+        for action, child, step_cost in problems[side].get_successors(state):
+            if child in explored[side]: continue
+            child_g = state_g + step_cost
+            # ==> Only update the child if we found a cheaper path to it from this side
+            if child_g >= side_g.get(child, float('inf')): continue
+            side_g[child] = child_g
+            side_parents[child] = (state, action)
+            frontier.push(child, child_g + sign * potential(child), None)
+            statistics.generated += 1
+            # ==> If the other side reached the child too, we found a path through it
+            if child in other_g and child_g + other_g[child] < mu:
+                mu, meeting = child_g + other_g[child], child
+
+    # ==> if the two searches never met, then there is no solution
+    if meeting is None: return None
+
+    # ==> The first half of the path comes from the forward parents (from the meeting state back to the initial state)
+    path = []
+    state = meeting
+    while parents[0][state] is not None:
+        state, action = parents[0][state]
+        path.append(action)
+    path.reverse()
+    # ==> The second half follows the backward parents from the meeting state to the goal
+    # ==> Since the actions are the states they lead to, the forward action from a state is its backward parent
+    state = meeting
+    while parents[1][state] is not None:
+        state, _ = parents[1][state]
+        path.append(state)
+    return path
+
+# ==> BidirectionalUniformCostSearch
+def BidirectionalUniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
+    return BidirectionalSearch(problem, initial_state, None)
+
+# ==> BidirectionalAStarSearch
+def BidirectionalAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
+    return BidirectionalSearch(problem, initial_state, heuristic)
+
+
+# ==> The following functions are memory-bounded searches (iterative deepening)
+# ==> They search depth first with a bound on the cost and increase the bound after every iteration
+# ==> So the memory grows linearly with the depth of the solution instead of the size of the explored set
+# ==> A small transposition table (state -> [lowest path cost seen in this iteration, heuristic]) is used
+# ==> to avoid expanding a state again (e.g., through a cycle) if it was already reached with a lower or equal path cost
+# ==> Once the table is full, new states are not added to it (states on the current path are still never revisited)
+TRANSPOSITION_TABLE_SIZE = 2**16
+
+# ==> This function searches depth first from the initial state but it does not go past nodes whose cost (g + h) exceeds the bound
+# ==> It returns the solution (or None) and the lowest cost that exceeded the bound (which will be the bound of the next iteration)
+# ==> The heuristic values are only kept in the transposition table (there is no HeuristicCache, since it would grow with
+# ==> the number of generated states), so the heuristic is called again for a child that is not in the table
+def BoundedDepthFirstSearch(problem: Problem[S, A], initial_state: S, bound: float, heuristic: Optional[HeuristicFunction],
+                            unit_cost: bool, table: dict, table_size: int, statistics: SearchStatistics) -> Tuple[Solution, float]:
+    
+    # ==> Initialize the next bound to infinity (if no node exceeds the bound, then there is no solution)
+    next_bound = float('inf')
+
+    # ==> The stack contains (state, path cost, iterator over the successors) for every node on the current path
+    # ==> path contains the actions from the initial state to the node at the top of the stack
+    stack = [(initial_state, 0, iter(problem.get_successors(initial_state)))]
+    statistics.expanded += 1
+    on_path = {initial_state}
+    path = []
+
+    while stack:
+        state, g, successors = stack[-1]
+
+        # ==> Go to the next child whose cost does not exceed the bound
+        for action, child, step_cost in successors:
+            statistics.generated += 1
+
+            # ==> Skip the states on the current path (cycles)
+            if child in on_path: continue
+
+            # ==> calculate the path cost (the depth if unit_cost is True)
+            child_g = g + (1 if unit_cost else step_cost)
+
+            # ==> Skip the child if it was already reached in this iteration with a lower or equal path cost
+            # ==> otherwise, get its heuristic from the table or compute it
+            entry = table.get(child)
+            if entry is not None:
+                if entry[0] <= child_g: continue
+                entry[0] = child_g
+                child_h = entry[1]
+                if heuristic is not None: statistics.heuristic_hits += 1
+            else:
+                child_h = 0
+                if heuristic is not None:
+                    child_h = heuristic(problem, child)
+                    statistics.heuristic_misses += 1
+                if len(table) < table_size: table[child] = [child_g, child_h]
+
+            # ==> If the child exceeds the bound, we don't visit it but we remember its cost for the next bound
+            child_cost = child_g + child_h
+            if child_cost > bound:
+                if child_cost < next_bound: next_bound = child_cost
+                continue
+
+            # ==> if the child node is a goal state then return the corresponding solution
+            path.append(action)
+            if problem.is_goal(child):
+                return path, bound
+
+            # ==> Visit the child (expand it)
+            stack.append((child, child_g, iter(problem.get_successors(child))))
+            statistics.expanded += 1
+            on_path.add(child)
+            break
+        else:
+            # ==> All the children were visited, so we go back to the parent
+            stack.pop()
+            on_path.remove(state)
+            if path: path.pop()
+
+    # ==> if no solution was found, then return None
+    return None, next_bound
+
+# ==> This function runs BoundedDepthFirstSearch with an increasing bound until a solution is found
+# ==> Every iteration starts with an empty transposition table, so the memory of an iteration is bounded by the depth and the table size
+def IterativeDeepening(problem: Problem[S, A], initial_state: S, heuristic: Optional[HeuristicFunction], unit_cost: bool,
+                       table_size: int) -> Solution:
+    
+    # ==> Reset the statistics of the search
+    global last_statistics
+    statistics = last_statistics = SearchStatistics()
+
+    if problem.is_goal(initial_state):
+        return []
+
+    bound = 0
+    if heuristic is not None:
+        bound = heuristic(problem, initial_state)
+        statistics.heuristic_misses += 1
+    while bound != float('inf'):
+        path, bound = BoundedDepthFirstSearch(problem, initial_state, bound, heuristic, unit_cost, {}, table_size, statistics)
+        if path is not None:
+            return path
+
+    # ==> if no solution was found, then return None
+    return None
+
+# ==> IterativeDeepeningSearch (the bound is the depth, so it finds the solution with the least number of actions like BFS)
+def IterativeDeepeningSearch(problem: Problem[S, A], initial_state: S, table_size: int = TRANSPOSITION_TABLE_SIZE) -> Solution:
+    return IterativeDeepening(problem, initial_state, None, True, table_size)
+
+# ==> IterativeDeepeningAStar (IDA*) (the bound is on g + h, so it finds the optimal solution if the heuristic is admissible)
+def IterativeDeepeningAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+                            table_size: int = TRANSPOSITION_TABLE_SIZE) -> Solution:
+    return IterativeDeepening(problem, initial_state, heuristic, False, table_size)
+
+
+# ==> The following function is an anytime search: Anytime Repairing A* (ARA*)
+# ==> It quickly finds a solution using weighted A* (cost = g + weight * h), then it decreases the weight and repairs the search
+# ==> to find better solutions until the weight reaches 1 (the solution is optimal if the heuristic is admissible)
+# ==> Instead of starting from scratch after every decrease of the weight, it reuses:
+# ==>   OPEN: the frontier (its costs are recomputed using the new weight)
+# ==>   INCONS: the explored states whose path cost decreased after they were explored (they are moved back to OPEN)
+# ==> It is a generator that yields an AnytimeSolution every time it finds a better solution or tightens the bound
+# ==> If a deadline (time.monotonic() value) is given, it stops improving the solution once the deadline is reached
+# ==> but it always searches until the first solution is found (or until it proves there is no solution)
+
+# ==> This class contains a solution found by an anytime search
+@dataclass
+class AnytimeSolution(Generic[A]):
+    path: List[A]       # ==> the actions from the initial state to the goal
+    cost: float         # ==> the path cost of the solution
+    bound: float        # ==> the suboptimality bound: cost <= bound * optimal cost
+
+# ==> AnytimeRepairingAStar
+def AnytimeRepairingAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, weight: float = 3.0,
+                          weight_step: float = 0.5, deadline: Optional[float] = None) -> Iterator[AnytimeSolution[A]]:
+    
+    # ==> Reset the statistics of the search
+    global last_statistics
+    statistics = last_statistics = SearchStatistics()
+    h = HeuristicCache(problem, heuristic, statistics)
+
+    if problem.is_goal(initial_state):
+        yield AnytimeSolution([], 0, 1)
+        return
+
+    # ==> g stores the lowest known path cost for every generated state and parents stores how it was reached (parent, action)
+    g = {initial_state: 0}
+    parents = {initial_state: None}
+    
+    # ==> The best goal found so far and its path cost
+    goal, goal_cost = None, float('inf')
+
+    # ==> This function rebuilds the path from the initial state to the given state
+    def get_path(state: S) -> List[A]:
+        path = []
+        while parents[state] is not None:
+            state, action = parents[state]
+            path.append(action)
+        path.reverse()
+        return path
+
+    frontier = HeapFrontier()
+    frontier.push(initial_state, weight * h(initial_state), None)
+    explored, inconsistent = set(), set()
+    bound, yielded_cost = float('inf'), float('inf')
+
+    while True:
+        # ==> ImprovePath: expand the nodes until the best goal cost does not exceed the lowest cost in the frontier
+        while frontier and frontier.peek() < goal_cost:
+            if deadline is not None and goal is not None and time.monotonic() >= deadline: break
+            _, state, _ = frontier.pop()
+            explored.add(state)
+            statistics.expanded += 1
+            state_g = g[state]
+            for action, child, step_cost in problem.get_successors(state):
+                statistics.generated += 1
+                child_g = state_g + step_cost
+                # ==> Only update the child if we found a cheaper path to it
+                if child_g >= g.get(child, float('inf')): continue
+                g[child] = child_g
+                parents[child] = (state, action)
+                if problem.is_goal(child):
+                    # ==> No need to expand a goal since any path through it to another goal costs more
+                    if child_g < goal_cost: goal, goal_cost = child, child_g
+                elif child in explored:
+                    # ==> The child was already explored in this iteration, so we keep it in INCONS till the next iteration
+                    inconsistent.add(child)
+                else:
+                    frontier.push(child, child_g + weight * h(child), None)
+        
+        # ==> if no solution was found, then stop
+        if goal is None: return
+
+        # ==> Compute the suboptimality bound: the goal cost divided by a lower bound on the optimal cost
+        lower_bound = min((g[state] + h(state) for state in [*frontier, *inconsistent]), default=float('inf'))
+        new_bound = max(1.0, min(weight, goal_cost / lower_bound if lower_bound > 0 else weight))
+        if new_bound < bound or goal_cost < yielded_cost:
+            bound, yielded_cost = new_bound, goal_cost
+            yield AnytimeSolution(get_path(goal), goal_cost, bound)
+        if bound <= 1 or weight <= 1: return
+        if deadline is not None and time.monotonic() >= deadline: return
+
+        # ==> Decrease the weight, move INCONS into OPEN and recompute the costs in OPEN using the new weight
+        weight = max(1.0, weight - weight_step)
+        states = [*frontier, *inconsistent]
+        frontier = HeapFrontier()
+        for state in states:
+            frontier.push(state, g[state] + weight * h(state), None)
+        explored, inconsistent = set(), set()
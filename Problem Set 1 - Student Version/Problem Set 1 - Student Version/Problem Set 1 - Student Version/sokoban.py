@@ -1,10 +1,12 @@
-from dataclasses import dataclass
-from typing import FrozenSet, Iterable
+from dataclasses import InitVar, dataclass
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from collections import deque
 from enum import Enum
+import random
 
 from mathutils import Direction, Point
 from problem import Problem
-from helpers.utils import track_call_count
+from helpers.utils import track_call_count, track_call_count_as
 
 # This file contains the definition for the Sokoban problem
 # In this problem, the agent can move Up, Down, Left or Right
@@ -20,31 +22,209 @@ class SokobanTile(str, Enum):
     CRATE_ON_GOAL  = "*"
     PLAYER_ON_GOAL = "+"
 
+# A push is a tuple containing the position of a crate and the direction in which it is pushed
+SokobanPush = Tuple[Point, Direction]
+# A macro is a sequence of pushes that is applied as a single action (its cost is the number of pushes)
+SokobanMacro = Tuple[SokobanPush, ...]
+
+# Returns the cells that the player can reach from the given position without pushing any crate
+def reachable_cells(walkable: FrozenSet[Point], crates: FrozenSet[Point], player: Point) -> Set[Point]:
+    reachable, queue = {player}, deque([player])
+    while queue:
+        position = queue.popleft()
+        for direction in Direction:
+            neighbor = position + direction.to_vector()
+            if neighbor in walkable and neighbor not in crates and neighbor not in reachable:
+                reachable.add(neighbor)
+                queue.append(neighbor)
+    return reachable
+
+# Returns the shortest sequence of pushes that moves a crate from "start" to "goal" when the player stands at "player"
+# The crate and the player can only use the given cells and the player must be able to walk back to "exit" after the last push
+def push_path(cells: FrozenSet[Point], start: Point, player: Point, goal: Point, exit: Point) -> Optional[SokobanMacro]:
+    parents: Dict[Tuple[Point, Point], Any] = {(start, player): None}
+    queue = deque([(start, player)])
+    while queue:
+        crate, player = queue.popleft()
+        area = reachable_cells(cells, frozenset([crate]), player)
+        if crate == goal and exit in area:
+            path = []
+            node = (crate, player)
+            while parents[node] is not None:
+                node, push = parents[node]
+                path.append(push)
+            path.reverse()
+            return tuple(path)
+        for direction in Direction:
+            vector = direction.to_vector()
+            if crate - vector not in area or crate + vector not in cells: continue
+            child = (crate + vector, crate)
+            if child in parents: continue
+            parents[child] = ((crate, player), (crate, direction))
+            queue.append(child)
+    return None
+
+# A goal room is an area with goals that is only connected to the rest of the level through one cell (its entrance)
+# Its packing order is an order in which the goals can be filled with crates pushed through the entrance (see SokobanLayout.goal_rooms)
+@dataclass(frozen=True)
+class GoalRoom:
+    entrance: Point                         # the only cell connecting the room to the rest of the level
+    direction: Direction                    # the direction from the entrance into the room
+    cells: FrozenSet[Point]                 # the cells of the room (without the entrance)
+    order: Tuple[Point, ...]                # the goals of the room in packing order
+    paths: Tuple[SokobanMacro, ...]         # paths[k] pushes a crate from the entrance to order[k] when order[:k] are filled
+
 # For the sokoban state, we use dataclass to automatically implement:
 #   the constructor and to make the class immutable
 # We disable the automatic equality implementation since we don't need it;
 # we only need the default equality which compares objects by pointers.
 # The layout contains the problem details that are unchangeable across states such as:
 #   The walkable area (locations without walls) and the locations of the goals
+# The layout also has a cache (like Problem.cache) to store the data that is computed once per level,
+# such as the Zobrist keys used to hash the states (see SokobanState), the dead squares, the tunnels and the goal rooms
 @dataclass(eq=False, frozen=True)
 class SokobanLayout:
-    __slots__ = ("width", "height", "walkable", "goals")
+    __slots__ = ("width", "height", "walkable", "goals", "_cache")
     width: int
     height: int
     walkable: FrozenSet[Point]
     goals: FrozenSet[Point]
 
+    # The seed of the Zobrist keys, so the keys (and the hashes of the states) are the same in every run and every process
+    ZOBRIST_SEED = 0
+
+    # Returns a dictionary in which we can store any data computed from the layout
+    def cache(self) -> Dict[str, Any]:
+        try:
+            return self._cache
+        except AttributeError:
+            cache = {}
+            # The layout is frozen, so we have to bypass its __setattr__ to store the cache
+            object.__setattr__(self, "_cache", cache)
+            return cache
+
+    # Returns the Zobrist keys of the layout as two dictionaries: the keys of the player positions and the keys of the crate positions
+    # Every walkable position gets a random 64-bit key for the player and another for a crate
+    # The keys are generated on the first call and stored in the cache
+    def zobrist(self) -> Tuple[Dict[Point, int], Dict[Point, int]]:
+        cache = self.cache()
+        keys = cache.get("zobrist")
+        if keys is None:
+            rng = random.Random(SokobanLayout.ZOBRIST_SEED)
+            positions = sorted(self.walkable, key=lambda position: (position.y, position.x))
+            keys = cache["zobrist"] = ({position: rng.getrandbits(64) for position in positions}, {position: rng.getrandbits(64) for position in positions})
+        return keys
+
+    # Returns the dead squares: the positions from which a crate can never be pushed to a goal (e.g. corners without goals)
+    # They are found by pulling crates backwards from the goals: a crate can be pulled from a position in some direction
+    # if the position and the one after it (where the player would stand) are walkable.
+    # Every position that is never reached by pulling is dead. The result is computed once and stored in the cache.
+    def dead_squares(self) -> FrozenSet[Point]:
+        cache = self.cache()
+        dead = cache.get("dead_squares")
+        if dead is None:
+            walkable = self.walkable
+            live, queue = set(self.goals), deque(self.goals)
+            while queue:
+                position = queue.popleft()
+                for direction in Direction:
+                    vector = direction.to_vector()
+                    # A crate at "previous" can be pushed to "position" if the player can stand behind it
+                    previous = position - vector
+                    if previous in live or previous not in walkable or previous - vector not in walkable: continue
+                    live.add(previous)
+                    queue.append(previous)
+            dead = cache["dead_squares"] = walkable - live
+        return dead
+
+    # Returns the tunnel cells of the layout as two sets: the horizontal tunnel cells and the vertical ones
+    # A cell is a horizontal tunnel cell if it has walls above and below it, and its left and right neighbors
+    # are walkable but only connected through it (the cell cuts the level in two parts), and the same for vertical tunnel cells.
+    # These cells are used by the tunnel macros of the push-level problem (see sokoban_push.py).
+    def tunnels(self) -> Tuple[FrozenSet[Point], FrozenSet[Point]]:
+        cache = self.cache()
+        tunnels = cache.get("tunnels")
+        if tunnels is None:
+            walkable = self.walkable
+            def is_tunnel(cell: Point, across: Point, along: Point) -> bool:
+                if cell + across in walkable or cell - across in walkable: return False
+                before, after = cell - along, cell + along
+                if before not in walkable or after not in walkable: return False
+                return after not in reachable_cells(walkable, frozenset([cell]), before)
+            up, right = Direction.UP.to_vector(), Direction.RIGHT.to_vector()
+            tunnels = cache["tunnels"] = (
+                frozenset(cell for cell in walkable if is_tunnel(cell, up, right)),
+                frozenset(cell for cell in walkable if is_tunnel(cell, right, up)),
+            )
+        return tunnels
+
+    # Returns the goal rooms of the layout (see GoalRoom)
+    # The packing order of a room is found backwards: with all the goals filled, the last goal is one that a crate could be pushed to
+    # from the entrance (while the player can still walk back to the entrance), then it is emptied and we repeat with the remaining goals.
+    # The rooms whose goals cannot all be ordered this way are skipped.
+    def goal_rooms(self) -> List[GoalRoom]:
+        cache = self.cache()
+        rooms = cache.get("goal_rooms")
+        if rooms is not None: return rooms
+        walkable, goals = self.walkable, self.goals
+        rooms = []
+        for entrance in sorted(walkable - goals, key=lambda cell: (cell.y, cell.x)):
+            for direction in Direction:
+                vector = direction.to_vector()
+                inside, outside = entrance + vector, entrance - vector
+                if inside not in walkable or outside not in walkable: continue
+                # The room is the area behind the entrance, it must not be connected to the cell before the entrance
+                cells = frozenset(reachable_cells(walkable, frozenset([entrance]), inside))
+                if outside in cells or cells.isdisjoint(goals): continue
+                room_goals = set(cells & goals)
+                # The cells that the crate and the player can use while filling the room
+                area = cells | {entrance, outside}
+                order, paths = [], []
+                while room_goals:
+                    for goal in sorted(room_goals, key=lambda cell: (cell.y, cell.x)):
+                        path = push_path(area - (room_goals - {goal}), entrance, outside, goal, entrance)
+                        if path is not None: break
+                    else:
+                        break
+                    order.append(goal)
+                    paths.append(path)
+                    room_goals.remove(goal)
+                if room_goals: continue
+                order.reverse()
+                paths.reverse()
+                rooms.append(GoalRoom(entrance, direction, cells, tuple(order), tuple(paths)))
+        cache["goal_rooms"] = rooms
+        return rooms
+
 # For the sokoban state, we use dataclass with frozen=True to automatically implement:
-#   the constructor, the == operator, the hash function and to make the class immutable
+#   the constructor, the == operator and to make the class immutable
 # Now it can be added to sets and used as keys in dictionaries
 # This will contain a reference to the sokoban layout and it will contain environment details that change across states such as:
 #   The player location and the locations of the crates 
+# The hash of the state is its Zobrist hash: the XOR of the key of the player position and the keys of the crate positions.
+# It is computed once when the state is created and stored in the state (zobrist).
+# Since a move only changes the player position and at most one crate, the successors compute their hash from their parent's hash
+# using a few XORs and pass it to the constructor (key), so the hash costs O(1) instead of O(number of crates).
+# The hash is also a compact 64-bit key for the state (see ZobristSet).
 @dataclass(frozen=True)
 class SokobanState:
-    __slots__ = ("layout", "player", "crates")
+    __slots__ = ("layout", "player", "crates", "zobrist")
     layout: SokobanLayout
     player: Point
     crates: FrozenSet[Point]
+    key: InitVar[Optional[int]] = None
+
+    def __post_init__(self, key: Optional[int]) -> None:
+        if key is None:
+            player_keys, crate_keys = self.layout.zobrist()
+            key = player_keys[self.player]
+            for crate in self.crates:
+                key ^= crate_keys[crate]
+        # The state is frozen, so we have to bypass its __setattr__ to store the hash
+        object.__setattr__(self, "zobrist", key)
+
+    def __hash__(self) -> int:
+        return self.zobrist
 
     # This operator will convert the state to a string containing the grid representation of the level at the current state
     def __str__(self) -> str:
@@ -60,6 +240,25 @@ class SokobanState:
             return SokobanTile.EMPTY
         return '\n'.join(''.join(position_to_str(Point(x, y)) for x in range(self.layout.width)) for y in range(self.layout.height))
 
+# A set of sokoban states that only stores the Zobrist hash of every state (a 64-bit key) instead of the state itself
+# It can be used as the explored set of a search (search.GraphSearch) to save memory on large searches.
+# Two different states could have the same key, in which case one of them would be wrongly considered explored,
+# but with 64-bit keys this is very unlikely unless the search explores billions of states.
+class ZobristSet:
+    __slots__ = ("keys",)
+
+    def __init__(self) -> None:
+        self.keys = set()
+
+    def add(self, state: SokobanState) -> None:
+        self.keys.add(state.zobrist)
+
+    def __contains__(self, state: SokobanState) -> bool:
+        return state.zobrist in self.keys
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
 # This is a list of all the possible actions for the sokoban agent
 AllSokobanActions = [
     Direction.RIGHT,
@@ -68,11 +267,37 @@ AllSokobanActions = [
     Direction.LEFT
 ]
 
+# A push filter receives the problem, the state after a push and the new position of the pushed crate
+# and returns True if the state is a deadlock (no crate arrangement reachable from it is a goal)
+# The available filters are in sokoban_deadlocks.py
+PushFilter = Callable[['SokobanProblem', SokobanState, Point], bool]
+
 # This is the implementation of the sokoban problem
+# By default, every valid action is returned. If push filters are set (see set_push_filters),
+# the pushes that lead to a deadlock detected by one of the filters are skipped and counted in "pruned" (for each filter).
+# Since this changes the expanded nodes, the filters are opt-in.
 class SokobanProblem(Problem[SokobanState, Direction]):
     # The problem will contain the sokoban layout and the inital state
     layout: SokobanLayout
     initial_state: SokobanState
+    # All actions cost 1
+    integer_costs = True
+    # The push filters and the number of pushes pruned by each filter (by name)
+    push_filters: Tuple[PushFilter, ...] = ()
+    pruned: Dict[str, int]
+
+    # Set the push filters and reset their pruned counts
+    def set_push_filters(self, push_filters: Iterable[PushFilter]) -> None:
+        self.push_filters = tuple(push_filters)
+        self.pruned = {push_filter.__name__: 0 for push_filter in self.push_filters}
+
+    # Returns True if one of the push filters detects a deadlock after pushing a crate to the given position
+    def is_deadlock(self, state: SokobanState, crate: Point) -> bool:
+        for push_filter in self.push_filters:
+            if push_filter(self, state, crate):
+                self.pruned[push_filter.__name__] += 1
+                return True
+        return False
 
     def get_initial_state(self) -> SokobanState:
         return self.initial_state
@@ -94,6 +319,10 @@ class SokobanProblem(Problem[SokobanState, Direction]):
                 crate_position = position + direction.to_vector()
                 if crate_position not in self.layout.walkable or crate_position in state.crates:
                     continue
+                # skip the pushes that lead to a deadlock
+                if self.push_filters:
+                    successor = SokobanState(self.layout, position, state.crates.symmetric_difference({position, crate_position}))
+                    if self.is_deadlock(successor, crate_position): continue
             actions.append(direction)
         return actions
 
@@ -103,6 +332,9 @@ class SokobanProblem(Problem[SokobanState, Direction]):
         if player not in self.layout.walkable:
             # If we try to walk into a wall, then this action is wrong
             raise Exception(f"Invalid action {action} in state:" + "\n" + str(state))
+        # Update the hash: remove the key of the old player position and add the key of the new one
+        player_keys, crate_keys = self.layout.zobrist()
+        key = state.zobrist ^ player_keys[state.player] ^ player_keys[player]
         if player in crates:
             crate_position = player + action.to_vector()
             if crate_position not in self.layout.walkable or crate_position in crates:
@@ -110,12 +342,48 @@ class SokobanProblem(Problem[SokobanState, Direction]):
                 raise Exception(f"Invalid action {action} in state:" + "\n" + str(state))
             # If we walk to a crate, we push it
             crates = crates.symmetric_difference({player,crate_position})
-        return SokobanState(state.layout, player, crates)
+            key ^= crate_keys[player] ^ crate_keys[crate_position]
+        return SokobanState(state.layout, player, crates, key)
 
     def get_cost(self, state: SokobanState, action: Direction) -> float:
         # All actions have the same cost
         return 1
 
+    # This does the work of "get_actions", "get_successor" and "get_cost" in one pass over the directions
+    # Its calls are counted as calls to "get_actions" since it expands the state
+    @track_call_count_as(get_actions)
+    def get_successors(self, state: SokobanState) -> List[Tuple[Direction, SokobanState, float]]:
+        layout, walkable, crates = self.layout, self.layout.walkable, state.crates
+        player_keys, crate_keys = layout.zobrist()
+        # The hash of the state without the player (each successor adds the key of its player position)
+        key = state.zobrist ^ player_keys[state.player]
+        successors = []
+        for direction in Direction:
+            vector = direction.to_vector()
+            player = state.player + vector
+            # Disallow walking into walls
+            if player not in walkable: continue
+            if player in crates:
+                # make sure that the crate is not pushed into a wall or another crate
+                crate_position = player + vector
+                if crate_position not in walkable or crate_position in crates: continue
+                successor = SokobanState(layout, player, crates.symmetric_difference({player, crate_position}),
+                                         key ^ player_keys[player] ^ crate_keys[player] ^ crate_keys[crate_position])
+                # skip the pushes that lead to a deadlock
+                if self.push_filters and self.is_deadlock(successor, crate_position): continue
+            else:
+                successor = SokobanState(layout, player, crates, key ^ player_keys[player])
+            successors.append((direction, successor, 1))
+        return successors
+
+    # The layout is compared by identity, so we only send the player and the crates to other processes
+    # and the receiving process attaches its own layout to them
+    def pack_state(self, state: SokobanState) -> Tuple[Point, FrozenSet[Point]]:
+        return state.player, state.crates
+
+    def unpack_state(self, packed: Tuple[Point, FrozenSet[Point]]) -> SokobanState:
+        return SokobanState(self.layout, *packed)
+
     # Read a sokoban problem from text containing a grid of tiles
     @staticmethod
     def from_text(text: str) -> 'SokobanProblem':
@@ -148,4 +416,23 @@ class SokobanProblem(Problem[SokobanState, Direction]):
     @staticmethod
     def from_file(path: str) -> 'SokobanProblem':
         with open(path, 'r') as f:
-            return SokobanProblem.from_text(f.read())
\ No newline at end of file
+            return SokobanProblem.from_text(f.read())
+
+# Split a level collection (e.g. a published level set in the common text format) into the texts of its levels
+# The lines that are not rows of a grid (titles, comments, empty lines) separate the levels.
+# Some collections use '-' or '_' for empty floor, and since "from_text" strips the lines,
+# the spaces before the first wall of each row (outside the level) are replaced by walls to keep the rows aligned.
+def split_level_collection(text: str) -> List[str]:
+    tiles = set(tile.value for tile in SokobanTile) | {'-', '_'}
+    levels, rows = [], []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if line and SokobanTile.WALL in line and set(line) <= tiles:
+            line = line.replace('-', SokobanTile.EMPTY).replace('_', SokobanTile.EMPTY)
+            indent = len(line) - len(line.lstrip())
+            rows.append(SokobanTile.WALL * indent + line[indent:])
+        elif rows:
+            levels.append('\n'.join(rows))
+            rows = []
+    if rows: levels.append('\n'.join(rows))
+    return levels
@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+from mathutils import Direction, Point, manhattan_distance
+from problem import Problem
+from sokoban import SokobanLayout, SokobanProblem, SokobanState, SokobanTile
+from helpers.utils import track_call_count, track_call_count_as
+
+# This file contains a compact encoding of the Sokoban problem (a bitboard)
+# The walkable cells of the layout are numbered (row by row), so a position is an integer index
+# and the crates are an integer bitmask where bit 'i' is set if there is a crate on cell 'i'.
+# Moving and pushing only need the precomputed neighbor tables and a few bit operations,
+# so no Point or frozenset is created while expanding a state.
+# The problem has the same actions (in the same order) and the same costs as SokobanProblem,
+# so any search expands the same nodes and finds the same solution with both encodings.
+
+# The layout contains the problem details that are unchangeable across states
+# Like SokobanLayout, it is compared by identity
+@dataclass(eq=False, frozen=True)
+class BitboardLayout:
+    __slots__ = ("width", "height", "cells", "index", "bits", "moves", "goals")
+    width: int
+    height: int
+    cells: Tuple[Point, ...]                                # cells[i] is the position of cell 'i'
+    index: Dict[Point, int]                                 # index[position] is the number of the cell at this position
+    bits: Tuple[int, ...]                                   # bits[i] is the mask of cell 'i' (1 << i)
+    moves: Tuple[Tuple[Tuple[Direction, int, int], ...], ...] # moves[i] contains (direction, next cell, cell after it or -1) for every walkable neighbor of cell 'i'
+    goals: int                                              # the mask of the goal cells
+
+    # Build the bitboard layout from a sokoban layout
+    @staticmethod
+    def from_layout(layout: SokobanLayout) -> 'BitboardLayout':
+        cells = tuple(sorted(layout.walkable, key=lambda position: (position.y, position.x)))
+        index = {position: i for i, position in enumerate(cells)}
+        moves = []
+        for position in cells:
+            cell_moves = []
+            for direction in Direction:
+                vector = direction.to_vector()
+                next_cell = index.get(position + vector)
+                if next_cell is None: continue
+                cell_moves.append((direction, next_cell, index.get(position + vector + vector, -1)))
+            moves.append(tuple(cell_moves))
+        goals = sum(1 << index[goal] for goal in layout.goals)
+        return BitboardLayout(layout.width, layout.height, cells, index, tuple(1 << i for i in range(len(cells))), tuple(moves), goals)
+
+# The state contains the cell of the player and the crates mask
+# Two states are equal (and have the same hash) if they have the same layout, player and crates, as in SokobanState
+@dataclass(frozen=True)
+class BitboardState:
+    __slots__ = ("layout", "player", "crates")
+    layout: BitboardLayout
+    player: int
+    crates: int
+
+    # This operator will convert the state to the same string as the equivalent SokobanState
+    def __str__(self) -> str:
+        layout, crates = self.layout, self.crates
+        def position_to_str(position):
+            cell = layout.index.get(position)
+            if cell is None:
+                return SokobanTile.WALL
+            goal = layout.goals >> cell & 1
+            if cell == self.player:
+                return SokobanTile.PLAYER_ON_GOAL if goal else SokobanTile.PLAYER
+            if crates >> cell & 1:
+                return SokobanTile.CRATE_ON_GOAL if goal else SokobanTile.CRATE
+            if goal:
+                return SokobanTile.GOAL
+            return SokobanTile.EMPTY
+        return '\n'.join(''.join(position_to_str(Point(x, y)) for x in range(layout.width)) for y in range(layout.height))
+
+    # Returns the positions of the crates
+    def crate_positions(self) -> List[Point]:
+        crates, cells = self.crates, self.layout.cells
+        return [cells[cell] for cell in range(crates.bit_length()) if crates >> cell & 1]
+
+# This is the implementation of the sokoban problem using the bitboard encoding
+class BitboardSokobanProblem(Problem[BitboardState, Direction]):
+    layout: BitboardLayout
+    initial_state: BitboardState
+    # All actions cost 1
+    integer_costs = True
+
+    def get_initial_state(self) -> BitboardState:
+        return self.initial_state
+
+    def is_goal(self, state: BitboardState) -> bool:
+        return self.layout.goals == state.crates
+
+    # We use @track_call_count to track the number of times this function was called to count the number of explored nodes
+    @track_call_count
+    def get_actions(self, state: BitboardState) -> Iterable[Direction]:
+        bits, crates = self.layout.bits, state.crates
+        actions = []
+        for direction, cell, beyond in self.layout.moves[state.player]:
+            # make sure that a pushed crate does not go into a wall or another crate
+            if crates & bits[cell] and (beyond < 0 or crates & bits[beyond]): continue
+            actions.append(direction)
+        return actions
+
+    def get_successor(self, state: BitboardState, action: Direction) -> BitboardState:
+        bits, crates = self.layout.bits, state.crates
+        for direction, cell, beyond in self.layout.moves[state.player]:
+            if direction != action: continue
+            if crates & bits[cell]:
+                if beyond < 0 or crates & bits[beyond]: break
+                # If we walk to a crate, we push it
+                crates ^= bits[cell] | bits[beyond]
+            return BitboardState(state.layout, cell, crates)
+        # If we try to walk into a wall or push a crate into a wall or another crate, then this action is wrong
+        raise Exception(f"Invalid action {action} in state:" + "\n" + str(state))
+
+    def get_cost(self, state: BitboardState, action: Direction) -> float:
+        # All actions have the same cost
+        return 1
+
+    # This does the work of "get_actions", "get_successor" and "get_cost" in one pass over the moves
+    # Its calls are counted as calls to "get_actions" since it expands the state
+    @track_call_count_as(get_actions)
+    def get_successors(self, state: BitboardState) -> List[Tuple[Direction, BitboardState, float]]:
+        layout, bits, crates = self.layout, self.layout.bits, state.crates
+        successors = []
+        for direction, cell, beyond in layout.moves[state.player]:
+            bit = bits[cell]
+            if crates & bit:
+                if beyond < 0 or crates & bits[beyond]: continue
+                successors.append((direction, BitboardState(layout, cell, crates ^ bit ^ bits[beyond]), 1))
+            else:
+                successors.append((direction, BitboardState(layout, cell, crates), 1))
+        return successors
+
+    # The layout is compared by identity, so we only send the player and the crates to other processes
+    def pack_state(self, state: BitboardState) -> Tuple[int, int]:
+        return state.player, state.crates
+
+    def unpack_state(self, packed: Tuple[int, int]) -> BitboardState:
+        return BitboardState(self.layout, *packed)
+
+    # Convert a state of the equivalent SokobanProblem to a bitboard state (and back)
+    def encode(self, state: SokobanState) -> BitboardState:
+        index = self.layout.index
+        return BitboardState(self.layout, index[state.player], sum(1 << index[crate] for crate in state.crates))
+
+    def decode(self, state: BitboardState, layout: SokobanLayout) -> SokobanState:
+        return SokobanState(layout, self.layout.cells[state.player], frozenset(state.crate_positions()))
+
+    # Build the bitboard problem from a sokoban problem
+    @staticmethod
+    def from_problem(problem: SokobanProblem) -> 'BitboardSokobanProblem':
+        bitboard = BitboardSokobanProblem()
+        bitboard.layout = BitboardLayout.from_layout(problem.layout)
+        bitboard.initial_state = bitboard.encode(problem.initial_state)
+        return bitboard
+
+    # Read a sokoban problem from text containing a grid of tiles
+    @staticmethod
+    def from_text(text: str) -> 'BitboardSokobanProblem':
+        return BitboardSokobanProblem.from_problem(SokobanProblem.from_text(text))
+
+    # Read a sokoban problem from file containing a grid of tiles
+    @staticmethod
+    def from_file(path: str) -> 'BitboardSokobanProblem':
+        with open(path, 'r') as f:
+            return BitboardSokobanProblem.from_text(f.read())
+
+# The same heuristic as sokoban_heuristic.weak_heuristic (the distance between the player and the nearest crate)
+def bitboard_weak_heuristic(problem: BitboardSokobanProblem, state: BitboardState) -> float:
+    player = problem.layout.cells[state.player]
+    return min(manhattan_distance(player, crate) for crate in state.crate_positions()) - 1
@@ -0,0 +1,146 @@
+from typing import Dict, FrozenSet, Iterable, List, Set
+from collections import deque
+
+from mathutils import Direction, Point
+from sokoban import PushFilter, SokobanProblem, SokobanState
+
+# This file contains the push filters that detect Sokoban deadlocks (see SokobanProblem.set_push_filters)
+# A filter is called after every push with the new state and the new position of the pushed crate,
+# so it only needs to look at the part of the level that the push changed.
+# Every filter is sound: it only returns True if no sequence of actions can reach a goal from the state.
+
+# The vectors of the two axes: every crate can only move along the horizontal or the vertical axis
+AXES = (Direction.RIGHT.to_vector(), Direction.DOWN.to_vector())
+
+# This push filter detects the simple deadlocks: a crate pushed to a dead square (see SokobanLayout.dead_squares)
+def dead_square_filter(problem: SokobanProblem, state: SokobanState, crate: Point) -> bool:
+    return crate in problem.layout.dead_squares()
+
+# This push filter detects the freeze deadlocks: a group of crates that can never move again while one of them is not on a goal
+# A crate is blocked along an axis if one of its neighbors on this axis is a wall or a frozen crate,
+# or if both of its neighbors on this axis are dead squares (so moving it along this axis is a deadlock anyway).
+# A crate is frozen if it is blocked along both axes.
+# Starting from the crates connected to the pushed crate (as neighbors), we assume they are all frozen
+# and we keep removing the crates that are not blocked along both axes, until no more crates are removed.
+# No crate in the remaining group can move before another crate of the group moves, so none of them can ever move.
+def freeze_filter(problem: SokobanProblem, state: SokobanState, crate: Point) -> bool:
+    layout, crates = problem.layout, state.crates
+    walkable, goals, dead = layout.walkable, layout.goals, layout.dead_squares()
+
+    # Returns True if the crate is blocked along the axis assuming the crates in "group" can never move
+    def blocked(position: Point, vector: Point, group: Set[Point]) -> bool:
+        before, after = position - vector, position + vector
+        if before not in walkable or after not in walkable: return True
+        if before in group or after in group: return True
+        return before in dead and after in dead
+
+    # The pushed crate must be blocked along both axes even if all the crates were frozen
+    if not all(blocked(crate, vector, crates) for vector in AXES): return False
+
+    # Collect the crates connected to the pushed crate
+    group, queue = {crate}, deque([crate])
+    while queue:
+        position = queue.popleft()
+        for vector in AXES:
+            for neighbor in (position - vector, position + vector):
+                if neighbor in crates and neighbor not in group:
+                    group.add(neighbor)
+                    queue.append(neighbor)
+
+    # Remove the crates that are not blocked along both axes until the group does not change
+    changed = True
+    while changed and crate in group:
+        changed = False
+        for position in list(group):
+            if not all(blocked(position, vector, group) for vector in AXES):
+                group.discard(position)
+                changed = True
+
+    # The remaining crates are frozen, it is a deadlock if one of them is not on a goal
+    return crate in group and not group <= goals
+
+# Returns the positions that the player can reach without pushing any crate
+def player_reachable(walkable: FrozenSet[Point], crates: Iterable[Point], player: Point) -> Set[Point]:
+    reachable, queue = {player}, deque([player])
+    while queue:
+        position = queue.popleft()
+        for direction in Direction:
+            neighbor = position + direction.to_vector()
+            if neighbor in walkable and neighbor not in crates and neighbor not in reachable:
+                reachable.add(neighbor)
+                queue.append(neighbor)
+    return reachable
+
+# The maximum number of states explored by the corral filter for each corral
+CORRAL_SEARCH_LIMIT = 1000
+
+# This push filter detects the corral deadlocks
+# A corral is an area that the player cannot reach (after the push), and its border crates are the crates next to it.
+# We only check the corrals next to the pushed crate (since the push is what could close them), and only the I-corrals:
+# the corrals where every push that the player can do on a border crate moves the crate into the corral.
+# For every such corral, we remove all the crates except the border crates and search the pushes of the border crates.
+# Removing crates can only make the level easier, and the other crates cannot open the corral since they are not next to it,
+# so if no sequence of pushes either lets the player into the corral or puts all the border crates on goals, the state is a deadlock.
+# If the search explores more than CORRAL_SEARCH_LIMIT states, we give up and assume it is not a deadlock.
+def corral_filter(problem: SokobanProblem, state: SokobanState, crate: Point) -> bool:
+    layout, crates = problem.layout, state.crates
+    walkable = layout.walkable
+    reachable = player_reachable(walkable, crates, state.player)
+    checked: Set[Point] = set()
+    for direction in Direction:
+        start = crate + direction.to_vector()
+        if start not in walkable or start in crates or start in reachable or start in checked: continue
+        # The corral is the area around "start" (none of it is reachable since it is bounded by walls and crates)
+        corral = player_reachable(walkable, crates, start)
+        checked |= corral
+        if corral_deadlock(problem, crates, reachable, corral): return True
+    return False
+
+# Returns True if the corral is an I-corral whose border crates can neither open it nor all be pushed to goals
+def corral_deadlock(problem: SokobanProblem, crates: FrozenSet[Point], reachable: Set[Point], corral: Set[Point]) -> bool:
+    layout = problem.layout
+    walkable, goals, dead = layout.walkable, layout.goals, layout.dead_squares()
+    border = frozenset(position for position in crates if any(position + direction.to_vector() in corral for direction in Direction))
+    if border <= goals: return False
+
+    # Check that it is an I-corral: every possible push of a border crate moves it into the corral
+    for position in border:
+        for direction in Direction:
+            vector = direction.to_vector()
+            target = position + vector
+            if position - vector in reachable and target in walkable and target not in crates and target not in corral:
+                return False
+
+    # Search the pushes of the border crates (without the other crates)
+    # Each state is the set of crates and the set of positions the player can reach
+    # so we store the minimum reachable position as a canonical player position
+    player = next(iter(reachable))
+    visited = set()
+    queue = deque([(border, player)])
+    while queue:
+        state_crates, player = queue.popleft()
+        area = player_reachable(walkable, state_crates, player)
+        key = (state_crates, min(area, key=lambda position: (position.y, position.x)))
+        if key in visited: continue
+        visited.add(key)
+        if len(visited) > CORRAL_SEARCH_LIMIT: return False
+        # The player can get into the corral
+        if not area.isdisjoint(corral): return False
+        for position in state_crates:
+            for direction in Direction:
+                vector = direction.to_vector()
+                target = position + vector
+                if position - vector not in area or target not in walkable or target in state_crates or target in dead: continue
+                pushed = state_crates.symmetric_difference({position, target})
+                # All the border crates are on goals
+                if pushed <= goals: return False
+                queue.append((pushed, position))
+    return True
+
+# The available push filters (used by the command line tools to select the filters by name)
+# When several filters are used, they should be ordered from the cheapest to the most expensive
+PUSH_FILTERS: Dict[str, PushFilter] = {
+    "dead-squares": dead_square_filter,
+    "freeze": freeze_filter,
+    "corral": corral_filter,
+}
@@ -8,17 +8,158 @@ def weak_heuristic(problem: SokobanProblem, state: SokobanState):
     return min(manhattan_distance(state.player, crate) for crate in state.crates) - 1
 
 #TODO: Import any modules and write any functions you want to use
+from typing import Dict, List, Optional, Tuple
+from collections import deque
 
+# ==> The strong heuristic is the cost of the best assignment of the crates to the goals (a minimum cost matching)
+# ==> where the cost of putting a crate on a goal is the minimum number of pushes needed to move it there if it was alone in the level.
+# ==> Every action moves at most one crate by one cell, so the cost of the best assignment decreases by at most 1 per action
+# ==> and the heuristic is consistent (for the step-level and the push-level problems, since it never exceeds the number of pushes).
+# ==> A crate that cannot reach any free goal (e.g. it is on a dead square) makes the heuristic infinite.
+
+# ==> The cost of assigning a crate to a goal it can never reach (it is larger than any sum of push distances)
+UNREACHABLE = 10**6
+# ==> The maximum number of crate arrangements whose assignment is kept in the cache (the cache is cleared when it is full)
+ASSIGNMENT_CACHE_SIZE = 2**17
+
+# ==> This function returns the push distance table of the problem: for every walkable cell, the tuple of push distances to every goal
+# ==> The push distances to a goal are computed by a reverse BFS from the goal that pulls the crate:
+# ==> a crate can be pulled from "position" to "previous" if the player can stand behind it (at "previous" minus the same vector)
+# ==> The table is computed once per problem and stored in problem.cache()
+def push_distances(problem: SokobanProblem) -> Dict[Point, Tuple[int, ...]]:
+    cache = problem.cache()
+    table = cache.get("push_distances")
+    if table is None:
+        walkable = problem.layout.walkable
+        goals = sorted(problem.layout.goals, key=lambda position: (position.y, position.x))
+        distances = []
+        for goal in goals:
+            distance, queue = {goal: 0}, deque([goal])
+            while queue:
+                position = queue.popleft()
+                for direction in Direction:
+                    vector = direction.to_vector()
+                    previous = position - vector
+                    if previous in distance or previous not in walkable or previous - vector not in walkable: continue
+                    distance[previous] = distance[position] + 1
+                    queue.append(previous)
+            distances.append(distance)
+        table = cache["push_distances"] = {cell: tuple(distance.get(cell, UNREACHABLE) for distance in distances) for cell in walkable}
+    return table
+
+# ==> This class stores an optimal assignment of the crates (rows) to the goals (columns) with the potentials of the Hungarian algorithm
+# ==> The potentials satisfy u[i] + v[j] <= costs[i][j] with equality for the assigned pairs, which proves that the assignment is optimal
+# ==> When one crate moves, only its row changes, so "move" reuses the potentials and the other assignments
+# ==> and finds the new optimal assignment with a single augmenting path in O(n^2) instead of solving again in O(n^3)
+class Assignment:
+    __slots__ = ("crates", "costs", "u", "v", "row_of_col", "value")
+
+    def __init__(self, crates: List[Point], costs: List[Tuple[int, ...]], u: List[int], v: List[int], row_of_col: List[int]) -> None:
+        self.crates = crates
+        self.costs = costs
+        self.u = u
+        self.v = v
+        self.row_of_col = row_of_col
+        self.value = 0
+
+    # ==> Solve the assignment of the given crates from scratch (one augmenting path per crate)
+    @staticmethod
+    def solve(crates: List[Point], table: Dict[Point, Tuple[int, ...]], goals: int) -> 'Assignment':
+        assignment = Assignment(crates, [table[crate] for crate in crates], [0] * len(crates), [0] * goals, [-1] * goals)
+        for row in range(len(crates)):
+            assignment.augment(row)
+        assignment.update_value()
+        return assignment
+
+    # ==> Returns a new assignment where the crate at "old" is moved to "new" (this assignment is not changed)
+    # ==> The row of the crate is unassigned and gets the new costs, its potential is reset to 0 (this is feasible since v is never positive)
+    # ==> then a single augmenting path assigns it again
+    # ==> This is only valid if there are as many goals as crates, otherwise the freed goal could keep a negative potential
+    def move(self, old: Point, new: Point, table: Dict[Point, Tuple[int, ...]]) -> 'Assignment':
+        row = self.crates.index(old)
+        crates, costs = self.crates.copy(), self.costs.copy()
+        crates[row], costs[row] = new, table[new]
+        row_of_col = self.row_of_col.copy()
+        row_of_col[row_of_col.index(row)] = -1
+        u = self.u.copy()
+        u[row] = 0
+        assignment = Assignment(crates, costs, u, self.v.copy(), row_of_col)
+        assignment.augment(row)
+        assignment.update_value()
+        return assignment
+
+    # ==> Find the shortest augmenting path from the given (unassigned) row to a free column using the reduced costs (Dijkstra)
+    # ==> and update the potentials on the way (this is one phase of the Hungarian algorithm)
+    def augment(self, start: int) -> None:
+        costs, u, v, row_of_col = self.costs, self.u, self.v, self.row_of_col
+        columns = len(v)
+        inf = float('inf')
+        # ==> min_reduced[j] is the lowest reduced cost to reach column j and way[j] is the column before it on the path (-1 for the start row)
+        min_reduced, way, used = [inf] * columns, [-1] * columns, [False] * columns
+        row, column = start, -1
+        while True:
+            if column >= 0: used[column] = True
+            row_costs, row_u = costs[row], u[row]
+            delta, next_column = inf, -1
+            for j in range(columns):
+                if used[j]: continue
+                reduced = row_costs[j] - row_u - v[j]
+                if reduced < min_reduced[j]: min_reduced[j], way[j] = reduced, column
+                if min_reduced[j] < delta: delta, next_column = min_reduced[j], j
+            u[start] += delta
+            for j in range(columns):
+                if used[j]:
+                    u[row_of_col[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_reduced[j] -= delta
+            column = next_column
+            if row_of_col[column] == -1: break
+            row = row_of_col[column]
+        # ==> Flip the assignments along the path
+        while True:
+            previous = way[column]
+            row_of_col[column] = start if previous == -1 else row_of_col[previous]
+            if previous == -1: break
+            column = previous
+
+    def update_value(self) -> None:
+        self.value = sum(self.costs[row][column] for column, row in enumerate(self.row_of_col) if row != -1)
 
 def strong_heuristic(problem: SokobanProblem, state: SokobanState) -> float:
-    #TODO: ADD YOUR CODE HERE
     #IMPORTANT: DO NOT USE "problem.get_actions" HERE.
     # Calling it here will mess up the tracking of the expanded nodes count
     # which is the number of get_actions calls during the search
-    #NOTE: you can use problem.cache() to get a dictionary in which you can store information that will persist between calls of this function
-    # This could be useful if you want to store the results heavy computations that can be cached and used across multiple calls of this function
     """
     A stronger heuristic for the Sokoban problem.
     Estimates the cost to reach the goal state more accurately.
     """
-    NotImplemented() #Remove this line when you implement this heuristic
\ No newline at end of file
+    layout, crates = problem.layout, state.crates
+    table = push_distances(problem)
+    cache = problem.cache()
+    assignments: Dict[int, Assignment] = cache.setdefault("assignments", {})
+    if len(assignments) >= ASSIGNMENT_CACHE_SIZE: assignments.clear()
+
+    # ==> The assignments are stored by the Zobrist hash of the crates (the hash of the state without the key of the player)
+    player_keys, crate_keys = layout.zobrist()
+    key = state.zobrist ^ player_keys[state.player]
+    assignment = assignments.get(key)
+    if assignment is None or crates.symmetric_difference(assignment.crates):
+        assignment = None
+        # ==> Look for a cached arrangement where one of the crates was one cell behind (the parent of a push)
+        # ==> and move this crate in its assignment
+        if len(crates) == len(layout.goals):
+            for crate in crates:
+                for direction in Direction:
+                    previous = crate - direction.to_vector()
+                    if previous in crates or previous not in layout.walkable: continue
+                    parent = assignments.get(key ^ crate_keys[crate] ^ crate_keys[previous])
+                    if parent is None or crates.symmetric_difference(parent.crates) != {crate, previous}: continue
+                    assignment = parent.move(previous, crate, table)
+                    break
+                if assignment is not None: break
+        # ==> Otherwise, solve the assignment from scratch
+        if assignment is None:
+            assignment = Assignment.solve(sorted(crates, key=lambda position: (position.y, position.x)), table, len(layout.goals))
+        assignments[key] = assignment
+    return float('inf') if assignment.value >= UNREACHABLE else assignment.value
@@ -0,0 +1,189 @@
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from collections import deque
+from itertools import combinations
+import argparse, hashlib, mmap, struct, time
+
+from mathutils import Direction, Point
+from sokoban import SokobanLayout, SokobanProblem, SokobanState
+
+# This file contains pattern databases (PDBs) for the Sokoban problem
+# A pattern database stores, for every placement of a group of k crates, the minimum number of pushes
+# needed to put these crates on any k goals if they were the only crates in the level.
+# To keep the table small, the player can teleport: a crate can be pushed if the cell behind it and the cell in front of it are empty.
+# Removing the other crates and the constraint on the player only makes the problem easier, so the values are lower bounds (admissible),
+# and every push moves one crate by one cell, so the values of a group change by at most 1 per action (consistent).
+# The values fit in one byte: a group that needs more than 254 pushes stores 254 (see SATURATED), which is still a lower bound
+# that changes by at most 1 per push, and only the groups that can never be put on goals store 255 (an infinite value).
+#
+# The tables are built once per layout by a retrograde BFS: it starts from every placement of the group on the goals
+# and pulls the crates backwards (a pull is the reverse of a push).
+# A database contains one table for every group size from 1 to k, and the tables are written to a binary file:
+#   the header (see HEADER) followed by the tables, where table j has one byte for every set of j walkable cells
+#   (indexed by the combinatorial rank of the set, see PatternDatabase.rank)
+# The file is loaded with mmap, so loading is instant and the pages are shared by every process that loads the same file.
+#
+# The database is used as a heuristic function in one of two modes:
+#   max: the maximum over every group of k crates of the state
+#   additive: the maximum over every partition of the crates into groups of at most k crates of the sum of the values of the groups
+#             (the pushes of different crates are different actions, so the sum is still a lower bound,
+#             and taking the maximum over all the partitions keeps it consistent)
+
+# The header: magic, version, group size, number of walkable cells, fingerprint of the layout
+HEADER = struct.Struct("<4sHHI20s")
+MAGIC = b"SPDB"
+VERSION = 1
+# The value stored for the groups that can never be put on goals
+UNREACHABLE = 255
+# The largest value stored for the other groups: the groups that need more pushes store it as a lower bound (the search keeps going past it)
+SATURATED = UNREACHABLE - 1
+
+# Returns the walkable cells of the layout in row-major order (a cell is identified by its position in this list)
+def layout_cells(layout: SokobanLayout) -> List[Point]:
+    return sorted(layout.walkable, key=lambda position: (position.y, position.x))
+
+# Returns a fingerprint of the layout (the walls and the goals), so a database is never used with another layout
+def layout_fingerprint(layout: SokobanLayout) -> bytes:
+    cells = ";".join(f"{position.x},{position.y}" for position in layout_cells(layout))
+    goals = ";".join(f"{position.x},{position.y}" for position in sorted(layout.goals, key=lambda position: (position.y, position.x)))
+    return hashlib.sha1(f"{layout.width}x{layout.height}|{cells}|{goals}".encode()).digest()
+
+# Returns the binomial coefficients table: binomials[n][k] = C(n, k) for n up to "cells" and k up to "size"
+def binomial_table(cells: int, size: int) -> List[List[int]]:
+    binomials = [[0] * (size + 1) for _ in range(cells + 1)]
+    for n in range(cells + 1):
+        binomials[n][0] = 1
+        for k in range(1, min(n, size) + 1):
+            binomials[n][k] = binomials[n - 1][k - 1] + binomials[n - 1][k]
+    return binomials
+
+# Build the tables of the pattern database for groups of 1 to "size" crates
+# Returns a list of tables where tables[j - 1] is the table for groups of j crates
+def build_pattern_database(layout: SokobanLayout, size: int) -> List[bytearray]:
+    cells = layout_cells(layout)
+    index = {position: i for i, position in enumerate(cells)}
+    binomials = binomial_table(len(cells), size)
+    # pulls[i] contains (cell the crate is pulled to, cell the player is pulled to) for every direction
+    pulls = []
+    for position in cells:
+        cell_pulls = []
+        for direction in Direction:
+            vector = direction.to_vector()
+            previous, behind = index.get(position - vector), index.get(position - vector - vector)
+            if previous is not None and behind is not None: cell_pulls.append((previous, behind))
+        pulls.append(cell_pulls)
+    goals = sorted(index[goal] for goal in layout.goals)
+
+    tables = []
+    for group in range(1, size + 1):
+        table = bytearray([UNREACHABLE]) * binomials[len(cells)][group]
+        rank = lambda crates: sum(binomials[cell][i] for i, cell in enumerate(crates, 1))
+        queue = deque()
+        for start in combinations(goals, group):
+            table[rank(start)] = 0
+            queue.append(start)
+        while queue:
+            crates = queue.popleft()
+            value = min(table[rank(crates)] + 1, SATURATED)
+            occupied = set(crates)
+            for i, crate in enumerate(crates):
+                for previous, behind in pulls[crate]:
+                    # The crate is pulled to "previous" and the player (who teleported in front of it) ends up "behind"
+                    if previous in occupied or behind in occupied: continue
+                    pulled = tuple(sorted(crates[:i] + (previous,) + crates[i + 1:]))
+                    pulled_rank = rank(pulled)
+                    if table[pulled_rank] != UNREACHABLE: continue
+                    table[pulled_rank] = value
+                    queue.append(pulled)
+        tables.append(table)
+    return tables
+
+# Build the pattern database of the layout and write it to a binary file
+def write_pattern_database(path: str, layout: SokobanLayout, size: int) -> None:
+    tables = build_pattern_database(layout, size)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, size, len(layout.walkable), layout_fingerprint(layout)))
+        for table in tables:
+            f.write(table)
+
+# A pattern database loaded from a file (using mmap)
+# It can be called as a heuristic function: database(problem, state)
+class PatternDatabase:
+    # The maximum number of crate sets whose value is kept in the memo (the memo is cleared when it is full)
+    MEMO_SIZE = 2**16
+
+    def __init__(self, path: str, layout: SokobanLayout, additive: bool = False) -> None:
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size, cells, fingerprint = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a sokoban pattern database")
+        if cells != len(layout.walkable) or fingerprint != layout_fingerprint(layout):
+            raise ValueError(f"The pattern database {path} was built for another layout")
+        self.size = size
+        self.additive = additive
+        self.index = {position: i for i, position in enumerate(layout_cells(layout))}
+        self.binomials = binomial_table(cells, size)
+        # offsets[j] is the position of the table of groups of j crates in the file
+        self.offsets = [0] * (size + 1)
+        offset = HEADER.size
+        for group in range(1, size + 1):
+            self.offsets[group] = offset
+            offset += self.binomials[cells][group]
+        self.memo: Dict[FrozenSet[Point], float] = {}
+
+    # Returns the combinatorial rank of a sorted tuple of cells (its index in the table of its size)
+    def rank(self, crates: Tuple[int, ...]) -> int:
+        binomials = self.binomials
+        return sum(binomials[cell][i] for i, cell in enumerate(crates, 1))
+
+    # Returns the value of a group of crates (a sorted tuple of cells)
+    def lookup(self, crates: Tuple[int, ...]) -> float:
+        value = self.data[self.offsets[len(crates)] + self.rank(crates)]
+        return float('inf') if value == UNREACHABLE else value
+
+    # Returns the heuristic value of a set of crates
+    def evaluate(self, crates: Iterable[Point]) -> float:
+        cells = tuple(sorted(self.index[crate] for crate in crates))
+        size = min(self.size, len(cells))
+        if not self.additive:
+            return max(self.lookup(group) for group in combinations(cells, size))
+        # best[mask] is the best sum over the partitions of the crates in "mask" (a bitmask over "cells")
+        # The group containing the lowest crate of the mask is chosen first, so every partition is counted once
+        best = [0.0] * (1 << len(cells))
+        for mask in range(1, 1 << len(cells)):
+            lowest = (mask & -mask).bit_length() - 1
+            others = [i for i in range(lowest + 1, len(cells)) if mask >> i & 1]
+            value = -1.0
+            for count in range(min(size, len(others) + 1)):
+                for rest in combinations(others, count):
+                    group = (lowest,) + rest
+                    group_mask = sum(1 << i for i in group)
+                    value = max(value, self.lookup(tuple(cells[i] for i in group)) + best[mask ^ group_mask])
+            best[mask] = value
+        return best[-1]
+
+    def __call__(self, problem: SokobanProblem, state: SokobanState) -> float:
+        value = self.memo.get(state.crates)
+        if value is None:
+            if len(self.memo) >= PatternDatabase.MEMO_SIZE: self.memo.clear()
+            value = self.memo[state.crates] = self.evaluate(state.crates)
+        return value
+
+    def close(self) -> None:
+        self.data.close()
+
+if __name__ == "__main__":
+    # Build the pattern database of a level, for example:
+    #   python sokoban_pdb.py levels/level4.txt --size 3 --output level4.pdb
+    parser = argparse.ArgumentParser(description="Build a pattern database for a sokoban level")
+    parser.add_argument("level", help="path to the sokoban level")
+    parser.add_argument("--size", "-k", type=int, default=2, help="the number of crates in the largest group")
+    parser.add_argument("--output", "-o", default=None, help="path to the database file (defaults to the level path with the extension .pdb)")
+    args = parser.parse_args()
+    output: Optional[str] = args.output or args.level.rsplit(".", 1)[0] + ".pdb"
+    problem = SokobanProblem.from_file(args.level)
+    start = time.time()
+    write_pattern_database(output, problem.layout, args.size)
+    cells = len(problem.layout.walkable)
+    entries = sum(binomial_table(cells, args.size)[cells][group] for group in range(1, args.size + 1))
+    print(f"Wrote {output}: {entries} entries ({cells} cells, groups of up to {args.size} crates) in {time.time() - start:.2f} seconds")
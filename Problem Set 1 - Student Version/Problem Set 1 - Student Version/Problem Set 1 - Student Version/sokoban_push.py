@@ -0,0 +1,214 @@
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from collections import deque
+import dataclasses
+
+from mathutils import Direction, Point
+from sokoban import SokobanMacro, SokobanProblem, SokobanPush, SokobanState, reachable_cells
+from helpers.utils import track_call_count, track_call_count_as
+
+# This file contains the push-level version of the Sokoban problem
+# In the step-level problem (SokobanProblem), every step of the player is an action,
+# so the same crate arrangement appears once for every cell the player can walk to.
+# In the push-level problem, an action is a push of a crate and the player walks to the crate for free.
+# The state is still a SokobanState, but its player is normalized to the minimum cell (top-most then left-most)
+# that the player can reach, so all the states with the same crates and the same reachable area are the same state.
+# Every push costs 1, so the search minimizes the number of pushes (not the number of steps).
+# The solutions are expanded back into a list of Directions for the step-level problem (see expand_pushes).
+
+# Returns the minimum cell (top-most then left-most) of a set of cells
+def canonical_cell(cells: Iterable[Point]) -> Point:
+    return min(cells, key=lambda position: (position.y, position.x))
+
+# Returns the pushes of an action (a push or a macro)
+def action_pushes(action: Any) -> Iterable[SokobanPush]:
+    return (action,) if isinstance(action[0], Point) else action
+
+# The macros replace a push by a sequence of pushes that is applied as a single action whose cost is the number of pushes.
+# They use the tunnels and the goal rooms of the layout, which are computed once per layout (see SokobanLayout):
+#
+# Tunnel macros: if a crate is pushed onto a tunnel cell (which is not a goal) and the cell after it is empty,
+# the crate is pushed again in the same direction, until it reaches a goal, leaves the tunnel or is blocked.
+# Since the tunnel cell cuts the level in two parts and the player stands on the near side, nothing on the far side
+# can change before the crate moves, and the crate can only be pushed forward from there (it is not on a goal so it must move).
+# So any solution can push the crate forward first without extra pushes, and the tunnel macros keep the optimal solutions.
+#
+# Goal-room macros: if a goal room contains exactly the first goals in its packing order and a crate is pushed onto the entrance
+# (into the room), the crate is pushed all the way to the next goal in the order using the shortest sequence of pushes.
+# This commits to the packing order, so the goal-room macros can miss the optimal solution (or every solution):
+# they are not admissible and a search with them is not guaranteed to be optimal.
+
+# This is the implementation of the push-level sokoban problem
+# It shares the layout, the goal test and the push filters with the step-level problem
+# The tunnel and goal-room macros are optional (see from_problem) and only the tunnel macros keep the optimal solutions
+class SokobanPushProblem(SokobanProblem):
+    # The reachable cells of the recently seen states (they are needed to normalize a state and again to expand it)
+    # The cache is cleared once it has more than REACHABLE_CACHE_SIZE states
+    REACHABLE_CACHE_SIZE = 2**16
+    reachable: Dict[SokobanState, Set[Point]]
+    # Whether the pushes into tunnels and goal rooms are replaced by macros
+    tunnel_macros: bool = False
+    goal_room_macros: bool = False
+
+    # Returns the reachable cells of a (normalized) state from the cache or compute them using a flood fill
+    def get_reachable(self, state: SokobanState) -> Set[Point]:
+        reachable = self.reachable.get(state)
+        if reachable is None:
+            reachable = self.cache_reachable(state, reachable_cells(self.layout.walkable, state.crates, state.player))
+        return reachable
+
+    def cache_reachable(self, state: SokobanState, reachable: Set[Point]) -> Set[Point]:
+        if len(self.reachable) >= SokobanPushProblem.REACHABLE_CACHE_SIZE: self.reachable.clear()
+        self.reachable[state] = reachable
+        return reachable
+
+    # We use @track_call_count to track the number of times this function was called to count the number of explored nodes
+    @track_call_count
+    def get_actions(self, state: SokobanState) -> Iterable[SokobanPush]:
+        return [push for push, _, _ in self.pushes(state)]
+
+    def get_successor(self, state: SokobanState, action: SokobanPush) -> SokobanState:
+        for push, successor, _ in self.pushes(state):
+            if push == action: return successor
+        # If the player cannot reach the crate or the crate cannot move in this direction, then this action is wrong
+        raise Exception(f"Invalid push {action} in state:" + "\n" + str(state))
+
+    def get_cost(self, state: SokobanState, action: SokobanPush) -> float:
+        # All pushes have the same cost (a macro costs as much as its pushes)
+        return 1 if isinstance(action[0], Point) else len(action)
+
+    # Its calls are counted as calls to "get_actions" since it expands the state
+    @track_call_count_as(get_actions)
+    def get_successors(self, state: SokobanState) -> List[Tuple[SokobanPush, SokobanState, float]]:
+        return self.pushes(state)
+
+    # Returns (push, successor, cost) for every push that the player can do from the cells it can reach
+    # The hash of every successor is computed from the hash of the state (see SokobanState) by replacing the key of the player
+    # and the keys of the old and new positions of the pushed crate
+    def pushes(self, state: SokobanState) -> List[Tuple[SokobanPush, SokobanState, float]]:
+        layout, walkable, crates = self.layout, self.layout.walkable, state.crates
+        reachable = self.get_reachable(state)
+        player_keys, crate_keys = layout.zobrist()
+        # The hash of the state without the player
+        key = state.zobrist ^ player_keys[state.player]
+        successors = []
+        for crate in sorted(crates, key=lambda position: (position.y, position.x)):
+            for direction in Direction:
+                vector = direction.to_vector()
+                # The player must stand behind the crate and the crate must move to an empty walkable cell
+                target = crate + vector
+                if crate - vector not in reachable or target not in walkable or target in crates: continue
+                action = (crate, direction)
+                player, pushed = crate, crates.symmetric_difference({crate, target})
+                if self.tunnel_macros or self.goal_room_macros:
+                    macro = self.macro(crate, direction, pushed)
+                    if macro is not None:
+                        # The last push of the macro moves the crate from "player" to "target"
+                        action = macro
+                        player, last_direction = macro[-1]
+                        target = player + last_direction.to_vector()
+                        pushed = crates.symmetric_difference({crate, target})
+                # After the push, the player stands where the crate was
+                area = reachable_cells(walkable, pushed, player)
+                player = canonical_cell(area)
+                successor = SokobanState(layout, player, pushed, key ^ player_keys[player] ^ crate_keys[crate] ^ crate_keys[target])
+                # skip the pushes that lead to a deadlock
+                if self.push_filters and self.is_deadlock(successor, target): continue
+                self.cache_reachable(successor, area)
+                successors.append((action, successor, self.get_cost(state, action)))
+        return successors
+
+    # Returns the macro that starts with pushing the crate in the given direction (or None if there is no macro for this push)
+    # "crates" contains the crates after the first push
+    def macro(self, crate: Point, direction: Direction, crates: FrozenSet[Point]) -> Optional[SokobanMacro]:
+        layout = self.layout
+        vector = direction.to_vector()
+        target = crate + vector
+        if self.goal_room_macros:
+            for room in layout.goal_rooms():
+                if room.entrance != target or room.direction != direction: continue
+                # The room must contain exactly the first goals of its packing order
+                filled = crates & room.cells
+                count = len(filled)
+                if count == len(room.order) or filled != set(room.order[:count]): continue
+                return ((crate, direction),) + room.paths[count]
+        if self.tunnel_macros:
+            tunnels = layout.tunnels()[0 if direction in (Direction.LEFT, Direction.RIGHT) else 1]
+            pushes = [(crate, direction)]
+            # Keep pushing while the crate is on a tunnel cell which is not a goal and the next cell is empty
+            while target in tunnels and target not in layout.goals:
+                next_target = target + vector
+                if next_target not in layout.walkable or next_target in crates: break
+                pushes.append((target, direction))
+                crates = crates.symmetric_difference({target, next_target})
+                target = next_target
+            if len(pushes) > 1: return tuple(pushes)
+        return None
+
+    # Build the push-level problem from a step-level problem (and the state to start from)
+    # If desired, the pushes into tunnels and goal rooms are replaced by macros (the goal-room macros are not optimal)
+    @staticmethod
+    def from_problem(problem: SokobanProblem, state: Optional[SokobanState] = None,
+                     tunnel_macros: bool = False, goal_room_macros: bool = False) -> 'SokobanPushProblem':
+        if state is None: state = problem.get_initial_state()
+        push_problem = SokobanPushProblem()
+        push_problem.layout = problem.layout
+        push_problem.reachable = {}
+        push_problem.tunnel_macros = tunnel_macros
+        push_problem.goal_room_macros = goal_room_macros
+        # The push filters and their pruned counts are shared with the step-level problem
+        push_problem.push_filters = problem.push_filters
+        if problem.push_filters: push_problem.pruned = problem.pruned
+        area = reachable_cells(problem.layout.walkable, state.crates, state.player)
+        push_problem.initial_state = SokobanState(problem.layout, canonical_cell(area), state.crates)
+        push_problem.cache_reachable(push_problem.initial_state, area)
+        return push_problem
+
+# Returns the steps that the player should walk to go from "start" to "goal" without pushing any crate (or None)
+def walk(walkable: FrozenSet[Point], crates: FrozenSet[Point], start: Point, goal: Point) -> Optional[List[Direction]]:
+    parents: Dict[Point, Any] = {start: None}
+    queue = deque([start])
+    while queue:
+        position = queue.popleft()
+        if position == goal:
+            steps = []
+            while parents[position] is not None:
+                position, direction = parents[position]
+                steps.append(direction)
+            steps.reverse()
+            return steps
+        for direction in Direction:
+            neighbor = position + direction.to_vector()
+            if neighbor in walkable and neighbor not in crates and neighbor not in parents:
+                parents[neighbor] = (position, direction)
+                queue.append(neighbor)
+    return None
+
+# Expand a list of pushes (or macros), starting from a step-level state, into the list of steps (Directions) for the step-level problem
+def expand_pushes(state: SokobanState, pushes: List[Any]) -> List[Direction]:
+    walkable, player, crates = state.layout.walkable, state.player, state.crates
+    steps = []
+    for crate, direction in (push for action in pushes for push in action_pushes(action)):
+        vector = direction.to_vector()
+        path = walk(walkable, crates, player, crate - vector)
+        if path is None:
+            raise Exception(f"The player cannot reach the crate at {crate} to push it {direction.name}")
+        steps.extend(path)
+        steps.append(direction)
+        crates = crates.symmetric_difference({crate, crate + vector})
+        player = crate
+    return steps
+
+# Wrap a search function so that it searches the push-level problem (with the selected macros) and returns the step-level solution
+# The returned function has the same arguments as the search function, so it can be used by the existing agents
+# The solution is push-optimal with BFS and UCS (and with the optimal informed searches if the heuristic is admissible in pushes).
+# Note that a heuristic that counts steps is not admissible in pushes: e.g. sokoban_heuristic.weak_heuristic counts the steps
+# to the nearest crate, which can exceed the remaining pushes since the player walks for free (and stands on the canonical cell).
+# If the search is an anytime search (it returns an iterator of solutions), the path of every solution is expanded
+def PushLevelSearch(search_fn: Callable[..., Any], tunnel_macros: bool = False, goal_room_macros: bool = False) -> Callable[..., Any]:
+    def search(problem: SokobanProblem, state: SokobanState, *args, **kwargs):
+        push_problem = SokobanPushProblem.from_problem(problem, state, tunnel_macros, goal_room_macros)
+        result = search_fn(push_problem, push_problem.get_initial_state(), *args, **kwargs)
+        if result is None: return None
+        if isinstance(result, list): return expand_pushes(state, result)
+        return (dataclasses.replace(solution, path=expand_pushes(state, solution.path)) for solution in result)
+    return search
@@ -0,0 +1,209 @@
+from typing import Any, Callable, Dict, List, Optional
+from dataclasses import dataclass
+from multiprocessing.connection import Connection, wait
+import multiprocessing as mp
+import argparse, glob, json, os, resource, sys, time
+
+from problem import Solution
+from sokoban import SokobanProblem, SokobanState
+from sokoban_deadlocks import PUSH_FILTERS
+from play_sokoban import OPTIMAL_INFORMED_AGENTS, PUSH_ADMISSIBLE_HEURISTICS, get_heuristic
+import search
+
+# This script solves many sokoban levels without printing the states (for regression and capacity runs), for example:
+#   python solve_levels.py levels --agent astar --heuristic strong --timeout 60 --memory 2048 > results.jsonl
+# Every level is solved in its own process (at most "--workers" processes run at the same time),
+# so a level that exceeds its time limit can be killed without affecting the others,
+# and the memory cap (an address space limit) and the peak memory are per level.
+# A JSON object is printed on its own line as soon as a level is done (in the order the levels finish) with:
+#   level: the path of the level
+#   status: "solved", "unsolvable" (the search proved there is no solution), "timeout", "memory" (the memory cap was exceeded),
+#           "invalid" (the solution does not reach the goal), "error" (the search raised an exception) or "crashed"
+#   solution: the actions as a string of letters (R, U, L, D) or null
+#   cost: the path cost of the solution or null
+#   expanded, generated: the statistics of the search (see search.SearchStatistics)
+#   wall_time: the time spent solving the level in seconds
+#   peak_rss_mib: the peak resident memory of the process that solved the level in MiB (null if it is not available)
+
+# The agents that can be used (they all run in the process of the level)
+AGENTS = ["bfs", "dfs", "ucs", "ids", "astar", "lazyastar", "idastar", "arastar", "gbfs"]
+
+# Returns a function that searches for the solution of a sokoban problem from the given state using the selected agent
+def make_search(args: argparse.Namespace) -> Callable[[SokobanProblem, SokobanState], Solution]:
+    heuristic = get_heuristic(args.heuristic)
+    searches: Dict[str, Callable[..., Any]] = {
+        "bfs": search.BreadthFirstSearch,
+        "dfs": search.DepthFirstSearch,
+        "ucs": search.UniformCostSearch,
+        "ids": search.IterativeDeepeningSearch,
+        "astar": lambda problem, state: search.AStarSearch(problem, state, heuristic),
+        "lazyastar": lambda problem, state: search.LazyAStarSearch(problem, state, [*map(get_heuristic, args.cheap_heuristics), heuristic]),
+        "idastar": lambda problem, state: search.IterativeDeepeningAStar(problem, state, heuristic),
+        "arastar": lambda problem, state: search.AnytimeRepairingAStar(problem, state, heuristic, deadline=arastar_deadline(args)),
+        "gbfs": lambda problem, state: search.BestFirstSearch(problem, state, heuristic),
+    }
+    search_fn = searches[args.agent]
+    if args.pushes:
+        from sokoban_push import PushLevelSearch
+        search_fn = PushLevelSearch(search_fn, "tunnels" in args.macros, "rooms" in args.macros)
+    # The anytime search yields improving solutions, so we keep the last one
+    def solve(problem: SokobanProblem, state: SokobanState) -> Solution:
+        result = search_fn(problem, state)
+        if result is None or isinstance(result, list): return result
+        best = None
+        for best in result: pass
+        return None if best is None else best.path
+    return solve
+
+# The anytime search stops improving its solution at the deadline (or 90% of the time limit) to leave time to report it
+def arastar_deadline(args: argparse.Namespace) -> Optional[float]:
+    limit = args.deadline if args.deadline is not None else (0.9 * args.timeout if args.timeout else None)
+    return None if limit is None else time.monotonic() + limit
+
+# Returns the list of level files given as files, directories (all the .txt files inside) or glob patterns
+def find_levels(paths: List[str]) -> List[str]:
+    levels = []
+    for path in paths:
+        if os.path.isdir(path):
+            levels.extend(sorted(glob.glob(os.path.join(path, "*.txt"))))
+        else:
+            levels.extend(sorted(glob.glob(path)) or [path])
+    return levels
+
+# Returns the peak resident memory of a running process in MiB (or None if it is not available)
+def process_peak_rss(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"): return int(line.split()[1]) / 2**10
+    except (OSError, ValueError):
+        pass
+    return None
+
+# Returns the record of a level with the fields that are not known yet set to None
+def empty_record(path: str) -> Dict[str, Any]:
+    return {"level": path, "status": None, "solution": None, "cost": None, "expanded": None, "generated": None,
+            "wall_time": None, "peak_rss_mib": None}
+
+# Solve a level and send its record to the coordinator (this runs in the process of the level)
+def solve_level(path: str, args: argparse.Namespace, connection: Connection) -> None:
+    if args.memory is not None:
+        limit = args.memory * 2**20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    record = empty_record(path)
+    start = time.perf_counter()
+    try:
+        problem = SokobanProblem.from_file(path)
+        problem.set_push_filters(PUSH_FILTERS[name] for name in args.filters)
+        state = problem.get_initial_state()
+        solution = make_search(args)(problem, state)
+        record["wall_time"] = time.perf_counter() - start
+        statistics = search.fetch_search_statistics()
+        record["expanded"], record["generated"] = statistics.expanded, statistics.generated
+        if solution is None:
+            record["status"] = "unsolvable"
+        else:
+            # Replay the solution to compute its cost and check that it reaches the goal
+            cost = 0
+            for action in solution:
+                cost += problem.get_cost(state, action)
+                state = problem.get_successor(state, action)
+            record["status"] = "solved" if problem.is_goal(state) else "invalid"
+            record["solution"] = "".join(str(action) for action in solution)
+            record["cost"] = cost
+    except MemoryError:
+        record["status"] = "memory"
+    except Exception as exception:
+        record["status"] = "error"
+        record["error"] = f"{type(exception).__name__}: {exception}"
+    if record["wall_time"] is None: record["wall_time"] = time.perf_counter() - start
+    record["peak_rss_mib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    connection.send(record)
+    connection.close()
+
+# A level that is being solved by a process
+@dataclass
+class Job:
+    path: str
+    process: Any
+    connection: Connection
+    start: float
+
+# Solve the levels using at most "workers" processes at the same time and call "report" with the record of every level once it is done
+def solve_levels(levels: List[str], args: argparse.Namespace, report: Callable[[Dict[str, Any]], None]) -> None:
+    context = mp.get_context("fork")
+    pending, running = list(reversed(levels)), []
+    while pending or running:
+        while pending and len(running) < args.workers:
+            path = pending.pop()
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=solve_level, args=(path, args, sender), daemon=True)
+            process.start()
+            sender.close()
+            running.append(Job(path, process, receiver, time.perf_counter()))
+        # Wait until a level is done (or crashed) or until the earliest time limit
+        timeout = None
+        if args.timeout:
+            timeout = max(0, min(job.start + args.timeout for job in running) - time.perf_counter())
+        wait([job.connection for job in running] + [job.process.sentinel for job in running], timeout)
+        for job in list(running):
+            elapsed = time.perf_counter() - job.start
+            record = None
+            # The record is sent before the process exits, so it is read before checking if the process is alive
+            if job.connection.poll():
+                try:
+                    record = job.connection.recv()
+                except EOFError:
+                    pass
+            if record is None and job.process.is_alive():
+                if not args.timeout or elapsed < args.timeout: continue
+                peak = process_peak_rss(job.process.pid)
+                job.process.kill()
+                record = {**empty_record(job.path), "status": "timeout", "wall_time": elapsed, "peak_rss_mib": peak}
+            elif record is None:
+                record = {**empty_record(job.path), "status": "crashed", "wall_time": elapsed, "exit_code": job.process.exitcode}
+            job.process.join()
+            job.connection.close()
+            running.remove(job)
+            report(record)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve sokoban levels in parallel and print the results as JSON lines")
+    parser.add_argument("levels", nargs="+", help="the level files, directories (all the .txt files inside) or glob patterns")
+    parser.add_argument("--agent", "-a", default="astar", choices=AGENTS, help="the search algorithm")
+    parser.add_argument("--heuristic", "-hf", default="zero", choices=["zero", "weak", "strong"],
+                        help="the heuristic of the informed search algorithms")
+    parser.add_argument("--cheap-heuristics", "-ch", nargs="*", default=["weak"], choices=["zero", "weak", "strong"],
+                        help="the cheaper heuristics that the lazy A* (lazyastar) evaluates before the selected heuristic (from the cheapest)")
+    parser.add_argument("--deadline", "-dl", type=float, default=None,
+                        help="the time (in seconds) for the anytime search (arastar) to improve its solution (defaults to 90%% of the time limit)")
+    parser.add_argument("--filters", "-f", nargs="*", default=[], choices=list(PUSH_FILTERS),
+                        help="skip the pushes that lead to the selected deadlocks")
+    parser.add_argument("--pushes", "-p", action="store_true", default=False,
+                        help="search the push-level problem (the solution minimizes the pushes instead of the steps)")
+    parser.add_argument("--macros", "-m", nargs="*", default=[], choices=["tunnels", "rooms"],
+                        help="replace the pushes into tunnels and goal rooms by macros in the push-level problem (the goal-room macros are not optimal)")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1, help="the number of levels solved at the same time")
+    parser.add_argument("--timeout", "-t", type=float, default=None, help="the time limit of every level in seconds")
+    parser.add_argument("--memory", "-mem", type=int, default=None, help="the memory limit (address space) of every level in MiB")
+    parser.add_argument("--output", "-o", default=None, help="write the JSON lines to this file instead of the standard output")
+    args = parser.parse_args()
+
+    heuristics = [args.heuristic] + (args.cheap_heuristics if args.agent == "lazyastar" else [])
+    inadmissible = [name for name in heuristics if name not in PUSH_ADMISSIBLE_HEURISTICS]
+    if args.pushes and args.agent in OPTIMAL_INFORMED_AGENTS and inadmissible:
+        parser.error(f"the heuristic '{inadmissible[0]}' is not admissible for the push-level problem, use one of: {', '.join(PUSH_ADMISSIBLE_HEURISTICS)}")
+    levels = find_levels(args.levels)
+    if not levels: parser.error("no level files were found")
+
+    output = sys.stdout if args.output is None else open(args.output, "w")
+    statuses: Dict[str, int] = {}
+    def report(record: Dict[str, Any]) -> None:
+        statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+    try:
+        solve_levels(levels, args, report)
+    finally:
+        if output is not sys.stdout: output.close()
+    print(f"{len(levels)} levels: " + ", ".join(f"{count} {status}" for status, count in statuses.items()), file=sys.stderr)